@@ -1,56 +1,45 @@
-import hashlib
-from flask import Flask, jsonify, request
-import requests as http_requests
-from apscheduler.schedulers.background import BackgroundScheduler
-import asyncio
+import base64
+from flask import Flask, jsonify, request, stream_with_context
 import os
+import queue
 from dotenv import load_dotenv
 from config import Config
 from models.prayerTimes import db, PrayerTimes
-from mosques import MOSQUES
-from datetime import date, datetime, time, timezone
+from database import init_db, read_session
+from models.dailySchedule import DailySchedule
+from models.prayerTimeHistory import PrayerTimeHistory
+from models.mosqueRequest import MosqueRequest
+from mosque_requests import ClientLimiter, dedupe_key
+from sqlalchemy.exc import IntegrityError
+from astronomy import AdhanTable
+from events import RESYNC, EventBroker
+from llm_cache import table_stats
+from metrics import Metrics
+from parsing import FIELDS, JUMMAH_SLOTS, PRAYERS
+from schedule_store import decode, json_pairs
+from mosques import MOSQUES, MOSQUES_BY_NAME
+from response_cache import ResponseCache, body_etag
+from geo import GridIndex
+from timeline import TimelineCache
+from datetime import date, datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 
 EASTERN = ZoneInfo("America/Toronto")
-import atexit
-import json
-from openai import OpenAI
 from flask_cors import CORS
-import re
-from playwright.async_api import async_playwright
-from playwright_stealth import Stealth
-from bs4 import BeautifulSoup
-import httpx
-
-BLOCK_MARKERS = (
-    # Generic 403 phrases
-    "403 - forbidden",
-    "403 forbidden",
-    "error 403",
-    "access to this page is forbidden",
-    "access denied",
-    "you have been blocked",
-    # Cloudflare challenge pages
-    "just a moment",
-    "checking your browser",
-    "enable javascript and cookies to continue",
-    "attention required! | cloudflare",
-    # Bot / captcha walls
-    "are you human",
-    "complete the captcha",
-    "automated access",
-)
-
-# Any time string of the form "H:MM am/pm". Used to detect carousel pages
-# where Playwright only captured hidden slides (no visible times present).
-TIME_PATTERN = re.compile(r"\d{1,2}:\d{2}\s*[apAP]\.?[mM]")
-MIN_TIMES_EXPECTED = 3
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 # Load environment variables from a .env file
 load_dotenv()
 
-# Initialize OpenAI client with API key from environment
-client = OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+# Largest page /prayer-times returns when a limit is given
+MAX_PAGE_SIZE = 100
+MAX_NEXT_PRAYERS = 20
+# Search radius for /next-prayer when lat/lon are given without radius_km
+DEFAULT_RADIUS_KM = 10
+# Days /prayer-times/history covers when no start is given
+DEFAULT_HISTORY_DAYS = 30
+# How far past a mosque's last recorded day /prayer-times?date= estimates its times
+MAX_ESTIMATE_DAYS = 7
 
 def create_app():
     # Create Flask app instance
@@ -61,483 +50,404 @@ def create_app():
         for o in os.environ.get("ALLOWED_ORIGINS", "http://localhost:5173").split(",")
         if o.strip()
     ]
-    CORS(app, resources={r"/*": {"origins": ALLOWED_ORIGINS}})
+    # Cross-origin scripts can only read response headers listed here
+    CORS(app, resources={r"/*": {"origins": ALLOWED_ORIGINS}}, expose_headers=["X-Next-Cursor", "ETag"])
     
     # Load configuration from Config object
     app.config.from_object(Config)
 
-    # Initialize SQLAlchemy with Flask app
-    db.init_app(app)
+    # Behind a proxy, take the client address from the X-Forwarded-For entry the
+    # proxy itself added; the entries before it are whatever the client sent
+    if app.config["TRUSTED_PROXIES"]:
+        hops = app.config["TRUSTED_PROXIES"]
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
 
-    # Define route to get all prayer times
-    @app.route("/prayer-times", methods=["GET"])
-    def get_prayer_times():
+    # Initialize SQLAlchemy with Flask app; the GET routes read through read_session()
+    init_db(app)
+
+    # Times every request from here on, for /metrics
+    metrics = Metrics(app)
+
+    def build_prayer_times():
         # Query all prayer times from the database
-        times = PrayerTimes.query.all()
-        # Serialize each PrayerTimes object to dict
-        times_serialized = [t.to_dict() for t in times]
+        times = read_session().scalars(db.select(PrayerTimes)).all()
         result = []
 
         # Merge mosque info with corresponding prayer times
-        for t in times_serialized:
-            mosque = next((m for m in MOSQUES if m["name"] == t["mosque_name"]), None)
+        for t in times:
+            mosque = MOSQUES_BY_NAME.get(t.mosque_name)
             if mosque:
                 result.append(
                     {
                         **mosque,
-                        "prayer_times": t
+                        "prayer_times": t.to_dict()
                     }
                 )
 
-        # Return the result as JSON
-        return jsonify(result)
-
-    @app.route("/health", methods=["GET"])
-    def health():
-        return {"status": "ok"}, 200
-
-    @app.route("/mosque-request", methods=["POST"])
-    def submit_mosque_request():
-        webhook_url = os.environ.get("GSHEET_WEBHOOK_URL")
-        if not webhook_url:
-            app.logger.error("GSHEET_WEBHOOK_URL is not configured")
-            return jsonify({"error": "submissions are not configured"}), 503
+        return result
 
-        data = request.get_json(silent=True) or {}
-        mosque_name = (data.get("mosque_name") or "").strip()
-        additional_info = (data.get("additional_info") or "").strip()
+    def serialize(data):
+        return app.json.dumps(data).encode("utf-8")
 
-        if not mosque_name:
-            return jsonify({"error": "mosque_name is required"}), 400
-        if len(mosque_name) > 200 or len(additional_info) > 2000:
-            return jsonify({"error": "field too long"}), 400
+    # The data changes at most once per scrape, so the serialized body is built
+    # once and reused until scrape_and_update commits new records.
+    prayer_times_cache = ResponseCache(build_prayer_times, serialize)
 
-        payload = {
-            "mosque_name": mosque_name,
-            "additional_info": additional_info,
-            "submitter_ip": request.headers.get("X-Forwarded-For", request.remote_addr),
-        }
+    # Spatial index over mosque coordinates for lat/lon queries, built once
+    mosque_index = GridIndex((m["latitude"], m["longitude"], m["name"]) for m in MOSQUES)
 
-        try:
-            r = http_requests.post(webhook_url, json=payload, timeout=8)
-            r.raise_for_status()
-        except Exception:
-            app.logger.exception("Sheet webhook failed")
-            return jsonify({"error": "submission failed"}), 502
+    def json_response(body, etag):
+        response = app.response_class(body, mimetype="application/json")
+        response.set_etag(etag)
+        # Revalidated on every use (an empty 304 while the ETag holds), so the refetch
+        # after a stream resync never gets a body from the browser's cache
+        response.headers["Cache-Control"] = "no-cache"
+        return response
 
-        return jsonify({"ok": True}), 201
+    def encode_cursor(offset):
+        return base64.urlsafe_b64encode(f"o:{offset}".encode()).decode().rstrip("=")
 
-    # Function to call the OpenAI LLM with a prompt and return parsed JSON
-    def call_llm(prompt: str):
+    def decode_cursor(cursor):
         try:
-            response = client.chat.completions.create(
-                model="gpt-5.1",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant that only outputs valid JSON objects."},
-                    {"role": "user", "content": prompt},
-                ],
-                max_completion_tokens=500,
-                top_p=1,
-                timeout=30
-            )
-
-            choice = response.choices[0].message.content
-            return json.loads(choice)
-
-        except Exception as e:
-            # Return None if any error occurs
-            print(f"[OpenAI] Failed: {e}")
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+            kind, offset = raw.split(":", 1)
+            if kind != "o" or int(offset) < 0:
+                raise ValueError
+            return int(offset)
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("invalid cursor")
+
+    def float_arg(args, name):
+        value = args.get(name)
+        if value is None:
             return None
-
-    def fetch_via_requests(mosque):
-        # NOTE: Some mosque WAFs (e.g. irccan.com) block requests that claim to be
-        # a browser via a spoofed User-Agent but lack a matching browser TLS
-        # fingerprint. A plain client with a consistent fingerprint is served
-        # normally, so we intentionally do NOT send browser-spoofing headers here.
         try:
-            with httpx.Client(timeout=20, follow_redirects=True) as client:
-                response = client.get(mosque["website"])
-                response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, "html.parser")
-            for tag in soup(["script", "style", "noscript"]):
-                tag.decompose()
-
-            text = soup.get_text(separator="\n")
-            return {**mosque, "raw_text": text}
-        except Exception as e:
-            print(f"[httpx] Fallback failed for {mosque['name']}: {e}")
+            return float(value)
+        except ValueError:
+            raise ValueError(f"{name} must be a number")
+
+    def likely_times(name, day):
+        """Estimated times for a day a mosque has nothing stored for, such as tomorrow
+        after a failed scrape: its last recorded iqamahs, with that day's calculated
+        adhan times. None if its last record is too old to go by."""
+        state = PrayerTimeHistory.state_on(name, day, read_session())
+        if state is None or (day - state[0]).days > MAX_ESTIMATE_DAYS:
             return None
 
-    async def scrape_mosque_playwright(mosque):
-        try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(
-                    headless=True,
-                    args=[
-                        "--headless=new",
-                        "--no-sandbox",
-                        "--disable-dev-shm-usage",
-                        "--disable-blink-features=AutomationControlled",
-                        "--disable-features=IsolateOrigins,site-per-process"
-                    ]
-                )
-
-                context = await browser.new_context(
-                    user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
-                    locale="en-US",
-                    timezone_id="America/Toronto",
-                    viewport={"width": 1920, "height": 1080},  # Add viewport
-                    extra_http_headers={
-                        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                        "Accept-Language": "en-US,en;q=0.9",
-                        "Accept-Encoding": "gzip, deflate, br",
-                        "DNT": "1",
-                        "Connection": "keep-alive",
-                        "Upgrade-Insecure-Requests": "1"
-                    }
-                )
-                
-                page = await context.new_page()
-                await Stealth().apply_stealth_async(page)
-                
-                page.set_default_timeout(180_000)
-                
-                await page.goto(mosque["website"], wait_until="domcontentloaded", timeout=120_000)
-
-                await page.wait_for_timeout(2000)
-
-                try:
-                    await page.wait_for_load_state("networkidle", timeout=10_000)
-                except Exception:
-                    pass
-
-                # Get visible text only
-                text = await page.evaluate("""
-                    () => {
-                        const walker = document.createTreeWalker(
-                            document.body,
-                            NodeFilter.SHOW_TEXT,
-                            {
-                                acceptNode: (node) => {
-                                    if (!node.parentElement) return NodeFilter.FILTER_REJECT;
-                                    const style = window.getComputedStyle(node.parentElement);
-                                    if (style.display === "none" || style.visibility === "hidden") {
-                                        return NodeFilter.FILTER_REJECT;
-                                    }
-                                    return NodeFilter.FILTER_ACCEPT;
-                                }
-                            }
-                        );
-
-                        let content = [];
-                        while (walker.nextNode()) {
-                            const value = walker.currentNode.nodeValue.trim();
-                            if (value.length > 0) content.push(value);
-                        }
-                        return content.join("\\n");
-                    }
-                """)
+        times = decode(state[1].tobytes())
+        if app.config["ADHAN_CHECK"] and name in MOSQUES_BY_NAME:
+            adhan = AdhanTable([MOSQUES_BY_NAME[name]], day, 1, EASTERN,
+                               method=app.config["ADHAN_METHOD"], asr=app.config["ADHAN_ASR"])
+            times.update({field: value for field, value in adhan.starts(name, day).items() if value is not None})
+
+        return {
+            "mosque_name": name,
+            "date": day.isoformat(),
+            **{field: str(value) if value else None for field, value in times.items()},
+            "updated_at": None,
+            "estimated": True,
+        }
 
-                if not text or any(m in text.lower() for m in BLOCK_MARKERS):
-                    print(f"[Playwright] block page detected for {mosque['name']}, falling back to requests")
-                    await browser.close()
-                    return await asyncio.to_thread(fetch_via_requests, mosque)
+    def entries_for_date(entries, day):
+        """Swap in stored days for mosques whose current record is another day, and
+        estimates for mosques whose records stop short of it."""
+        block = DailySchedule.load(start=day, end=day, session=read_session())
+        stored = dict(zip(block.names, block.to_dicts()))
+        result = []
+        for entry in entries:
+            if entry["prayer_times"]["date"] == day.isoformat():
+                result.append(entry)
+            elif entry["name"] in stored:
+                result.append({**entry, "prayer_times": stored[entry["name"]]})
+            elif day.isoformat() > entry["prayer_times"]["date"]:
+                estimate = likely_times(entry["name"], day)
+                if estimate is not None:
+                    result.append({**entry, "prayer_times": estimate})
+        return result
+
+    def query_prayer_times(entries, args):
+        """Apply the /prayer-times query parameters. Returns (entries, next cursor or None)."""
+        names = {n.strip() for value in args.getlist("mosque") for n in value.split(",") if n.strip()}
+
+        prayer = args.get("prayer")
+        if prayer is not None and prayer not in PRAYERS + ["jummah"]:
+            raise ValueError(f"prayer must be one of {', '.join(PRAYERS + ['jummah'])}")
+
+        day = args.get("date")
+        if day is not None:
+            try:
+                day = date.fromisoformat(day)
+            except ValueError:
+                raise ValueError("date must be YYYY-MM-DD")
+
+        lat, lon, radius_km = float_arg(args, "lat"), float_arg(args, "lon"), float_arg(args, "radius_km")
+        if (lat is None) != (lon is None):
+            raise ValueError("lat and lon must be given together")
+
+        limit = args.get("limit")
+        if limit is not None:
+            if not limit.isdigit() or not 1 <= int(limit) <= MAX_PAGE_SIZE:
+                raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+            limit = int(limit)
+        offset = decode_cursor(args["cursor"]) if "cursor" in args else 0
+
+        if day is not None:
+            entries = entries_for_date(entries, day)
+        if names:
+            entries = [e for e in entries if e["name"] in names]
+
+        if lat is not None:
+            by_name = {e["name"]: e for e in entries}
+            # Without other filters only the mosques up to the end of this page are needed,
+            # plus room for any that have no times stored and get dropped below
+            k = None
+            if limit is not None and not names and day is None:
+                k = offset + limit + 1 + len(MOSQUES) - len(by_name)
+            entries = [
+                {**by_name[name], "distance_km": round(distance, 2)}
+                for distance, name in mosque_index.nearest(lat, lon, radius_km=radius_km, k=k)
+                if name in by_name
+            ]
+
+        if prayer is not None:
+            slots = JUMMAH_SLOTS if prayer == "jummah" else [prayer]
+            keep = {"mosque_name", "date", "updated_at"} | {f"{p}_{kind}" for p in slots for kind in ("start", "iqamah")}
+            entries = [
+                {**e, "prayer_times": {k: v for k, v in e["prayer_times"].items() if k in keep}}
+                for e in entries
+            ]
+
+        next_cursor = None
+        if limit is not None:
+            if len(entries) > offset + limit:
+                next_cursor = encode_cursor(offset + limit)
+            entries = entries[offset:offset + limit]
+        else:
+            entries = entries[offset:]
+
+        return entries, next_cursor
 
-                if len(TIME_PATTERN.findall(text)) < MIN_TIMES_EXPECTED:
-                    print(f"[Playwright] too few times in visible text for {mosque['name']} (carousel/hidden slides?), falling back to requests")
-                    await browser.close()
-                    return await asyncio.to_thread(fetch_via_requests, mosque)
+    # Define route to get all prayer times
+    @app.route("/prayer-times", methods=["GET"])
+    def get_prayer_times():
+        cached = prayer_times_cache.get()
+
+        if not request.args:
+            response = json_response(cached.body, cached.etag)
+        else:
+            try:
+                entries, next_cursor = query_prayer_times(cached.data, request.args)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            body = serialize(entries)
+            response = json_response(body, body_etag(body))
+            if next_cursor:
+                response.headers["X-Next-Cursor"] = next_cursor
+
+        # Answers If-None-Match with an empty 304
+        return response.make_conditional(request)
+
+    @app.route("/prayer-times/history", methods=["GET"])
+    def prayer_time_history():
+        """Every recorded version of each mosque's times from `start` to `end`
+        (default the last DEFAULT_HISTORY_DAYS days), streamed as JSON lines."""
+        args = request.args
+        try:
+            end = date.fromisoformat(args["end"]) if "end" in args else datetime.now(EASTERN).date()
+            start = date.fromisoformat(args["start"]) if "start" in args else end - timedelta(days=DEFAULT_HISTORY_DAYS)
+        except ValueError:
+            return jsonify({"error": "start and end must be YYYY-MM-DD"}), 400
+        if start > end:
+            return jsonify({"error": "start must not be after end"}), 400
+
+        names = {n.strip() for value in args.getlist("mosque") for n in value.split(",") if n.strip()} or None
+
+        def generate():
+            for name, day, recorded_at, row, changed in PrayerTimeHistory.versions(names, start, end, read_session()):
+                if recorded_at.tzinfo is None:
+                    recorded_at = recorded_at.replace(tzinfo=timezone.utc)
+                yield (
+                    f'{{"mosque_name": {app.json.dumps(name)}, "date": "{day.isoformat()}", '
+                    f'"recorded_at": "{recorded_at.isoformat()}", {", ".join(json_pairs(row[None, :])[0])}, '
+                    f'"changed": {app.json.dumps([FIELDS[i] for i in changed.tolist()])}}}\n'
+                )
 
-                await browser.close()
+        return app.response_class(stream_with_context(generate()), mimetype="application/x-ndjson")
 
-                return {
-                    **mosque,
-                    "raw_text": text
-                }
+    def load_schedules(day):
+        # Each mosque's current record, replaced by its stored day when there is one
+        schedules = {t.mosque_name: t for t in read_session().scalars(db.select(PrayerTimes))}
+        for row in DailySchedule.load(start=day, end=day, session=read_session()).days():
+            schedules[row.mosque_name] = row
+        return schedules
 
-        except Exception as e:
-            print(f"[Playwright] Failed for {mosque['name']}: {e}")
-            return None
-    # Asynchronous function to scrape all mosques in parallel
-    async def scrape_all_mosques():
-        tasks = [scrape_mosque_playwright(m) for m in MOSQUES]
-        return await asyncio.gather(*tasks)
-
-    # Helper function to parse and format time strings
-    def format_time(value):
-        if not value or value.strip().lower() in ["null", "none"] :
-            return None
+    timelines = TimelineCache(load_schedules)
 
+    @app.route("/next-prayer", methods=["GET"])
+    def next_prayer():
+        """The next iqamahs after time `t` (default now), optionally near lat/lon."""
+        args = request.args
         try:
-            dt = datetime.strptime(value.strip(), "%I:%M %p")
-            return dt.time()
+            if "t" in args:
+                after = datetime.fromisoformat(args["t"])
+                after = after.replace(tzinfo=EASTERN) if after.tzinfo is None else after.astimezone(EASTERN)
+            else:
+                after = datetime.now(EASTERN)
+
+            limit = int(args.get("limit", 1))
+            if not 1 <= limit <= MAX_NEXT_PRAYERS:
+                raise ValueError
+
+            lat, lon = float_arg(args, "lat"), float_arg(args, "lon")
+            radius_km = float_arg(args, "radius_km")
+            if (lat is None) != (lon is None):
+                return jsonify({"error": "lat and lon must be given together"}), 400
         except ValueError:
-            return None
-
-    # Normalize prayer times to ensure correct start/iqamah assignment
-    def normalize_prayer_times(prayer_json):
-        def normalize_pair(start, iqamah):
-            start_t, iqamah_t = format_time(start), format_time(iqamah)
-
-            # Case 1: both times present but out of order → fix
-            if start_t and iqamah_t and start_t >= iqamah_t:
-                # swap if clearly reversed
-                return iqamah, start
-
-            # Case 2: only one time given → assume iqamah
-            if start_t and not iqamah_t:
-                return None, start
-            if iqamah_t and not start_t:
-                return None, iqamah
-
-            # Case 3: both null → leave as is
-            return start, iqamah
-
-        # Apply normalization to all 5 daily prayers
-        for p in ["fajr", "zuhr", "asr", "maghrib", "isha"]:
-            start_key, iqamah_key = f"{p}_start", f"{p}_iqamah"
-            prayer_json[start_key], prayer_json[iqamah_key] = normalize_pair(
-                prayer_json.get(start_key), prayer_json.get(iqamah_key)
-            )
-
-        return prayer_json
-   
-    def clean_text(raw):
-        # Normalize all line breaks and tabs to spaces
-        text = re.sub(r"[\n\t]+", " ", raw)
-
-        # Collapse multiple spaces into one
-        text = re.sub(r"\s{2,}", " ", text)
-
-        # Ensure there is a space after punctuation like commas, colons, periods
-        text = re.sub(r"([,.:])([^\s])", r"\1 \2", text)
-
-        # Fix broken time splits like "2 :30" or "2\n:30" to "2:30"
-        text = re.sub(r"(\d{1,2})\s*:\s*(\d{2})", r"\1:\2", text)
-
-        # Ensure a space before AM/PM if missing
-        text = re.sub(r"(\d{1,2}:\d{2})([apAP][mM])", r"\1 \2", text)
-
-        # Fix split AM/PM markers like "10:30 p m" -> "10:30 pm"
-        text = re.sub(r"(\d{1,2}:\d{2})\s+([apAP])\s+([mM])\b", r"\1 \2\3", text)
-
-        return text
-
-    PROMPT_TEMPLATE = """
-                    Extract the prayer times from the following text.
-
-                    TODAY'S DATE: {today}
-
-                    - Some pages list prayer times for SEVERAL DAYS at once (a weekly/monthly calendar, or
-                    the same set of prayers repeated once per day). In that case, extract ONLY the block or
-                    row belonging to TODAY'S DATE above, and ignore every other date.
-                    - If the text repeats several similar day-blocks but none of them is labelled with a date
-                    you can match to today, use the FIRST block and treat the rest as duplicates to ignore.
-                    - If the text only covers a single day (no dates, or one date), ignore the two rules above
-                    and extract the times normally.
-
-                    - Prayer times must be copied exactly as written in the text (e.g., "10:00 PM" stays "10:00 PM").
-                    - Do not round, adjust, or guess times.
-                    - If multiple times are present for the same prayer, still apply the earliest= start, latest= iqamah rule,
-                    but the values themselves must be identical to the original text. 
-                    - Prayer names may have different spellings (e.g., "Fajr" → "Fajar", "Maghrib" → "Magrib").
-                    - {{prayer}}_start is also referred as *adhan* / *begins* / *khutbah* / *azan* etc. 
-                    - {{prayer}}_iqamah refers to the later congregational prayer time (*salah* / *salat*).
-                    - If multiple times are listed for the same prayer, use the **earliest** as {{prayer}}_start
-                    and the **latest** as {{prayer}}_iqamah.
-                    - ⚠️ If **only one time** is mentioned for a prayer, assign the value to {{prayer}}_iqamah and set
-                    {{prayer}}_start = null. 
-                    - ⚠️ Sometimes times are joined directly with words without spaces (e.g., "Khutbah1:30pm" or "Iqamah2:00pm").
-                    In such cases, you must still detect and extract the time exactly as written ("1:30pm", "2:00pm").
-                     Do not ignore times just because they are attached to words.
-                    - ⚠️ Sometimes times are broken by newlines or irregular spacing (e.g.,
-                    "6\n:30\npm" should be understood as "6:30 pm").
-                    You must normalize and extract the correct time string exactly as written, without losing AM/PM.
-                    - If you can't find a valid time for a prayer, (ex: sometimes Maghrib times are represented as 'sunset' 
-                    in websites) set the value = null.
-                    
-                    - Only move on to jummah timings once you have completed evaluating values for fajr, zuhr, asr, maghrib and isha.
-                    - Jummmah (Friday) prayer can have up to 3 slots: jummah1, jummah2, jummah3.
-                    - Jummah (Friday) prayer times:
-                        - After assigning Fajr, Zuhr, Asr, Maghrib, and Isha, re-check the text for any times between 12:00 PM and 5:00 PM.
-                        - ALL times in that range, near other jummah timings, must be treated as Jummah times, even if not labeled with the word "Jummah" or
-                        it's alternate spellings.
-                        - PRIORITY RULE — Numbered slot labels (apply BEFORE the count-based pairing rule below):
-                            * If each Jummah time is accompanied by an explicit numbered slot label such as
-                              "Jumuah 1" / "Jumuah 2" / "Jumuah 3",
-                              "Jamat 1" / "Jamat 2" / "Jamat 3",
-                              "1st Jamat" / "2nd Jamat" / "3rd Jamat",
-                              "Jumu'ah 1" / "1st Jumu'ah" / etc.,
-                              then each labeled time is its OWN iqamah. Map directly:
-                                - slot-1 label → jummah1_iqamah
-                                - slot-2 label → jummah2_iqamah
-                                - slot-3 label → jummah3_iqamah
-                              Set jummahN_start = null UNLESS that time is also explicitly preceded by
-                              "Khutbah" / "Adhan" / "Azan" / "Begins" (in which case the start/iqamah pairing applies for that single slot).
-                            * SKIP the "2–5 times → pairs" distribution rule entirely when numbered slot labels are present.
-                        - Count-based pairing (only applies when numbered slot labels are NOT present):
-                            * 1 time → jummah1_iqamah only (start = null).
-                            * 2 to 5 times → assign left to right as start/iqamah pairs; if odd (3) or (5), last one is iqamah only.
-                            * 6 times → assign as 3 full start/iqamah pairs.
-                        - Within a pair, the earlier = start, later = iqamah.
-                        - If no times exist in the range, set all Jummah fields to null.
-                        - If a Jummah slot is written as Khutbah X:XX followed by Iqamah Y:YY and there can be commas not seperated by spaces, then 
-                        Khutbah time must always be the start and Iqamah time the iqamah, even if the text is irregularly formatted.
-                        - Special case for jummah (do NOT output this example, it is only to guide you):
-                        - If the input text contains:
-                            Fajr 5:08 AM 6:00 AM  
-                            Dhuhr 1:19 PM 2:00 PM  
-                            Asr 6:05 PM 6:45 PM  
-                            Maghrib 8:04 PM 8:08 PM  
-                            Isha 9:30 PM 10:00 PM  
-                            1:45 PM 
-                            Jumu'ah 
-                            2:45 PM 
-                            Jumu'ah 
-                            3:45 PM 
-                            Jumu'ah 
-                            6:33 AM 
-                            8:04 PM
-                        - Then the correct output must include:
-                            "jummah1_iqamah": "1:45 PM",  
-                            "jummah2_iqamah": "2:45 PM",  
-                            "jummah3_iqamah": "3:45 PM"
-                        - Just notice how I considered 1:45 PM as a valid jummah time, ONLY because it's in jummah time range, near other jummah timings,
-                        even though it's not tied to a specific jummah word following the pattern.
-                        * If a line contains both "Khutbah" and "Iqamah" times, always map:
-                        - The Khutbah time → jummahN_start
-                        - The Iqamah time → jummahN_iqamah
-                        * This rule applies even if the Khutbah time is joined to the word (e.g., "Khutbah1:30pm")
-                            or split across lines (e.g., "1\n:30 pm").
-                        * Do not skip Khutbah times. They must always be extracted as the start time.
-
-                    Return ONLY valid JSON in this exact schema, no explanation:
-
-                    {{
-                        "fajr_start": "HH:MM AM/PM or null",
-                        "fajr_iqamah": "...",
-                        "zuhr_start": "...",
-                        "zuhr_iqamah": "...",
-                        "asr_start": "...",
-                        "asr_iqamah": "...",
-                        "maghrib_start": "...",
-                        "maghrib_iqamah": "...",
-                        "isha_start": "...",
-                        "isha_iqamah": "...",
-                        "jummah1_start": "...",
-                        "jummah1_iqamah": "...",
-                        "jummah2_start": "...",
-                        "jummah2_iqamah": "...",
-                        "jummah3_start": "...",
-                        "jummah3_iqamah": "..."
-                    }}
-
-                    Text:
-                    ---
-                    {cleaned_text}
-                    ---
-                    """
-
-    async def process_mosque(result):
-        """Hash-check, call LLM, and return a PrayerTimes record or None."""
-        cleaned_text = clean_text(result["raw_text"])
-
-        content_hash = hashlib.sha256(cleaned_text.encode("utf-8")).hexdigest()
-        existing = db.session.get(PrayerTimes, result["name"])
-        if existing and existing.raw_text_hash == content_hash:
-            print(f"[skip] {result['name']} unchanged, skipping LLM")
-            return None
+            return jsonify({"error": f"t must be an ISO datetime, limit 1-{MAX_NEXT_PRAYERS}, lat/lon/radius_km numbers"}), 400
+
+        names = {n.strip() for value in args.getlist("mosque") for n in value.split(",") if n.strip()} or None
+        distances = {}
+        if lat is not None:
+            nearby = mosque_index.nearest(lat, lon, radius_km=radius_km or DEFAULT_RADIUS_KM)
+            distances = {name: round(distance, 2) for distance, name in nearby}
+            names = set(distances) & names if names is not None else set(distances)
+
+        # Past the day's last iqamah, carry on into tomorrow
+        found = []
+        day, minute = after.date(), after.hour * 60 + after.minute
+        for _ in range(2):
+            for name, prayer, iqamah in timelines.get(day).after(minute, names, limit - len(found)):
+                found.append({
+                    "mosque_name": name,
+                    "prayer": prayer,
+                    "date": day.isoformat(),
+                    "iqamah": str(iqamah),
+                    **({"distance_km": distances[name]} if name in distances else {}),
+                })
+            if len(found) == limit:
+                break
+            day, minute = day + timedelta(days=1), 0
+
+        response = jsonify({"after": after.isoformat(timespec="minutes"), "next": found})
+        response.headers["Cache-Control"] = "public, max-age=60"
+        return response
+
+    # Scrapes commit a prayer_time_events row; every web process tails that table
+    broker = EventBroker(app, poll_interval=app.config["EVENT_POLL_INTERVAL"])
+
+    def invalidate_read_caches(event=None):
+        prayer_times_cache.invalidate()
+        timelines.invalidate()
+
+    broker.on_event(invalidate_read_caches)
+
+    def sse(event_id, payload):
+        return f"id: {event_id}\nevent: update\ndata: {payload}\n\n"
+
+    @app.route("/prayer-times/stream", methods=["GET"])
+    def stream_prayer_times():
+        """Server-Sent Events: one `update` per scrape commit, carrying only changed fields per mosque."""
+        q = broker.subscribe()
+
+        # A reconnecting EventSource sends the id of the last event it saw
+        last_id = request.headers.get("Last-Event-ID", "")
+        backlog = []
+        if last_id.isdigit():
+            backlog = [(e.id, e.payload) for e in broker.backlog(int(last_id))]
+
+        heartbeat = app.config["STREAM_HEARTBEAT"]
+
+        def generate():
+            sent = int(last_id) if last_id.isdigit() else 0
+            try:
+                yield "retry: 10000\n\n"
+                for event_id, payload in backlog:
+                    sent = event_id
+                    yield sse(event_id, payload)
+
+                while True:
+                    try:
+                        event = q.get(timeout=heartbeat)
+                    except queue.Empty:
+                        yield ": keep-alive\n\n"
+                        continue
+
+                    if event is RESYNC:
+                        yield "event: resync\ndata: {}\n\n"
+                        return
+                    if event.id > sent:
+                        sent = event.id
+                        yield sse(event.id, event.payload)
+            finally:
+                broker.unsubscribe(q)
+
+        return app.response_class(
+            generate(),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
-        today = datetime.now(EASTERN)
-        # Day is built without strftime's zero-padding so it matches how sites write dates.
-        today_label = f"{today:%A, %B} {today.day}, {today:%Y}"
-        prompt = PROMPT_TEMPLATE.format(cleaned_text=cleaned_text, today=today_label)
+    @app.route("/health", methods=["GET"])
+    def health():
+        return {"status": "ok"}, 200
 
-        llm_response_json = await asyncio.to_thread(call_llm, prompt)
-        if not llm_response_json:
-            return None
+    @app.route("/stats", methods=["GET"])
+    def stats():
+        return jsonify({"llm_cache": table_stats(read_session())})
 
-        normalized_llm_response = normalize_prayer_times(llm_response_json)
-
-        if result.get("name") == "Masjid Al-Abedeen":
-            with open("prompt_abedeen.txt", "w", encoding="utf-8") as f:
-                f.write(prompt)
-
-        daily_prayer_times = {
-            "fajr_start": format_time(normalized_llm_response["fajr_start"]),
-            "fajr_iqamah": format_time(normalized_llm_response["fajr_iqamah"]),
-            "zuhr_start": format_time(normalized_llm_response["zuhr_start"]),
-            "zuhr_iqamah": format_time(normalized_llm_response["zuhr_iqamah"]),
-            "asr_start": format_time(normalized_llm_response["asr_start"]),
-            "asr_iqamah": format_time(normalized_llm_response["asr_iqamah"]),
-            "maghrib_start": format_time(normalized_llm_response["maghrib_start"]),
-            "maghrib_iqamah": format_time(normalized_llm_response["maghrib_iqamah"]),
-            "isha_start": format_time(normalized_llm_response["isha_start"]),
-            "isha_iqamah": format_time(normalized_llm_response["isha_iqamah"]),
-        }
+    @app.route("/metrics", methods=["GET"])
+    def prometheus_metrics():
+        body, content_type = metrics.render()
+        return body, 200, {"Content-Type": content_type}
 
-        if all(v is None for v in daily_prayer_times.values()):
-            time_count = len(TIME_PATTERN.findall(cleaned_text))
-            print(
-                f"[reject] {result['name']} LLM returned only nulls, keeping existing data "
-                f"(input: {len(cleaned_text)} chars, {time_count} time strings detected)"
-            )
-            return None
+    # Per-IP limit on submissions, so a burst can't tie up the workers
+    request_limiter = ClientLimiter(app.config["MOSQUE_REQUESTS_PER_MINUTE"])
 
-        return PrayerTimes(
-            mosque_name=result["name"],
-            date=today.date(),
-            **daily_prayer_times,
-            jummah1_start=format_time(normalized_llm_response["jummah1_start"]),
-            jummah1_iqamah=format_time(normalized_llm_response["jummah1_iqamah"]),
-            jummah2_start=format_time(normalized_llm_response["jummah2_start"]),
-            jummah2_iqamah=format_time(normalized_llm_response["jummah2_iqamah"]),
-            jummah3_start=format_time(normalized_llm_response["jummah3_start"]),
-            jummah3_iqamah=format_time(normalized_llm_response["jummah3_iqamah"]),
-            raw_text_hash=content_hash,
-            updated_at=datetime.now(timezone.utc)
-        )
+    @app.route("/mosque-request", methods=["POST"])
+    def submit_mosque_request():
+        """Queue a mosque request; the worker delivers it to the sheet webhook."""
+        if not app.config["GSHEET_WEBHOOK_URL"]:
+            app.logger.error("GSHEET_WEBHOOK_URL is not configured")
+            return jsonify({"error": "submissions are not configured"}), 503
 
-    async def run_all():
-        """Scrape all mosques and process LLM calls, both in parallel."""
-        scraped_results = await scrape_all_mosques()
-        valid_results = [r for r in scraped_results if r]
-        processed = await asyncio.gather(*[process_mosque(r) for r in valid_results])
-        return [r for r in processed if r is not None]
+        # The client's address, as resolved by ProxyFix
+        submitter_ip = request.remote_addr
+        allowed, retry_after = request_limiter.allow(submitter_ip)
+        if not allowed:
+            response = jsonify({"error": "too many requests"})
+            response.headers["Retry-After"] = str(max(1, round(retry_after)))
+            return response, 429
 
-    # Main function called by APScheduler
-    def scrape_and_update():
-        with app.app_context():
-            print("Scrape job running...")
+        data = request.get_json(silent=True) or {}
+        mosque_name = (data.get("mosque_name") or "").strip()
+        additional_info = (data.get("additional_info") or "").strip()
 
-            records = asyncio.run(run_all())
+        if not mosque_name:
+            return jsonify({"error": "mosque_name is required"}), 400
+        if len(mosque_name) > 200 or len(additional_info) > 2000:
+            return jsonify({"error": "field too long"}), 400
 
-            for record in records:
-                db.session.merge(record)
+        db.session.add(MosqueRequest(
+            dedupe_key=dedupe_key(mosque_name, additional_info, submitter_ip),
+            mosque_name=mosque_name,
+            additional_info=additional_info,
+            submitter_ip=submitter_ip,
+        ))
+        try:
             db.session.commit()
+        except IntegrityError:
+            # Already queued (or sent); accepting it again changes nothing
+            db.session.rollback()
 
-            print("Scrape job finished: data updated.")
+        return jsonify({"ok": True}), 202
 
-    # --- Scheduler setup ---
     with app.app_context():
         db.create_all()
 
-    scheduler = BackgroundScheduler(timezone=EASTERN)
-    scheduler.add_job(
-        func=scrape_and_update,
-        trigger="cron",
-        hour=3,
-        minute=0,
-        id="scrape_and_update",
-        max_instances=1,
-        coalesce=True,
-        misfire_grace_time=3600,
-    )
-
-    if not app.debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
-        scheduler.start()
-        atexit.register(lambda: scheduler.shutdown())
+    # Scraping runs in worker.py; web processes only read, and hear about
+    # new data through the event broker.
+    broker.start()
 
     return app
 
@@ -0,0 +1,176 @@
+from datetime import datetime, time, timedelta
+
+import numpy as np
+
+from parsing import PRAYERS
+
+# How far below the horizon the sun is at Fajr and Isha, in degrees, for the
+# common calculation conventions. Makkah sets Isha a fixed time after Maghrib.
+METHODS = {
+    "ISNA": {"fajr": 15.0, "isha": 15.0},
+    "MWL": {"fajr": 18.0, "isha": 17.0},
+    "Egypt": {"fajr": 19.5, "isha": 17.5},
+    "Karachi": {"fajr": 18.0, "isha": 18.0},
+    "Makkah": {"fajr": 18.5, "isha_minutes": 90},
+}
+
+# Asr begins when a shadow is this many times its object's height, plus its noon length
+ASR_FACTORS = {"standard": 1, "hanafi": 2}
+
+# Sunrise and sunset: the sun's upper edge on the horizon, with refraction
+SUNSET_ANGLE = 0.833
+
+# Local solar hour each prayer is near, at which the sun's position is taken
+SOLAR_HOURS = {"fajr": 5, "zuhr": 12, "asr": 13, "maghrib": 18, "isha": 18}
+
+J2000 = 2451545.0
+MINUTES_PER_DAY = 24 * 60
+
+
+def sun_position(d):
+    """Declination (degrees) and equation of time (hours) at `d` days after J2000."""
+    g = np.radians((357.529 + 0.98560028 * d) % 360)
+    q = (280.459 + 0.98564736 * d) % 360
+    ecliptic = np.radians(q + 1.915 * np.sin(g) + 0.020 * np.sin(2 * g))
+    obliquity = np.radians(23.439 - 0.00000036 * d)
+
+    right_ascension = np.degrees(np.arctan2(np.cos(obliquity) * np.sin(ecliptic), np.cos(ecliptic))) / 15 % 24
+    equation = (q / 15 - right_ascension + 12) % 24 - 12
+    declination = np.degrees(np.arcsin(np.sin(obliquity) * np.sin(ecliptic)))
+    return declination, equation
+
+
+def hour_angle(altitude, latitude, declination):
+    """Hours between solar noon and the sun standing at `altitude` degrees; NaN
+    where it never gets there that day (Fajr and Isha far north in summer)."""
+    lat, dec = np.radians(latitude), np.radians(declination)
+    cos_h = (np.sin(np.radians(altitude)) - np.sin(dec) * np.sin(lat)) / (np.cos(dec) * np.cos(lat))
+    with np.errstate(invalid="ignore"):
+        return np.degrees(np.arccos(cos_h)) / 15
+
+
+def start_times(latitudes, longitudes, days, tz, method="ISNA", asr="standard"):
+    """Adhan times for every location on every day, in one vectorized pass.
+
+    Returns {prayer: array of shape (locations, days)} in minutes past local
+    midnight in `tz`, NaN where the sun never reaches the prayer's angle.
+    """
+    angles = METHODS[method]
+    lat = np.asarray(latitudes, dtype=float)[:, None]
+    lon = np.asarray(longitudes, dtype=float)[:, None]
+    julian = np.array([day.toordinal() + 1721424.5 for day in days])[None, :]
+    utc_offset = np.array([
+        datetime.combine(day, time(12), tz).utcoffset() / timedelta(hours=1) for day in days
+    ])[None, :]
+
+    # The sun moves little in the hours between places, so its position is taken
+    # once per day for all of them, at their mean longitude; only the hour angles
+    # are worked out for every place and day
+    mean_lon = float(lon.mean()) if lon.size else 0.0
+
+    def at(prayer):
+        # Solar noon in UTC hours, and the declination, around the prayer's time
+        declination, equation = sun_position(julian - J2000 + (SOLAR_HOURS[prayer] - mean_lon / 15) / 24)
+        return 12 - equation - lon / 15, declination
+
+    noon, declination = at("fajr")
+    hours = {"fajr": noon - hour_angle(-angles["fajr"], lat, declination)}
+
+    hours["zuhr"], _ = at("zuhr")
+
+    noon, declination = at("asr")
+    shadow = ASR_FACTORS[asr] + np.tan(np.radians(np.abs(lat - declination)))
+    hours["asr"] = noon + hour_angle(np.degrees(np.arctan(1 / shadow)), lat, declination)
+
+    noon, declination = at("maghrib")
+    hours["maghrib"] = noon + hour_angle(-SUNSET_ANGLE, lat, declination)
+
+    if "isha_minutes" in angles:
+        hours["isha"] = hours["maghrib"] + angles["isha_minutes"] / 60
+    else:
+        noon, declination = at("isha")
+        hours["isha"] = noon + hour_angle(-angles["isha"], lat, declination)
+
+    return {prayer: (hours[prayer] + utc_offset) * 60 % MINUTES_PER_DAY for prayer in PRAYERS}
+
+
+def minutes_apart(a, b):
+    """Minutes between two times of day, the short way around midnight."""
+    diff = abs((a.hour * 60 + a.minute) - (b.hour * 60 + b.minute))
+    return min(diff, MINUTES_PER_DAY - diff)
+
+
+class AdhanTable:
+    """Computed adhan times for a set of mosques over a run of days.
+
+    Mosques without coordinates are left out. A mosque may set its own
+    "calculation_method" and "asr" rule; mosques sharing a convention are
+    computed together, so a year for thousands of mosques is a few array passes.
+    """
+
+    def __init__(self, mosques, start, days, tz, method="ISNA", asr="standard"):
+        self.start = start
+        self.days = days
+        self._rows = {}
+
+        groups = {}
+        for mosque in mosques:
+            if mosque.get("latitude") is None or mosque.get("longitude") is None:
+                continue
+            key = (mosque.get("calculation_method", method), mosque.get("asr", asr))
+            groups.setdefault(key, []).append(mosque)
+
+        dates = [start + timedelta(days=i) for i in range(days)]
+        for (group_method, group_asr), members in groups.items():
+            minutes = start_times(
+                [m["latitude"] for m in members],
+                [m["longitude"] for m in members],
+                dates,
+                tz,
+                group_method,
+                group_asr,
+            )
+            for row, mosque in enumerate(members):
+                self._rows[mosque["name"]] = (minutes, row)
+
+    def starts(self, name, day):
+        """{"fajr_start": time, ...} for one mosque and day, rounded to the minute,
+        or None if the mosque or day isn't covered. Prayers the sun never reaches
+        that day are None."""
+        index = (day - self.start).days
+        if name not in self._rows or not 0 <= index < self.days:
+            return None
+
+        minutes, row = self._rows[name]
+        result = {}
+        for prayer in PRAYERS:
+            value = minutes[prayer][row, index]
+            if np.isnan(value):
+                result[f"{prayer}_start"] = None
+            else:
+                total = int(round(value)) % MINUTES_PER_DAY
+                result[f"{prayer}_start"] = time(total // 60, total % 60)
+        return result
+
+    def check(self, name, day, times, tolerance):
+        """Fill in missing *_start times from the computed ones, and find those
+        more than `tolerance` minutes off. Published times are never replaced: a
+        mosque may follow another convention than the one calculated.
+
+        Returns the filled-in times and the fields that were off, or (times, [])
+        unchanged if the mosque or day isn't covered.
+        """
+        expected = self.starts(name, day)
+        if expected is None:
+            return times, []
+
+        checked = dict(times)
+        off = []
+        for field, computed in expected.items():
+            if computed is None:
+                continue
+            if times[field] is None:
+                checked[field] = computed
+            elif minutes_apart(times[field], computed) > tolerance:
+                off.append(field)
+        return checked, off
@@ -0,0 +1,6 @@
+"""Offline benchmark for the scrape pipeline: python -m bench --help
+
+Mosque pages are replayed from bench/snapshots (recorded with --record) or
+generated, served from a local HTTP stand-in together with a fake OpenAI chat
+endpoint, so runs are reproducible and cost nothing.
+"""
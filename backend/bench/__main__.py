@@ -0,0 +1,201 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import resource
+import statistics
+import tempfile
+import time
+
+import httpx
+from flask import Flask
+
+from bench.pages import load_snapshot, snapshot_path, synthetic_page
+from bench.standin import StandIn
+from browser_pool import BrowserPool
+from config import Config
+from database import init_db
+from models.prayerTimes import db
+from models.scrapeRun import ScrapeRun
+from mosques import MOSQUES
+from profiling import STAGES
+import scraper
+
+
+def bench_app(db_path, args):
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path}",
+        RULE_EXTRACTORS=not args.no_extractors,
+        LLM_BATCH_SIZE=args.batch_size,
+        LLM_REQUESTS_PER_MINUTE=1_000_000,
+        LLM_TOKENS_PER_MINUTE=1_000_000_000,
+        LLM_RUN_TOKEN_BUDGET=0,
+        SCRAPE_RUNS_KEEP_DAYS=0,
+    )
+    init_db(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def mosque_set(standin, args):
+    """Benchmark mosques, all pointing at the stand-in. The registry's mosques
+    replay their recorded snapshots; anything without one gets a synthetic page."""
+    mosques = []
+    if args.mosques:
+        entries = [{"name": f"Bench Mosque {i}"} for i in range(args.mosques)]
+    else:
+        entries = MOSQUES
+
+    for i, entry in enumerate(entries):
+        js_rendered = (i % 100) < args.js_share * 100
+        page = load_snapshot(entry["name"]) if not args.mosques else None
+        standin.pages[str(i)] = page or synthetic_page(i, js_rendered=js_rendered)
+        mosques.append({
+            **{k: v for k, v in entry.items() if k != "website"},
+            "name": entry["name"],
+            "website": standin.page_url(i),
+        })
+    return mosques
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run_report(app, elapsed, count, standin_counts):
+    with app.app_context():
+        latest = ScrapeRun.query.order_by(ScrapeRun.id.desc()).first()
+        rows = ScrapeRun.query.filter_by(run_id=latest.run_id).all() if latest else []
+
+    stages = {}
+    for stage in STAGES:
+        seconds = [getattr(row, f"{stage}_seconds") for row in rows if getattr(row, f"{stage}_seconds") is not None]
+        if seconds:
+            stages[stage] = {
+                "n": len(seconds),
+                "p50": round(statistics.median(seconds), 4),
+                "p95": round(percentile(seconds, 0.95), 4),
+                "max": round(max(seconds), 4),
+            }
+
+    paths = {}
+    for row in rows:
+        paths[row.path or row.outcome] = paths.get(row.path or row.outcome, 0) + 1
+
+    return {
+        "mosques": count,
+        "seconds": round(elapsed, 3),
+        "mosques_per_second": round(count / elapsed, 2) if elapsed else None,
+        "paths": paths,
+        "prompt_tokens": round(sum(row.prompt_tokens or 0 for row in rows)),
+        "completion_tokens": round(sum(row.completion_tokens or 0 for row in rows)),
+        "served": dict(standin_counts),
+        "stages": stages,
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux; children covers the largest finished child (e.g. the browser)
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+def print_report(number, report):
+    print(f"\nRun {number}: {report['mosques']} mosques in {report['seconds']}s "
+          f"({report['mosques_per_second']} mosques/s)")
+    print(f"  paths: {report['paths']}")
+    print(f"  served: {report['served']}, LLM tokens: {report['prompt_tokens']} prompt / "
+          f"{report['completion_tokens']} completion")
+    print(f"  {'stage':<12}{'n':>6}{'p50 s':>10}{'p95 s':>10}{'max s':>10}")
+    for stage, values in report["stages"].items():
+        print(f"  {stage:<12}{values['n']:>6}{values['p50']:>10}{values['p95']:>10}{values['max']:>10}")
+
+
+def benchmark(args):
+    with StandIn({}, llm_latency=args.llm_latency, llm_jitter=args.llm_jitter, seed=args.seed) as standin, \
+            tempfile.TemporaryDirectory() as tmp:
+        os.environ["OPENAI_BASE_URL"] = f"{standin.url}/v1"
+        os.environ["OPENAI_API_KEY"] = "bench"
+
+        app = bench_app(os.path.join(tmp, "bench.db"), args)
+        mosques = mosque_set(standin, args)
+        reports = []
+
+        for number in range(1, args.runs + 1):
+            if number > 1 and args.change_share:
+                # Republish part of the pages so warm runs also see some changes
+                for key in list(standin.pages)[: int(len(standin.pages) * args.change_share)]:
+                    standin.pages[key] = standin.pages[key].replace("</body>", f"<p>Update {number}</p></body>")
+
+            before = dict(standin.counts)
+            output = io.StringIO()
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(output) if args.quiet else contextlib.nullcontext():
+                scraper.scrape_and_update(app, force=True, mosques=mosques)
+            elapsed = time.perf_counter() - started
+
+            served = {k: standin.counts[k] - before[k] for k in standin.counts}
+            report = run_report(app, elapsed, len(mosques), served)
+            reports.append(report)
+            print_report(number, report)
+
+        result = {"args": vars(args), "runs": reports, "peak_rss_mb": peak_rss_mb()}
+        print(f"\nPeak RSS: {result['peak_rss_mb']['self']} MB (largest child {result['peak_rss_mb']['children']} MB)")
+
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2)
+        return result
+
+
+async def record(app):
+    """Save each registry mosque's current page as its snapshot."""
+    os.makedirs(os.path.dirname(snapshot_path("x")), exist_ok=True)
+    with app.app_context():
+        async with httpx.AsyncClient(timeout=20, follow_redirects=True) as http, BrowserPool() as pool:
+            for mosque in MOSQUES:
+                result = await scraper.scrape_mosque(mosque, None, http, pool)
+                if result is None:
+                    print(f"[record] {mosque['name']}: no usable page")
+                    continue
+                with open(snapshot_path(mosque["name"]), "w", encoding="utf-8") as f:
+                    f.write(result["raw_html"])
+                print(f"[record] {mosque['name']}: {len(result['raw_html'])} bytes via {result['fetch_strategy']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Benchmark the scrape pipeline offline.")
+    parser.add_argument("--record", action="store_true", help="save the registry's live pages as snapshots and exit")
+    parser.add_argument("--mosques", type=int, default=0, help="synthetic mosques to generate (default: the registry)")
+    parser.add_argument("--runs", type=int, default=2, help="runs over the same pages; the first is cold")
+    parser.add_argument("--change-share", type=float, default=0.0, help="share of pages changed before each warm run")
+    parser.add_argument("--js-share", type=float, default=0.0, help="share of synthetic pages that need a browser")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds the fake LLM takes per call")
+    parser.add_argument("--llm-jitter", type=float, default=0.1, help="+/- seconds of seeded latency jitter")
+    parser.add_argument("--batch-size", type=int, default=Config.LLM_BATCH_SIZE)
+    parser.add_argument("--no-extractors", action="store_true", help="send every page to the LLM")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quiet", action="store_true", help="hide the pipeline's own log lines")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    if args.record:
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(record(bench_app(os.path.join(tmp, "record.db"), args)))
+        return
+
+    benchmark(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import json
+import os
+import random
+import re
+
+SNAPSHOTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots")
+
+PRAYERS = ("Fajr", "Dhuhr", "Asr", "Maghrib", "Isha")
+
+NOISE = (
+    "Support your masjid: donate online or at the front desk.",
+    "Weekend school registration is now open for the fall term.",
+    "Sisters' halaqa every Tuesday after Isha in the main hall.",
+    "Parking is available behind the building; please do not block the neighbours.",
+    "Volunteer for the food bank drive this Saturday.",
+    "Matrimonial services by appointment only.",
+)
+
+
+def slug(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def snapshot_path(name):
+    return os.path.join(SNAPSHOTS, f"{slug(name)}.html")
+
+
+def load_snapshot(name):
+    path = snapshot_path(name)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def _time(minutes):
+    hours, minutes = divmod(minutes % (24 * 60), 60)
+    return f"{(hours - 1) % 12 + 1}:{minutes:02d} {'AM' if hours < 12 else 'PM'}"
+
+
+def _schedule(rng):
+    starts = [rng.randint(300, 390), rng.randint(770, 800), rng.randint(950, 1010),
+              rng.randint(1080, 1140), rng.randint(1170, 1260)]
+    return [(prayer, _time(start), _time(start + rng.choice((10, 15, 20, 30))))
+            for prayer, start in zip(PRAYERS, starts)]
+
+
+def _noise(rng, paragraphs):
+    return "\n".join(f"<p>{rng.choice(NOISE)}</p>" for _ in range(paragraphs))
+
+
+def _row_table(rng, schedule):
+    rows = "".join(f"<tr><td>{p}</td><td>{s}</td><td>{i}</td></tr>" for p, s, i in schedule)
+    return f"<table><tr><th>Prayer</th><th>Begins</th><th>Iqamah</th></tr>{rows}</table>"
+
+
+def _labelled_divs(rng, schedule):
+    return "".join(f"<div class='prayer'><span>{p}</span><span>{s}</span><span>{i}</span></div>" for p, s, i in schedule)
+
+
+def _weekly_blocks(rng, schedule):
+    # Several unlabelled days: no extractor is confident, so the page goes to the LLM
+    days = []
+    for day in ("Monday", "Tuesday", "Wednesday"):
+        lines = "".join(f"<div>{p} {i}</div>" for p, _, i in schedule)
+        days.append(f"<h3>{day}</h3>{lines}")
+    return "".join(days)
+
+
+LAYOUTS = (_row_table, _labelled_divs, _weekly_blocks)
+
+
+def synthetic_page(index, js_rendered=False, noise=40):
+    """A deterministic mosque homepage: noise around a prayer-times widget in
+    one of a few layouts. A JS-rendered page carries its content in a script,
+    so only a browser sees the times."""
+    rng = random.Random(index)
+    schedule = _schedule(rng)
+    layout = LAYOUTS[index % len(LAYOUTS)]
+    content = f"<nav>Home About Donate Events</nav>{_noise(rng, noise)}{layout(rng, schedule)}{_noise(rng, noise)}"
+
+    if js_rendered:
+        return (
+            "<html><body><div id='app'>Loading...</div>"
+            f"<script>document.getElementById('app').innerHTML = {json.dumps(content)};</script>"
+            "</body></html>"
+        )
+    return f"<html><head><title>Masjid {index}</title></head><body>{content}</body></html>"
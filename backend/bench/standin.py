@@ -0,0 +1,141 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from parsing import DAILY_FIELDS, FIELDS, TIME_PATTERN
+
+BATCH_ENTRY = re.compile(r"=== (m\d+) ===\n(.*?)\n=== end \1 ===", re.DOTALL)
+
+
+def fake_extraction(text):
+    """Deterministic stand-in for the model: the page's times, in order, fill the
+    daily fields; jummah is left empty."""
+    fields = dict.fromkeys(FIELDS)
+    for field, value in zip(DAILY_FIELDS, TIME_PATTERN.findall(text)):
+        fields[field] = value
+    return fields
+
+
+def fake_completion(prompt):
+    entries = BATCH_ENTRY.findall(prompt)
+    if entries:
+        content = {key: fake_extraction(text) for key, text in entries}
+        completion_tokens = 150 * len(entries)
+    else:
+        text = prompt.split("Text:", 1)[-1]
+        content = fake_extraction(text)
+        completion_tokens = 150
+    return {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "bench",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": json.dumps(content)},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": completion_tokens,
+            "total_tokens": len(prompt) // 4 + completion_tokens,
+        },
+    }
+
+
+class StandIn:
+    """Local HTTP server for the benchmark.
+
+    GET /m/<key> serves a mosque page, with an ETag so revalidation gets 304s.
+    POST /v1/chat/completions answers like OpenAI after `llm_latency` seconds
+    (+/- `llm_jitter`, seeded so runs repeat). Counts what it served.
+    """
+
+    def __init__(self, pages, llm_latency=0.0, llm_jitter=0.0, seed=0):
+        self.pages = pages
+        self.llm_latency = llm_latency
+        self.llm_jitter = llm_jitter
+        self.counts = {"page": 0, "not_modified": 0, "llm": 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def page_url(self, key):
+        return f"{self.url}/m/{key}"
+
+    def _count(self, kind):
+        with self._lock:
+            self.counts[kind] += 1
+
+    def _llm_delay(self):
+        with self._lock:
+            return max(0.0, self.llm_latency + self._rng.uniform(-self.llm_jitter, self.llm_jitter))
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                key = self.path.split("?", 1)[0].removeprefix("/m/")
+                page = standin.pages.get(key)
+                if page is None:
+                    self._send(404)
+                    return
+
+                body = page.encode("utf-8")
+                etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    standin._count("not_modified")
+                    self._send(304, headers={"ETag": etag})
+                    return
+
+                standin._count("page")
+                self._send(200, body, headers={"ETag": etag})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    self._send(404, b"{}", "application/json")
+                    return
+
+                standin._count("llm")
+                time.sleep(standin._llm_delay())
+                prompt = request["messages"][-1]["content"]
+                self._send(200, json.dumps(fake_completion(prompt)).encode("utf-8"), "application/json")
+
+        return Handler
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,201 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+from playwright.async_api import async_playwright
+from playwright_stealth import Stealth
+
+CHROMIUM_ARGS = [
+    "--headless=new",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-blink-features=AutomationControlled",
+    "--disable-features=IsolateOrigins,site-per-process"
+]
+
+CONTEXT_OPTIONS = {
+    "user_agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
+    "locale": "en-US",
+    "timezone_id": "America/Toronto",
+    "viewport": {"width": 1920, "height": 1080},
+    "extra_http_headers": {
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.9",
+        "Accept-Encoding": "gzip, deflate, br",
+        "DNT": "1",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1"
+    },
+}
+
+# Requests a prayer-times page never needs. Stylesheets are kept: without them
+# hidden carousel slides and tabs would read as visible text.
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "texttrack", "manifest"}
+
+# Analytics, ad and tracking hosts, matched with their subdomains
+BLOCKED_DOMAINS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "googleadservices.com", "adservice.google.com", "facebook.net", "facebook.com", "hotjar.com",
+    "clarity.ms", "tiktok.com", "twitter.com", "linkedin.com", "pinterest.com", "quantserve.com",
+    "scorecardresearch.com", "newrelic.com", "nr-data.net", "sentry.io", "intercom.io",
+    "youtube.com", "ytimg.com", "vimeo.com", "gravatar.com",
+)
+
+
+def _host_matches(host, domain):
+    return host == domain or host.endswith("." + domain)
+
+
+def should_block(resource_type, url, allow=()):
+    """True if a request of `resource_type` for `url` can be aborted. `allow`
+    lists resource types or domains a site needs anyway."""
+    host = urlparse(url).hostname or ""
+    if resource_type in allow or any(_host_matches(host, domain) for domain in allow):
+        return False
+    return resource_type in BLOCKED_RESOURCE_TYPES or any(_host_matches(host, domain) for domain in BLOCKED_DOMAINS)
+
+
+class _PooledBrowser:
+    def __init__(self, browser):
+        self.browser = browser
+        self.uses = 0
+        self.active = 0
+        self.retired = False
+
+
+class BrowserPool:
+    """A few long-lived Chromium instances shared by every mosque in a scrape run.
+
+    Each mosque gets a fresh, isolated browser context. At most `concurrency`
+    pages are open at once, and a browser is relaunched once it has served
+    `recycle_after` pages so renderer memory doesn't build up over a long run.
+    Browsers are launched lazily, so a run that never needs one pays nothing.
+    With `block_resources`, images, fonts, media and trackers are aborted
+    before they load.
+    """
+
+    def __init__(self, size=1, concurrency=4, recycle_after=20, block_resources=True):
+        self.size = max(1, size)
+        self.recycle_after = max(1, recycle_after)
+        self.block_resources = block_resources
+        self.timings = {}
+
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._lock = asyncio.Lock()
+        self._playwright = None
+        self._slots = [None] * self.size
+        self._next_slot = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        for slot in self._slots:
+            if slot is not None:
+                await self._close_browser(slot)
+        self._slots = [None] * self.size
+
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    @asynccontextmanager
+    async def page(self, name, allow=()):
+        """Yield a stealth-patched page in its own context, for the mosque `name`.
+        `allow` lists resource types or domains to load even when blocking."""
+        async with self._semaphore:
+            slot = await self._checkout(name)
+            context = None
+            try:
+                context = await slot.browser.new_context(**CONTEXT_OPTIONS)
+                page = await context.new_page()
+                await Stealth().apply_stealth_async(page)
+                page.set_default_timeout(180_000)
+                if self.block_resources:
+                    await page.route("**/*", self._blocker(name, allow))
+                yield page
+            finally:
+                if context is not None:
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+                await self._checkin(slot)
+
+    def _blocker(self, name, allow):
+        stages = self.timings.setdefault(name, {})
+        stages["blocked"] = 0
+
+        async def handle(route):
+            request = route.request
+            if should_block(request.resource_type, request.url, allow):
+                stages["blocked"] += 1
+                await route.abort()
+            else:
+                await route.continue_()
+
+        return handle
+
+    @asynccontextmanager
+    async def timed(self, name, stage):
+        """Record how long `stage` took for the mosque `name`, in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings.setdefault(name, {})[stage] = round(time.perf_counter() - started, 3)
+
+    def log_timings(self):
+        for name, stages in self.timings.items():
+            parts = ", ".join(
+                f"{stage}={stages[stage]:.2f}s"
+                for stage in ("launch", "navigation", "extraction")
+                if stage in stages
+            )
+            if "blocked" in stages:
+                parts += f", blocked {stages['blocked']} requests"
+            print(f"[BrowserPool] {name}: {parts}")
+
+    async def _launch(self):
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        browser = await self._playwright.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+        return _PooledBrowser(browser)
+
+    async def _checkout(self, name):
+        async with self._lock:
+            index = self._next_slot
+            self._next_slot = (self._next_slot + 1) % self.size
+            slot = self._slots[index]
+
+            if slot is None or slot.uses >= self.recycle_after:
+                if slot is not None:
+                    # Pages still open on the old browser finish normally; it is
+                    # closed by whichever of them checks in last.
+                    slot.retired = True
+                    if slot.active == 0:
+                        await self._close_browser(slot)
+
+                async with self.timed(name, "launch"):
+                    slot = await self._launch()
+                self._slots[index] = slot
+
+            slot.uses += 1
+            slot.active += 1
+            return slot
+
+    async def _checkin(self, slot):
+        async with self._lock:
+            slot.active -= 1
+            if slot.retired and slot.active == 0:
+                await self._close_browser(slot)
+
+    async def _close_browser(self, slot):
+        try:
+            await slot.browser.close()
+        except Exception:
+            pass
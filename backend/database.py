@@ -0,0 +1,91 @@
+from flask import current_app
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from models.prayerTimes import db
+
+
+def is_sqlite(url):
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def in_memory(url):
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(config, url, read_only=False):
+    """Pool settings for `url`, plus what makes a connection read-only on Postgres."""
+    if in_memory(url):
+        # A memory database lives in its one connection; there is nothing to pool
+        return {}
+
+    options = {
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": not is_sqlite(url),
+    }
+    if read_only and not is_sqlite(url):
+        options["connect_args"] = {"options": "-c default_transaction_read_only=on"}
+    return options
+
+
+def sqlite_pragmas(config, read_only=False):
+    pragmas = {
+        "busy_timeout": config["SQLITE_BUSY_TIMEOUT_MS"],
+        "mmap_size": config["SQLITE_MMAP_SIZE"],
+    }
+    if read_only:
+        pragmas["query_only"] = "ON"
+    else:
+        # WAL lets the web processes keep reading while the worker commits
+        pragmas["journal_mode"] = config["SQLITE_JOURNAL_MODE"]
+        pragmas["synchronous"] = config["SQLITE_SYNCHRONOUS"]
+    return pragmas
+
+
+def set_pragmas(engine, pragmas):
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+
+def init_db(app):
+    """Set up `db` for `app`: pooled engines, SQLite pragmas, and a read-only
+    session (read_session()) on DATABASE_READ_URL, or on the primary when there's
+    no replica. Call instead of db.init_app()."""
+    config = app.config
+    url = config["SQLALCHEMY_DATABASE_URI"]
+    read_url = config["DATABASE_READ_URL"] or url
+
+    config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(config, url))
+    db.init_app(app)
+
+    with app.app_context():
+        engine = db.engine
+    if is_sqlite(url) and not in_memory(url):
+        set_pragmas(engine, sqlite_pragmas(config))
+
+    # A memory database can't be opened twice, so reads share its one engine
+    if in_memory(read_url):
+        read_engine = engine
+    else:
+        read_engine = create_engine(read_url, **engine_options(config, read_url, read_only=True))
+        if is_sqlite(read_url):
+            set_pragmas(read_engine, sqlite_pragmas(config, read_only=True))
+
+    session = scoped_session(sessionmaker(bind=read_engine))
+    app.extensions["read_session"] = session
+    app.teardown_appcontext(lambda exc: session.remove())
+
+
+def read_session():
+    """Session for the GET routes: on the replica when DATABASE_READ_URL is set,
+    and unable to write either way (short of an in-memory database)."""
+    return current_app.extensions["read_session"]
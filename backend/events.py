@@ -0,0 +1,99 @@
+import queue
+import threading
+import time
+
+from database import read_session
+from models.prayerTimes import db
+from models.prayerTimeEvent import PrayerTimeEvent
+
+# Put on a subscriber's queue when it fell too far behind to be caught up
+RESYNC = None
+
+
+class EventBroker:
+    """Fans prayer_time_events rows out to stream subscribers in this process.
+
+    A single daemon thread per process tails the table, so however many web
+    workers there are, they all pick up the one row a scrape commits. Listeners
+    registered with on_event() run for every new row too, which is how the
+    in-process read caches learn about a scrape that ran somewhere else.
+    """
+
+    def __init__(self, app, poll_interval=2.0, queue_size=100):
+        self.app = app
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._listeners = []
+        self._last_id = None
+        self._thread = None
+
+    def on_event(self, listener):
+        self._listeners.append(listener)
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        with self.app.app_context():
+            self._last_id = read_session().query(db.func.max(PrayerTimeEvent.id)).scalar() or 0
+
+        self._thread = threading.Thread(target=self._run, name="event-broker", daemon=True)
+        self._thread.start()
+
+    def backlog(self, after_id, limit=100):
+        """Events after `after_id`, for a client reconnecting with Last-Event-ID.
+        Read from the same database as the data, so a replica never announces a
+        scrape it hasn't caught up with yet."""
+        return (
+            read_session().query(PrayerTimeEvent)
+            .filter(PrayerTimeEvent.id > after_id)
+            .order_by(PrayerTimeEvent.id)
+            .limit(limit)
+            .all()
+        )
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"[events] poll failed: {e}")
+
+    def poll(self):
+        with self.app.app_context():
+            events = self.backlog(self._last_id)
+            read_session().remove()
+
+        for event in events:
+            self._last_id = event.id
+            self.publish(event)
+
+    def publish(self, event):
+        for listener in self._listeners:
+            listener(event)
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                # Slow client: drop what it has queued and tell it to refetch
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait(RESYNC)
@@ -0,0 +1,76 @@
+"""Rule-based prayer-time extractors, tried before falling back to the LLM.
+
+Each extractor takes a `Page` and returns the same 16-field dict the LLM
+produces ("H:MM AM" strings or None), or None when it can't read the page
+with confidence. Site-specific extractors run first for their host, then the
+generic ones.
+
+Calendar extractors read every dated row of a multi-day timetable and return
+{date: fields}, for mosques whose page carries a whole month.
+"""
+from urllib.parse import urlparse
+
+from extractors.base import Page, fill_jummah, has_jummah, is_confident
+from extractors.tables import extract_calendar, extract_column_table, extract_row_table, jummah_rows
+from extractors.text import extract_labelled_text, jummah_lines
+
+# Extractors tried first for pages on a given host
+SITE_EXTRACTORS = {
+    # Embedded athanplus widgets are one calendar table with a column group per prayer
+    "timing.athanplus.com": [extract_column_table],
+}
+
+GENERIC_EXTRACTORS = [extract_row_table, extract_column_table, extract_labelled_text]
+
+CALENDAR_EXTRACTORS = [extract_calendar]
+
+
+def fill_page_jummah(page, days):
+    """Jummah is often listed apart from the daily table, so fill it in from
+    anywhere on the page for days that came without one."""
+    missing = [fields for fields in days if not has_jummah(fields)]
+    if not missing:
+        return
+
+    slots = (jummah_rows(page) if page.html else []) or jummah_lines(page)
+    for fields in missing:
+        fill_jummah(fields, slots)
+
+
+def run_extractors(url, html, text, today):
+    """Return (fields, extractor name) from the first confident extractor, or None."""
+    page = Page(html, text, today)
+    host = urlparse(url).hostname or ""
+
+    for extractor in SITE_EXTRACTORS.get(host, []) + GENERIC_EXTRACTORS:
+        try:
+            fields = extractor(page)
+        except Exception as e:
+            print(f"[extract] {extractor.__name__} failed on {url}: {e}")
+            continue
+
+        if fields is None or not is_confident(fields):
+            continue
+
+        fill_page_jummah(page, [fields])
+        return fields, extractor.__name__
+
+    return None
+
+
+def run_calendar_extractors(url, html, today):
+    """Return ({date: fields}, extractor name) from the first calendar extractor that reads the page, or None."""
+    page = Page(html, None, today)
+
+    for extractor in CALENDAR_EXTRACTORS:
+        try:
+            days = extractor(page)
+        except Exception as e:
+            print(f"[extract] {extractor.__name__} failed on {url}: {e}")
+            continue
+
+        if days:
+            fill_page_jummah(page, days.values())
+            return days, extractor.__name__
+
+    return None
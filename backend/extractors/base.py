@@ -0,0 +1,159 @@
+import re
+from datetime import date
+
+from bs4 import BeautifulSoup
+
+from parsing import FIELDS, JUMMAH_SLOTS, PRAYERS, TIME_PATTERN, clean_text, format_time, html_to_text
+
+# Spellings seen on mosque sites, matched against the start of a label
+PRAYER_ALIASES = {
+    "fajr": ("fajr", "fajar", "fajir", "fazr"),
+    "zuhr": ("zuhr", "dhuhr", "duhr", "zohr", "zuhur", "dhuhur", "thuhr", "johr"),
+    "asr": ("asr", "asar"),
+    "maghrib": ("maghrib", "magrib", "maghreb", "magreb"),
+    "isha": ("isha", "esha", "ishaa"),
+    "jummah": ("jummah", "jumuah", "jumu'ah", "jumah", "juma", "jumma", "friday prayer", "friday salah", "friday khutbah", "1st jamat", "2nd jamat", "3rd jamat"),
+}
+
+MONTHS = ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec")
+
+
+class Page:
+    """Everything an extractor may look at for one fetched mosque page."""
+
+    def __init__(self, html, text, today):
+        self.html = html
+        self.today = today
+        self._text = text
+        self._soup = None
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.html or "", "html.parser")
+        return self._soup
+
+    @property
+    def text(self):
+        if self._text is None:
+            self._text = html_to_text(self.html or "")
+        return self._text
+
+
+def label_of(text):
+    """The prayer a table cell or line is labelled with ("jummah" for Friday slots), or None."""
+    value = text.strip().lower().replace("’", "'").replace("`", "'")
+    for prayer, aliases in PRAYER_ALIASES.items():
+        for alias in aliases:
+            if re.match(rf"{re.escape(alias)}(?![a-z])", value):
+                return prayer
+    return None
+
+
+def times_in(text):
+    """Every "H:MM AM/PM" time in `text`, rewritten in the format format_time parses."""
+    times = []
+    for match in TIME_PATTERN.finditer(clean_text(text)):
+        hours, rest = match.group(0).split(":", 1)
+        minutes = rest[:2]
+        meridiem = "AM" if rest[2:].strip().lower().startswith("a") else "PM"
+        times.append(f"{int(hours)}:{minutes} {meridiem}")
+    return times
+
+
+def pair(times):
+    """Apply the LLM prompt's rule: earliest time is the start, latest the iqamah."""
+    if not times:
+        return None, None
+    if len(times) == 1:
+        return None, times[0]
+    ordered = sorted(times, key=format_time)
+    return ordered[0], ordered[-1]
+
+
+def empty_fields():
+    return {field: None for field in FIELDS}
+
+
+def fill_jummah(fields, slots):
+    """Fill jummah1..3 from per-slot time lists, in the order they appear on the page."""
+    flat = []
+    for times in slots:
+        if len(times) <= 2:
+            flat.append(times)
+        else:
+            # Several times on one jummah line are separate congregations
+            flat.extend([t] for t in times)
+
+    for slot, times in zip(JUMMAH_SLOTS, flat):
+        fields[f"{slot}_start"], fields[f"{slot}_iqamah"] = pair(times)
+    return fields
+
+
+def has_jummah(fields):
+    return any(fields[f"{slot}_iqamah"] for slot in JUMMAH_SLOTS)
+
+
+def _infer_year(month, today):
+    # Calendars are read around today, so a December row seen in January is last year's
+    if month - today.month > 6:
+        return today.year - 1
+    if today.month - month > 6:
+        return today.year + 1
+    return today.year
+
+
+def parse_row_date(cells, today):
+    """The date named by a table row's leading cells, or None.
+
+    Understands ISO dates, "Oct 18", "18 Oct", "10/18", and a bare day number,
+    which is taken to be in the current month."""
+    for cell in cells:
+        value = cell.strip().lower()
+        if not value or ":" in value:
+            continue
+
+        try:
+            if value.isdigit():
+                return today.replace(day=int(value))
+
+            match = re.search(r"\b(\d{4})-(\d{2})-(\d{2})\b", value)
+            if match:
+                return date(*map(int, match.groups()))
+
+            match = re.search(r"\b(\d{1,2})/(\d{1,2})\b", value)
+            if match:
+                month, day = map(int, match.groups())
+                return date(_infer_year(month, today), month, day)
+
+            match = (
+                re.search(r"\b(?P<month>[a-z]{3})[a-z]*\.?\s+(?P<day>\d{1,2})\b", value)
+                or re.search(r"\b(?P<day>\d{1,2})(st|nd|rd|th)?\s+(?P<month>[a-z]{3})", value)
+            )
+            if match and match.group("month") in MONTHS:
+                month = MONTHS.index(match.group("month")) + 1
+                return date(_infer_year(month, today), month, int(match.group("day")))
+        except ValueError:
+            continue
+
+    return None
+
+
+def is_confident(fields):
+    """True if `fields` looks like one complete day: every prayer except Maghrib
+    (often written as "sunset") has an iqamah, and the iqamahs run in order."""
+    required = ["fajr", "zuhr", "asr", "isha"]
+    if any(format_time(fields.get(f"{p}_iqamah")) is None for p in required):
+        return False
+
+    times = [format_time(fields.get(f"{p}_iqamah")) for p in PRAYERS]
+    times = [t for t in times if t is not None]
+    if any(a >= b for a, b in zip(times, times[1:])):
+        return False
+
+    for p in PRAYERS:
+        start, iqamah = format_time(fields.get(f"{p}_start")), format_time(fields.get(f"{p}_iqamah"))
+        if start and iqamah and start > iqamah:
+            return False
+
+    return format_time(fields["fajr_iqamah"]).hour < 12 and format_time(fields["isha_iqamah"]).hour >= 17
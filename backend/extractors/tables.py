@@ -0,0 +1,124 @@
+from extractors.base import empty_fields, fill_jummah, is_confident, label_of, pair, parse_row_date, times_in
+
+
+def _row_cells(tr):
+    """Cell texts of a table row, repeating cells that span several columns."""
+    cells = []
+    for cell in tr.find_all(["th", "td"], recursive=False):
+        try:
+            span = max(1, int(cell.get("colspan", 1)))
+        except ValueError:
+            span = 1
+        cells.extend([cell.get_text(" ", strip=True)] * span)
+    return cells
+
+
+def _table_rows(table):
+    return [cells for cells in (_row_cells(tr) for tr in table.find_all("tr")) if cells]
+
+
+def jummah_rows(page):
+    """Times of every table row labelled as a jummah slot, anywhere on the page."""
+    slots = []
+    for table in page.soup.find_all("table"):
+        for cells in _table_rows(table):
+            if label_of(cells[0]) == "jummah":
+                times = [t for cell in cells[1:] for t in times_in(cell)]
+                if times:
+                    slots.append(times)
+    return slots
+
+
+def extract_row_table(page):
+    """One row per prayer: "Fajr | 5:08 AM | 6:00 AM"."""
+    for table in page.soup.find_all("table"):
+        fields = empty_fields()
+        seen = set()
+        slots = []
+
+        for cells in _table_rows(table):
+            label = label_of(cells[0])
+            times = [t for cell in cells[1:] for t in times_in(cell)]
+            if label is None or not times:
+                continue
+
+            if label == "jummah":
+                slots.append(times)
+                continue
+
+            if label in seen:
+                # The same prayer on several rows means a multi-day table
+                break
+            seen.add(label)
+            fields[f"{label}_start"], fields[f"{label}_iqamah"] = pair(times)
+        else:
+            fill_jummah(fields, slots)
+            if is_confident(fields):
+                return fields
+
+    return None
+
+
+def _column_tables(page):
+    """(column labels, data rows) for each table with one column group per prayer."""
+    for table in page.soup.find_all("table"):
+        rows = _table_rows(table)
+
+        for i, cells in enumerate(rows):
+            labels = {label_of(cell) for cell in cells} - {None, "jummah"}
+            if len(labels) >= 3:
+                columns = [label_of(cell) for cell in cells]
+                data_rows = [row for row in rows[i + 1:] if any(times_in(cell) for cell in row)]
+                if data_rows:
+                    yield columns, data_rows
+                break
+
+
+def _fields_from_row(columns, row):
+    fields = empty_fields()
+    grouped = {}
+    for label, cell in zip(columns, row):
+        if label is not None:
+            grouped.setdefault(label, []).extend(times_in(cell))
+
+    for label, times in grouped.items():
+        if label == "jummah":
+            fill_jummah(fields, [times])
+        else:
+            fields[f"{label}_start"], fields[f"{label}_iqamah"] = pair(times)
+    return fields
+
+
+def extract_column_table(page):
+    """One column (or column group) per prayer, one row per day, as in monthly
+    calendars. A single data row is used as is; otherwise the row dated today."""
+    for columns, data_rows in _column_tables(page):
+        if len(data_rows) == 1:
+            row = data_rows[0]
+        else:
+            dated = [cells for cells in data_rows if parse_row_date(cells[:2], page.today) == page.today]
+            if len(dated) != 1:
+                continue
+            row = dated[0]
+
+        fields = _fields_from_row(columns, row)
+        if is_confident(fields):
+            return fields
+
+    return None
+
+
+def extract_calendar(page):
+    """Every dated row of a column-per-prayer calendar, as {date: fields}."""
+    for columns, data_rows in _column_tables(page):
+        days = {}
+        for row in data_rows:
+            day = parse_row_date(row[:2], page.today)
+            fields = _fields_from_row(columns, row)
+            if day is not None and is_confident(fields):
+                days[day] = fields
+
+        if len(days) >= 2:
+            return days
+
+    return None
@@ -0,0 +1,74 @@
+from extractors.base import empty_fields, fill_jummah, is_confident, label_of, pair, times_in
+
+# Words that may sit between a prayer label and its times without ending the group
+QUALIFIERS = ("begins", "begin", "start", "starts", "adhan", "athan", "azan", "iqamah", "iqama",
+              "jamat", "jamaat", "salah", "salat", "khutbah", "khutba", "prayer")
+
+
+# Joins the cells of a table row in the structured text read from rendered pages
+ROW_SEPARATOR = " | "
+
+
+def _is_qualifier(line):
+    words = [w.strip(":-|") for w in line.lower().split()]
+    return bool(words) and all(w in QUALIFIERS for w in words if w)
+
+
+def extract_labelled_text(page):
+    """Prayer labels followed by their times in the visible text, e.g. the
+    one-node-per-line text Playwright returns for div-based widgets, or its
+    "Fajr | 5:08 AM | 6:00 AM" lines for table rows."""
+    groups = []
+    current = None
+
+    for line in page.text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+
+        label = label_of(line)
+        times = times_in(line)
+
+        if label is not None:
+            current = [label, times]
+            groups.append(current)
+        elif ROW_SEPARATOR in line:
+            # A table row (e.g. Sunrise) holds its own times; it never continues the prayer above
+            current = None
+        elif times and current is not None:
+            current[1].extend(times)
+        elif not _is_qualifier(line):
+            # Anything else (menus, announcements) closes the current prayer
+            current = None
+
+    fields = empty_fields()
+    seen = set()
+    slots = []
+    for label, times in groups:
+        if not times:
+            continue
+
+        if label == "jummah":
+            slots.append(times)
+            continue
+
+        # Repeated labels (several days) or a pile of times under one label
+        # (a flattened column table) are left to the LLM.
+        if label in seen or len(times) > 2:
+            return None
+        seen.add(label)
+        fields[f"{label}_start"], fields[f"{label}_iqamah"] = pair(times)
+
+    fill_jummah(fields, slots)
+    return fields if is_confident(fields) else None
+
+
+def jummah_lines(page):
+    """Times of every visible line labelled as a jummah slot."""
+    slots = []
+    for line in page.text.splitlines():
+        if label_of(line) == "jummah":
+            times = times_in(line)
+            if times:
+                slots.append(times)
+    return slots
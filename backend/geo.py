@@ -0,0 +1,87 @@
+import math
+from collections import defaultdict
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.195
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class GridIndex:
+    """A fixed-size lat/lon grid over a set of points, for nearest-first lookups.
+
+    Cells are searched in rings outward from the query point, and the search stops
+    as soon as no unvisited cell can hold anything closer than what was found, so a
+    lookup touches only the few cells around the user instead of every point.
+    """
+
+    def __init__(self, points, cell_deg=0.1):
+        """`points` is an iterable of (latitude, longitude, value)."""
+        self.cell_deg = cell_deg
+        self._cells = defaultdict(list)
+        for lat, lon, value in points:
+            self._cells[self._cell(lat, lon)].append((lat, lon, value))
+
+        if self._cells:
+            rows = [r for r, _ in self._cells]
+            cols = [c for _, c in self._cells]
+            self._bounds = (min(rows), max(rows), min(cols), max(cols))
+        else:
+            self._bounds = None
+
+    def __len__(self):
+        return sum(len(points) for points in self._cells.values())
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def _ring(self, row, col, r):
+        if r == 0:
+            yield row, col
+            return
+        for c in range(col - r, col + r + 1):
+            yield row - r, c
+            yield row + r, c
+        for rr in range(row - r + 1, row + r):
+            yield rr, col - r
+            yield rr, col + r
+
+    def nearest(self, lat, lon, radius_km=None, k=None):
+        """Return [(distance_km, value)] sorted nearest first, optionally limited to
+        `radius_km` and to the `k` closest."""
+        if self._bounds is None:
+            return []
+
+        row, col = self._cell(lat, lon)
+        min_row, max_row, min_col, max_col = self._bounds
+        max_ring = max(abs(row - min_row), abs(row - max_row), abs(col - min_col), abs(col - max_col))
+
+        # Smallest distance covered by one ring step; a longitude cell narrows away from the equator
+        edge_lat = min(abs(lat) + self.cell_deg * (max_ring + 1), 89.9)
+        step_km = self.cell_deg * KM_PER_DEGREE * math.cos(math.radians(edge_lat))
+
+        found = []
+        for r in range(max_ring + 1):
+            # Anything in ring r or beyond is at least (r - 1) steps away
+            reach_km = max(0, r - 1) * step_km
+            if radius_km is not None and reach_km > radius_km:
+                break
+            if k is not None and len(found) >= k:
+                found.sort(key=lambda item: item[0])
+                if found[k - 1][0] <= reach_km:
+                    break
+
+            for cell in self._ring(row, col, r):
+                for plat, plon, value in self._cells.get(cell, ()):
+                    distance = haversine_km(lat, lon, plat, plon)
+                    if radius_km is None or distance <= radius_km:
+                        found.append((distance, value))
+
+        found.sort(key=lambda item: item[0])
+        return found[:k] if k is not None else found
@@ -0,0 +1,157 @@
+import asyncio
+from collections import namedtuple
+
+from parsing import FIELDS, format_time
+
+# One page waiting to go out; `future` receives its extraction
+Queued = namedtuple("Queued", "cleaned_text today_label future name")
+
+# Completion tokens allowed per mosque, in a packed request as in a single one
+TOKENS_PER_EXTRACTION = 500
+
+
+def valid_extraction(entry):
+    """True if `entry` has every schema field, each a readable time or null."""
+    if not isinstance(entry, dict) or not set(FIELDS) <= entry.keys():
+        return False
+    for field in FIELDS:
+        value = entry[field]
+        if value is None or (isinstance(value, str) and value.strip().lower() in ("null", "none")):
+            continue
+        if not isinstance(value, str) or format_time(value) is None:
+            return False
+    return True
+
+
+class ExtractionBatcher:
+    """Packs concurrent single-day extractions into shared LLM requests.
+
+    extract() queues a cleaned page and waits. Queued pages go out `batch_size`
+    at a time in one request that carries the extraction rules once and returns
+    a JSON map of id to the usual 16-field schema, so both the request count and
+    the repeated instruction tokens shrink by about the batch size. Each entry is
+    validated on its own and only the failures are retried, one page per request.
+
+    With `offline` set, every page queued within `linger` seconds of the last one
+    goes out as a single Batch API job instead of live requests. With `hold` as
+    well, nothing goes out until release(), so a run can queue every page it
+    fetches, however long the fetching takes, and submit them as one job.
+    """
+
+    def __init__(self, llm, single_template, batch_template, batch_size=8, linger=0.05, offline=False,
+                 poll_interval=60, hold=False):
+        self.llm = llm
+        self.single_template = single_template
+        self.batch_template = batch_template
+        self.batch_size = batch_size
+        self.linger = linger
+        self.offline = offline
+        self.poll_interval = poll_interval
+        self._held = hold
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    async def extract(self, cleaned_text, today_label, name=None):
+        """The parsed extraction for one page, or None. `name` tags the LLM
+        calls made for it."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(Queued(cleaned_text, today_label, future, name))
+
+        if not self.offline and len(self._pending) >= self.batch_size:
+            self._flush()
+        elif not self._held:
+            self._linger()
+
+        return await future
+
+    def release(self):
+        """Stop holding: what's queued goes out once `linger` passes with nothing new."""
+        self._held = False
+        if self._pending:
+            self._linger()
+
+    def _linger(self):
+        # Wait a moment for the other mosques of this run to queue up
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(self.linger, self._flush)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        chunks = []
+        for today_label in dict.fromkeys(item.today_label for item in pending):
+            group = [item for item in pending if item.today_label == today_label]
+            chunks.extend(group[i:i + self.batch_size] for i in range(0, len(group), self.batch_size))
+
+        task = asyncio.ensure_future(self._run_offline(chunks) if self.offline else self._run_live(chunks))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _prompt(self, chunk):
+        """(prompt, max completion tokens, tags) for a chunk of queued pages."""
+        today_label = chunk[0].today_label
+        tags = [item.name for item in chunk if item.name is not None]
+        if len(chunk) == 1:
+            return self.single_template.format(cleaned_text=chunk[0].cleaned_text, today=today_label), TOKENS_PER_EXTRACTION, tags
+
+        texts = "\n\n".join(
+            f"=== m{i} ===\n{item.cleaned_text}\n=== end m{i} ===" for i, item in enumerate(chunk, 1)
+        )
+        prompt = self.batch_template.format(texts=texts, count=len(chunk), today=today_label)
+        return prompt, TOKENS_PER_EXTRACTION * len(chunk), tags
+
+    async def _settle(self, chunk, response):
+        """Resolve each page's future from `response`, retrying failed entries alone."""
+        if len(chunk) == 1:
+            # A page sent alone gets the same leniency as before batching
+            chunk[0].future.set_result(response)
+            return
+
+        entries = [response.get(f"m{i}") if isinstance(response, dict) else None for i in range(1, len(chunk) + 1)]
+        retries = []
+        for item, entry in zip(chunk, entries):
+            if valid_extraction(entry):
+                item.future.set_result(entry)
+            else:
+                retries.append(item)
+
+        if retries:
+            print(f"[OpenAI] {len(retries)} of {len(chunk)} batched extractions invalid, retrying alone")
+            await asyncio.gather(*[self._run_single(item) for item in retries])
+
+    async def _run_single(self, item):
+        prompt, max_tokens, tags = self._prompt([item])
+        item.future.set_result(await self.llm.complete(prompt, max_tokens, tags))
+
+    async def _run_live(self, chunks):
+        async def run(chunk):
+            prompt, max_tokens, tags = self._prompt(chunk)
+            await self._settle(chunk, await self.llm.complete(prompt, max_tokens, tags))
+
+        await self._guard(chunks, asyncio.gather(*[run(chunk) for chunk in chunks]))
+
+    async def _run_offline(self, chunks):
+        async def run():
+            prompts = {f"chunk-{i}": self._prompt(chunk) for i, chunk in enumerate(chunks)}
+            responses = await self.llm.complete_offline(prompts, self.poll_interval)
+            await asyncio.gather(*[self._settle(chunk, responses[f"chunk-{i}"]) for i, chunk in enumerate(chunks)])
+
+        await self._guard(chunks, run())
+
+    async def _guard(self, chunks, work):
+        # Never leave a caller waiting forever on an unexpected error
+        try:
+            await work
+        except Exception as e:
+            print(f"[OpenAI] Batched extraction failed: {e}")
+        for chunk in chunks:
+            for item in chunk:
+                if not item.future.done():
+                    item.future.set_result(None)
@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+
+from models.prayerTimes import db
+from models.llmCache import LLMCacheEntry
+from models.llmCacheRun import LLMCacheRun
+
+
+def cache_key(model, prompt_version, today_label, cleaned_text):
+    """sha256 over every input that can change what the LLM extracts."""
+    digest = hashlib.sha256()
+    for part in (model, prompt_version, today_label, cleaned_text):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ExtractionCache:
+    """Content-addressed cache of parsed LLM extractions, stored in the llm_cache table.
+
+    Entries expire `ttl` after they were written and the table is trimmed to the
+    `max_entries` most recently used rows by `evict()`. Concurrent lookups of the
+    same key share one in-flight extraction. Hit/miss counters are kept in-process
+    for the lifetime of the cache object; `save_run()` stores a run's share of
+    them for the web processes to report.
+    """
+
+    def __init__(self, ttl=timedelta(days=30), max_entries=5000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._inflight = {}
+
+    def _expired(self, entry, now):
+        created_at = entry.created_at
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return created_at + self.ttl < now
+
+    def get(self, key):
+        now = datetime.now(timezone.utc)
+        entry = db.session.get(LLMCacheEntry, key)
+        if entry is None or self._expired(entry, now):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        entry.hits += 1
+        entry.last_used_at = now
+        return json.loads(entry.response)
+
+    def put(self, key, value):
+        now = datetime.now(timezone.utc)
+        db.session.merge(LLMCacheEntry(
+            key=key,
+            response=json.dumps(value),
+            hits=0,
+            created_at=now,
+            last_used_at=now,
+        ))
+
+    def discard(self, key):
+        db.session.query(LLMCacheEntry).filter(LLMCacheEntry.key == key).delete(synchronize_session=False)
+
+    async def get_or_fetch(self, key, fetch):
+        """Return the cached value for `key`, or await `fetch()` and cache a truthy result."""
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        if key in self._inflight:
+            # Another mosque in this run is already extracting the same text
+            self.misses -= 1
+            self.hits += 1
+            return await asyncio.shield(self._inflight[key])
+
+        task = asyncio.ensure_future(fetch())
+        self._inflight[key] = task
+        try:
+            value = await task
+        finally:
+            self._inflight.pop(key, None)
+
+        if value:
+            self.put(key, value)
+        return value
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones over max_entries."""
+        cutoff = datetime.now(timezone.utc) - self.ttl
+        removed = LLMCacheEntry.query.filter(LLMCacheEntry.created_at < cutoff).delete(synchronize_session=False)
+
+        overflow = LLMCacheEntry.query.count() - self.max_entries
+        if overflow > 0:
+            stale_keys = [
+                key for (key,) in db.session.query(LLMCacheEntry.key)
+                .order_by(LLMCacheEntry.last_used_at.asc())
+                .limit(overflow)
+            ]
+            removed += LLMCacheEntry.query.filter(LLMCacheEntry.key.in_(stale_keys)).delete(synchronize_session=False)
+
+        self.evictions += removed
+        return removed
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": hit_rate(self.hits, self.misses),
+        }
+
+    def save_run(self, run_id, started_at, before):
+        """Add an llm_cache_runs row with the counts since `before`, the stats() taken
+        when the run started."""
+        db.session.add(LLMCacheRun(
+            run_id=run_id,
+            started_at=started_at,
+            **{key: getattr(self, key) - before[key] for key in ("hits", "misses", "evictions")},
+        ))
+
+
+def hit_rate(hits, misses):
+    lookups = hits + misses
+    return round(hits / lookups, 3) if lookups else None
+
+
+def table_stats(session=None):
+    """Counters stored in the llm_cache table, and the lookups and evictions summed
+    over the runs kept in llm_cache_runs, shared by every process that uses them.
+    `session` defaults to db.session."""
+    session = session or db.session
+    entries, stored_hits = session.query(db.func.count(LLMCacheEntry.key), db.func.sum(LLMCacheEntry.hits)).one()
+    hits, misses, evictions = session.query(
+        db.func.coalesce(db.func.sum(LLMCacheRun.hits), 0),
+        db.func.coalesce(db.func.sum(LLMCacheRun.misses), 0),
+        db.func.coalesce(db.func.sum(LLMCacheRun.evictions), 0),
+    ).one()
+    return {
+        "entries": entries,
+        "stored_hits": stored_hits or 0,
+        "hits": hits,
+        "misses": misses,
+        "evictions": evictions,
+        "hit_rate": hit_rate(hits, misses),
+    }
@@ -0,0 +1,242 @@
+import asyncio
+import json
+import random
+import statistics
+import time
+
+import openai
+
+SYSTEM_PROMPT = "You are a helpful assistant that only outputs valid JSON objects."
+
+# Errors worth another attempt: rate limits, server errors and network trouble
+RETRYABLE = (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+
+# Rough prompt size before the API tells us the real count
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(prompt, max_completion_tokens):
+    return len(prompt) // CHARS_PER_TOKEN + max_completion_tokens
+
+
+class LLMClient:
+    """Async chat-completions calls that stay inside the account's limits.
+
+    Every call waits for a slot (at most `max_concurrency` in flight) and for
+    room in the requests/min and tokens/min buckets. 429s, 5xx responses and
+    connection errors are retried with exponential backoff and full jitter,
+    honouring Retry-After. Once `token_budget` tokens (0 for no cap) have been
+    spent or reserved by calls in flight, further calls are skipped. One client
+    covers one scrape run; its
+    per-call latency and token counts are summarised by stats().
+    """
+
+    def __init__(self, client, model, requests_bucket, tokens_bucket, max_concurrency=8,
+                 max_retries=5, timeout=60, token_budget=0, backoff_base=1.0, backoff_cap=60.0):
+        self.client = client
+        self.model = model
+        self.requests_bucket = requests_bucket
+        self.tokens_bucket = tokens_bucket
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.token_budget = token_budget
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.tokens_used = 0
+        self.calls = []
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Estimated tokens of the calls in flight, held against the budget until
+        # their real usage is known
+        self._reserved = 0
+        self._budget_lock = asyncio.Lock()
+
+    async def _reserve(self, estimate):
+        """Hold `estimate` tokens of the run budget for one call, or return False
+        if that would take the run over it."""
+        async with self._budget_lock:
+            if self.token_budget and self.tokens_used + self._reserved + estimate > self.token_budget:
+                return False
+            self._reserved += estimate
+            return True
+
+    async def _spend(self, estimate, tokens):
+        # Swap a call's reservation for what it actually used
+        async with self._budget_lock:
+            self._reserved -= estimate
+            self.tokens_used += tokens
+
+    def _backoff(self, attempt, error):
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                pass
+        if retry_after is not None:
+            return min(retry_after, self.backoff_cap)
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def _record(self, status, tags, attempts=0, latency=0.0):
+        call = {"status": status, "attempts": attempts, "latency": latency, "prompt_tokens": 0,
+                "completion_tokens": 0, "tags": list(tags)}
+        self.calls.append(call)
+        return call
+
+    async def complete(self, prompt, max_completion_tokens=500, tags=()):
+        """Parsed JSON from the model, or None if the call failed or was skipped.
+        `tags` name what the call was for (e.g. mosques), for usage_by_tag()."""
+        estimate = estimate_tokens(prompt, max_completion_tokens)
+
+        async with self._semaphore:
+            # Checked once a slot is free, so callers queued behind the semaphore
+            # see what the calls ahead of them spent
+            if not await self._reserve(estimate):
+                print(f"[OpenAI] Run budget of {self.token_budget} tokens spent, skipping call")
+                self._record("skipped", tags)
+                return None
+
+            call = self._record("failed", tags)
+            try:
+                return await self._attempt(call, prompt, max_completion_tokens, estimate)
+            finally:
+                await self._spend(estimate, call["prompt_tokens"] + call["completion_tokens"])
+
+    async def _attempt(self, call, prompt, max_completion_tokens, estimate):
+        """Make the call, retrying as configured, and fill in `call` as it goes."""
+        for attempt in range(self.max_retries + 1):
+            await self.requests_bucket.take()
+            await self.tokens_bucket.take(estimate)
+
+            call["attempts"] += 1
+            started = time.perf_counter()
+            try:
+                response = await self.client.chat.completions.create(
+                    **self._request_body(prompt, max_completion_tokens),
+                    timeout=self.timeout,
+                )
+            except RETRYABLE as e:
+                call["latency"] += time.perf_counter() - started
+                if attempt == self.max_retries:
+                    print(f"[OpenAI] Failed after {call['attempts']} attempts: {e}")
+                    return None
+                delay = self._backoff(attempt, e)
+                print(f"[OpenAI] {type(e).__name__}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            except Exception as e:
+                call["latency"] += time.perf_counter() - started
+                print(f"[OpenAI] Failed: {e}")
+                return None
+
+            call["latency"] += time.perf_counter() - started
+            if response.usage is not None:
+                call["prompt_tokens"] = response.usage.prompt_tokens
+                call["completion_tokens"] = response.usage.completion_tokens
+
+            try:
+                result = json.loads(response.choices[0].message.content)
+            except (TypeError, ValueError) as e:
+                print(f"[OpenAI] Failed: {e}")
+                return None
+
+            call["status"] = "ok"
+            return result
+
+    def _request_body(self, prompt, max_completion_tokens):
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            "max_completion_tokens": max_completion_tokens,
+            "top_p": 1,
+        }
+
+    async def complete_offline(self, prompts, poll_interval=60):
+        """Run {id: (prompt, max_completion_tokens, tags)} through the Batch API and
+        wait for it to finish. Returns {id: parsed JSON or None}.
+
+        Batch jobs are billed at a discount and don't count against the live rate
+        limits, but can take up to 24 hours, so this suits the nightly full sweep.
+        """
+        lines = [
+            json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._request_body(prompt, max_completion_tokens),
+            })
+            for custom_id, (prompt, max_completion_tokens, _) in prompts.items()
+        ]
+        results = dict.fromkeys(prompts)
+        started = time.perf_counter()
+
+        try:
+            upload = await self.client.files.create(
+                file=("extractions.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch"
+            )
+            batch = await self.client.batches.create(
+                input_file_id=upload.id, endpoint="/v1/chat/completions", completion_window="24h"
+            )
+            print(f"[OpenAI] Submitted batch {batch.id} with {len(lines)} requests")
+
+            while batch.status not in ("completed", "failed", "expired", "cancelled"):
+                await asyncio.sleep(poll_interval)
+                batch = await self.client.batches.retrieve(batch.id)
+
+            if batch.output_file_id is None:
+                print(f"[OpenAI] Batch {batch.id} {batch.status} with no output")
+                return results
+            output = await self.client.files.content(batch.output_file_id)
+        except openai.OpenAIError as e:
+            print(f"[OpenAI] Batch failed: {e}")
+            return results
+
+        latency = time.perf_counter() - started
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            call = self._record("failed", prompts.get(item["custom_id"], (None, None, ()))[2], attempts=1, latency=latency)
+
+            body = (item.get("response") or {}).get("body") or {}
+            usage = body.get("usage") or {}
+            call["prompt_tokens"] = usage.get("prompt_tokens", 0)
+            call["completion_tokens"] = usage.get("completion_tokens", 0)
+            self.tokens_used += call["prompt_tokens"] + call["completion_tokens"]
+
+            try:
+                results[item["custom_id"]] = json.loads(body["choices"][0]["message"]["content"])
+                call["status"] = "ok"
+            except (KeyError, IndexError, TypeError, ValueError):
+                pass
+
+        print(f"[OpenAI] Batch {batch.id} {batch.status} in {latency:.0f}s")
+        return results
+
+    def usage_by_tag(self):
+        """{tag: {"prompt_tokens", "completion_tokens"}}, splitting each call's
+        tokens evenly between the tags it was made for."""
+        usage = {}
+        for call in self.calls:
+            for tag in call["tags"]:
+                entry = usage.setdefault(tag, {"prompt_tokens": 0, "completion_tokens": 0})
+                entry["prompt_tokens"] += call["prompt_tokens"] / len(call["tags"])
+                entry["completion_tokens"] += call["completion_tokens"] / len(call["tags"])
+        return usage
+
+    def stats(self):
+        latencies = sorted(c["latency"] for c in self.calls if c["attempts"])
+        return {
+            "calls": len(self.calls),
+            "ok": sum(c["status"] == "ok" for c in self.calls),
+            "failed": sum(c["status"] == "failed" for c in self.calls),
+            "skipped": sum(c["status"] == "skipped" for c in self.calls),
+            "retries": sum(max(0, c["attempts"] - 1) for c in self.calls),
+            "prompt_tokens": sum(c["prompt_tokens"] for c in self.calls),
+            "completion_tokens": sum(c["completion_tokens"] for c in self.calls),
+            "latency_p50": round(statistics.median(latencies), 2) if latencies else None,
+            "latency_max": round(latencies[-1], 2) if latencies else None,
+        }
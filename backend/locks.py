@@ -0,0 +1,77 @@
+import fcntl
+import hashlib
+import os
+
+from sqlalchemy import text
+
+
+class FileLock:
+    """An exclusive lock on a file, shared by every process on the machine.
+
+    acquire() never waits: it returns False if another process holds the lock.
+    The OS drops the lock if the holder dies, so a crashed run never wedges the
+    next one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def acquire(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+def lock_key(name):
+    """A stable signed 64-bit key for a Postgres advisory lock named `name`."""
+    return int.from_bytes(hashlib.sha256(name.encode("utf-8")).digest()[:8], "big", signed=True)
+
+
+class AdvisoryLock:
+    """The same lock as FileLock, held in Postgres instead of on a file, so it is
+    shared by every process on every machine using the database.
+
+    The lock belongs to one connection from `engine`, kept out of the pool while
+    it's held. Postgres drops it if that connection dies, so a crashed run never
+    wedges the next one here either.
+    """
+
+    def __init__(self, engine, name):
+        self.engine = engine
+        self.key = lock_key(name)
+        self._connection = None
+
+    def acquire(self):
+        connection = self.engine.connect()
+        locked = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.key}).scalar()
+        # The lock outlives the transaction; ending it keeps the connection from
+        # sitting idle in one for the whole scrape
+        connection.commit()
+        if not locked:
+            connection.close()
+            return False
+
+        self._connection = connection
+        return True
+
+    def release(self):
+        if self._connection is not None:
+            self._connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.key})
+            self._connection.commit()
+            self._connection.close()
+            self._connection = None
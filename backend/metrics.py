@@ -0,0 +1,148 @@
+import os
+import time
+
+from flask import g, request
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Histogram, generate_latest, multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+from sqlalchemy import case, func
+
+from database import read_session
+from models.llmCacheRun import LLMCacheRun
+from models.scrapeRun import ScrapeRun
+from profiling import STAGES
+from refresh import as_utc
+
+HTTP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Endpoints that hold a connection open; their duration isn't request latency
+UNTIMED_ENDPOINTS = {"stream_prayer_times", "prometheus_metrics", "static"}
+
+
+class ScrapeRunCollector:
+    """Scrape metrics read from the scrape_runs and llm_cache_runs tables at
+    collection time.
+
+    The worker writes those rows, so any web process can report them. Values
+    are cumulative over the rows kept (SCRAPE_RUNS_KEEP_DAYS); pruning old rows
+    looks like a counter reset to Prometheus.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _stage_histograms(self):
+        columns = []
+        for stage in STAGES:
+            column = getattr(ScrapeRun, f"{stage}_seconds")
+            columns += [func.count(column), func.coalesce(func.sum(column), 0.0)]
+            columns += [func.sum(case((column <= bound, 1), else_=0)) for bound in STAGE_BUCKETS]
+        row = read_session().query(*columns).one()
+
+        family = HistogramMetricFamily(
+            "jamaat_scrape_stage_seconds", "Time a mosque spent in each scrape stage.", labels=["stage"]
+        )
+        width = 2 + len(STAGE_BUCKETS)
+        for i, stage in enumerate(STAGES):
+            count, total, *cumulative = row[i * width:(i + 1) * width]
+            buckets = [(str(bound), n or 0) for bound, n in zip(STAGE_BUCKETS, cumulative)]
+            family.add_metric([stage], buckets + [("+Inf", count)], total)
+        return family
+
+    def collect(self):
+        with self.app.app_context():
+            yield self._stage_histograms()
+
+            outcomes = CounterMetricFamily(
+                "jamaat_scrape_mosques", "Mosques checked, by outcome and the step that settled it.",
+                labels=["outcome", "path", "fetch_strategy"],
+            )
+            grouped = read_session().query(
+                ScrapeRun.outcome, ScrapeRun.path, ScrapeRun.fetch_strategy, func.count()
+            ).group_by(ScrapeRun.outcome, ScrapeRun.path, ScrapeRun.fetch_strategy)
+            for outcome, path, strategy, count in grouped:
+                outcomes.add_metric([outcome, path or "", strategy or ""], count)
+            yield outcomes
+
+            prompt_tokens, completion_tokens, blocked, last_run = read_session().query(
+                func.coalesce(func.sum(ScrapeRun.prompt_tokens), 0.0),
+                func.coalesce(func.sum(ScrapeRun.completion_tokens), 0.0),
+                func.coalesce(func.sum(ScrapeRun.blocked_requests), 0),
+                func.max(ScrapeRun.started_at),
+            ).one()
+
+            tokens = CounterMetricFamily("jamaat_llm_tokens", "LLM tokens spent on extractions.", labels=["kind"])
+            tokens.add_metric(["prompt"], prompt_tokens)
+            tokens.add_metric(["completion"], completion_tokens)
+            yield tokens
+
+            yield CounterMetricFamily(
+                "jamaat_browser_blocked_requests", "Browser requests aborted by resource blocking.", value=blocked
+            )
+
+            hits, misses, evictions = read_session().query(
+                func.coalesce(func.sum(LLMCacheRun.hits), 0),
+                func.coalesce(func.sum(LLMCacheRun.misses), 0),
+                func.coalesce(func.sum(LLMCacheRun.evictions), 0),
+            ).one()
+
+            lookups = CounterMetricFamily(
+                "jamaat_llm_cache_lookups", "Extraction cache lookups, by result.", labels=["result"]
+            )
+            lookups.add_metric(["hit"], hits)
+            lookups.add_metric(["miss"], misses)
+            yield lookups
+
+            yield CounterMetricFamily(
+                "jamaat_llm_cache_evictions", "Extraction cache entries evicted.", value=evictions
+            )
+
+            if last_run is not None:
+                yield GaugeMetricFamily(
+                    "jamaat_scrape_last_run_timestamp_seconds", "When the latest scrape run started.",
+                    value=as_utc(last_run).timestamp(),
+                )
+
+
+class Metrics:
+    """HTTP latency for this app's routes plus the scrape metrics, served in the
+    Prometheus text format.
+
+    Under gunicorn set PROMETHEUS_MULTIPROC_DIR, so every worker's requests are
+    counted whichever worker answers the scrape.
+    """
+
+    def __init__(self, app):
+        self.multiprocess = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+        self.request_latency = Histogram(
+            "jamaat_http_request_duration_seconds",
+            "Time spent answering HTTP requests.",
+            ["endpoint", "method", "status"],
+            buckets=HTTP_BUCKETS,
+            registry=None,
+        )
+        self._scrape_collector = ScrapeRunCollector(app)
+
+        app.before_request(self._start)
+        app.after_request(self._observe)
+
+    def _start(self):
+        g.request_started = time.perf_counter()
+
+    def _observe(self, response):
+        started = g.pop("request_started", None)
+        if started is not None and request.endpoint and request.endpoint not in UNTIMED_ENDPOINTS:
+            self.request_latency.labels(request.endpoint, request.method, response.status_code).observe(
+                time.perf_counter() - started
+            )
+        return response
+
+    def render(self):
+        """(body, content type) for GET /metrics."""
+        registry = CollectorRegistry()
+        if self.multiprocess:
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry.register(self.request_latency)
+        registry.register(self._scrape_collector)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
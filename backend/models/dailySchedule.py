@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+
+from models.prayerTimes import db
+from schedule_store import ScheduleBlock, decode, encode
+
+
+class DailySchedule(db.Model):
+    """One mosque's times for one calendar date, packed into 32 bytes (see
+    schedule_store). Filled from multi-day timetables and from every daily scrape,
+    so it also holds each mosque's history."""
+
+    __tablename__ = "daily_schedule"
+    # Rows live in the primary-key index itself rather than beside it
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    mosque_name = db.Column(db.String, primary_key=True)
+    date = db.Column(db.Date, primary_key=True, index=True)
+    minutes = db.Column(db.LargeBinary, nullable=False)
+
+    updated_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    @classmethod
+    def save(cls, mosque_name, day, times):
+        """Store `times` ({field: time or None}) for one mosque and day, replacing what was there."""
+        db.session.merge(cls(mosque_name=mosque_name, date=day, minutes=encode(times)))
+
+    @classmethod
+    def load(cls, names=None, start=None, end=None, session=None):
+        """A ScheduleBlock of the stored days for `names` (default all mosques) from
+        `start` to `end` inclusive, read in one query without building ORM objects.
+        `session` defaults to db.session."""
+        query = db.select(cls.mosque_name, cls.date, cls.minutes, cls.updated_at)
+        if names is not None:
+            query = query.where(cls.mosque_name.in_(list(names)))
+        if start is not None:
+            query = query.where(cls.date >= start)
+        if end is not None:
+            query = query.where(cls.date <= end)
+        return ScheduleBlock.from_rows((session or db.session).execute(query.order_by(cls.date, cls.mosque_name)))
+
+    def times(self):
+        """The 16 start/iqamah times as keyword arguments for PrayerTimes."""
+        return decode(self.minutes)
@@ -0,0 +1,16 @@
+from datetime import datetime, timezone
+
+from models.prayerTimes import db
+
+
+class LLMCacheEntry(db.Model):
+    """A parsed LLM extraction, keyed by the hash of everything that produced it."""
+
+    __tablename__ = "llm_cache"
+
+    key = db.Column(db.String(64), primary_key=True)
+    response = db.Column(db.Text, nullable=False)
+    hits = db.Column(db.Integer, nullable=False, default=0)
+
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    last_used_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), index=True)
@@ -0,0 +1,18 @@
+from datetime import datetime, timezone
+
+from models.prayerTimes import db
+
+
+class LLMCacheRun(db.Model):
+    """The extraction cache's lookups and evictions in one scrape run. The worker
+    writes these rows, so any web process can report them."""
+
+    __tablename__ = "llm_cache_runs"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    run_id = db.Column(db.String, nullable=False, index=True)
+    started_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), index=True)
+
+    hits = db.Column(db.Integer, nullable=False, default=0)
+    misses = db.Column(db.Integer, nullable=False, default=0)
+    evictions = db.Column(db.Integer, nullable=False, default=0)
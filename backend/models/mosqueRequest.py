@@ -0,0 +1,35 @@
+from datetime import datetime, timezone
+
+from models.prayerTimes import db
+
+
+class MosqueRequest(db.Model):
+    """A "please add this mosque" submission, queued until the worker delivers it
+    to the sheet webhook."""
+
+    __tablename__ = "mosque_requests"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    # Hash of the normalized submission, so a repeated one is only queued once
+    dedupe_key = db.Column(db.String, nullable=False, unique=True)
+    mosque_name = db.Column(db.String, nullable=False)
+    additional_info = db.Column(db.Text, nullable=False, default="")
+    submitter_ip = db.Column(db.String, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    # "pending" until delivered ("sent") or out of attempts ("failed")
+    status = db.Column(db.String, nullable=False, default="pending", index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    sent_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+
+    def payload(self):
+        """The webhook body: the fields the sheet has always received, plus the id
+        so a retried delivery can be told apart from a new submission."""
+        return {
+            "mosque_name": self.mosque_name,
+            "additional_info": self.additional_info,
+            "submitter_ip": self.submitter_ip,
+            "submission_id": self.id,
+        }
@@ -0,0 +1,16 @@
+from datetime import datetime, timezone
+
+from models.prayerTimes import db
+
+
+class PrayerTimeEvent(db.Model):
+    """One committed scrape's changes, as {mosque_name: {field: new value}}.
+
+    Web workers tail this table to push updates to their stream subscribers.
+    """
+
+    __tablename__ = "prayer_time_events"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
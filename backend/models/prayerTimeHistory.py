@@ -0,0 +1,83 @@
+from datetime import datetime, timezone
+
+from models.prayerTimes import db
+from schedule_store import EMPTY_ROW, apply_delta, encode_delta, to_row
+
+
+class PrayerTimeHistory(db.Model):
+    """Append-only log of every version of each mosque's times.
+
+    A row stores only the fields that changed since the mosque's previous version
+    (see schedule_store.encode_delta). The first version of each mosque in each
+    month is stored whole, so reading any range only has to start at the first of
+    its month rather than at the beginning of the history.
+    """
+
+    __tablename__ = "prayer_time_history"
+    __table_args__ = (db.Index("ix_prayer_time_history_mosque_date", "mosque_name", "date", "id"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    mosque_name = db.Column(db.String, nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    recorded_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    keyframe = db.Column(db.Boolean, nullable=False, default=False)
+    delta = db.Column(db.LargeBinary, nullable=False)
+
+    @classmethod
+    def append(cls, record, previous=None):
+        """Log `record` (a PrayerTimes) against `previous`, the version it replaces.
+        Returns the new row, or None when nothing changed on the same day."""
+        after = to_row(record)
+        keyframe = previous is None or (previous.date.year, previous.date.month) != (record.date.year, record.date.month)
+        before = EMPTY_ROW if keyframe else to_row(previous)
+
+        delta = encode_delta(before, after)
+        if not keyframe and not delta and previous.date == record.date:
+            return None
+
+        row = cls(mosque_name=record.mosque_name, date=record.date, keyframe=keyframe, delta=delta)
+        db.session.add(row)
+        return row
+
+    @classmethod
+    def versions(cls, names=None, start=None, end=None, session=None):
+        """Yield (mosque name, date, recorded_at, int16 times row, changed field
+        indexes) for every version from `start` to `end`, by mosque then date.
+        `session` defaults to db.session."""
+        query = db.select(cls.mosque_name, cls.date, cls.recorded_at, cls.keyframe, cls.delta)
+        if names is not None:
+            query = query.where(cls.mosque_name.in_(list(names)))
+        if start is not None:
+            query = query.where(cls.date >= start.replace(day=1))
+        if end is not None:
+            query = query.where(cls.date <= end)
+        query = query.order_by(cls.mosque_name, cls.date, cls.id)
+
+        name, row = None, None
+        for mosque_name, day, recorded_at, keyframe, delta in (session or db.session).execute(query).yield_per(1000):
+            if mosque_name != name:
+                name, row = mosque_name, None
+            if keyframe:
+                row = EMPTY_ROW
+            if row is None:
+                # Versions before the month's keyframe can't be rebuilt; only reachable
+                # for history that predates the first keyframe
+                continue
+
+            row, changed = apply_delta(row, delta)
+            if start is None or day >= start:
+                yield mosque_name, day, recorded_at, row, changed
+
+    @classmethod
+    def state_on(cls, name, day, session=None):
+        """The mosque's times as last recorded on or before `day`, as (date, row), or None."""
+        latest = (session or db.session).execute(
+            db.select(cls.date).where(cls.mosque_name == name, cls.date <= day).order_by(cls.date.desc()).limit(1)
+        ).scalar()
+        if latest is None:
+            return None
+
+        state = None
+        for _, recorded_day, _, row, _ in cls.versions([name], latest, latest, session):
+            state = (recorded_day, row)
+        return state
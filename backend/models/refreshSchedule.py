@@ -0,0 +1,22 @@
+from models.prayerTimes import db
+
+
+class RefreshSchedule(db.Model):
+    """When each mosque's page is next checked, learned from how often it changes."""
+
+    __tablename__ = "refresh_schedule"
+
+    mosque_name = db.Column(db.String, primary_key=True)
+
+    # Current gap between checks, and a running estimate of the gap between
+    # raw_text_hash transitions (None until two changes have been seen).
+    interval_hours = db.Column(db.Float, nullable=True)
+    change_interval_hours = db.Column(db.Float, nullable=True)
+
+    last_checked_at = db.Column(db.DateTime, nullable=True)
+    last_changed_at = db.Column(db.DateTime, nullable=True)
+    next_check_at = db.Column(db.DateTime, nullable=True, index=True)
+
+    checks = db.Column(db.Integer, nullable=False, default=0)
+    changes = db.Column(db.Integer, nullable=False, default=0)
+
@@ -0,0 +1,51 @@
+from datetime import datetime, timezone
+
+from models.prayerTimes import db
+from profiling import STAGES
+
+
+class ScrapeRun(db.Model):
+    """What happened to one mosque in one scrape run, and how long each stage took."""
+
+    __tablename__ = "scrape_runs"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    run_id = db.Column(db.String, nullable=False, index=True)
+    mosque_name = db.Column(db.String, nullable=False, index=True)
+    started_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), index=True)
+
+    # "changed", "unchanged" or "failed", and the step that settled it:
+    # not_modified, hash_match, extractor, llm, schedule, rejected or fetch_failed
+    outcome = db.Column(db.String, nullable=False)
+    path = db.Column(db.String, nullable=True)
+    fetch_strategy = db.Column(db.String, nullable=True)
+    extractor = db.Column(db.String, nullable=True)
+
+    fetch_seconds = db.Column(db.Float, nullable=True)
+    navigation_seconds = db.Column(db.Float, nullable=True)
+    extraction_seconds = db.Column(db.Float, nullable=True)
+    clean_seconds = db.Column(db.Float, nullable=True)
+    hash_seconds = db.Column(db.Float, nullable=True)
+    extract_seconds = db.Column(db.Float, nullable=True)
+    llm_seconds = db.Column(db.Float, nullable=True)
+    merge_seconds = db.Column(db.Float, nullable=True)
+
+    text_chars = db.Column(db.Integer, nullable=True)
+    prompt_chars = db.Column(db.Integer, nullable=True)
+    prompt_tokens = db.Column(db.Float, nullable=True)
+    completion_tokens = db.Column(db.Float, nullable=True)
+    blocked_requests = db.Column(db.Integer, nullable=True)
+
+    @classmethod
+    def from_profile(cls, run_id, started_at, name, outcome, values):
+        return cls(
+            run_id=run_id,
+            started_at=started_at,
+            mosque_name=name,
+            outcome=outcome,
+            **{f"{stage}_seconds": values.get(stage) for stage in STAGES},
+            **{key: values.get(key) for key in (
+                "path", "fetch_strategy", "extractor", "text_chars", "prompt_chars",
+                "prompt_tokens", "completion_tokens", "blocked_requests",
+            )},
+        )
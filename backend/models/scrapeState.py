@@ -0,0 +1,51 @@
+import zlib
+from datetime import datetime, timezone
+
+from models.prayerTimes import db
+
+
+class ScrapeState(db.Model):
+    """Per-mosque scraper bookkeeping that survives between runs."""
+
+    __tablename__ = "scrape_state"
+
+    mosque_name = db.Column(db.String, primary_key=True)
+
+    # Fetch strategy that last produced usable text: "httpx" or "playwright".
+    fetch_strategy = db.Column(db.String, nullable=True)
+
+    # HTTP validators and a zlib-compressed copy of the last good static body,
+    # used to send conditional requests and to rebuild text after a 304.
+    etag = db.Column(db.String, nullable=True)
+    last_modified = db.Column(db.String, nullable=True)
+    content_length = db.Column(db.Integer, nullable=True)
+    raw_body = db.Column(db.LargeBinary, nullable=True)
+
+    updated_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    def conditional_headers(self):
+        """Headers for a conditional GET, or {} if there's nothing to revalidate."""
+        if self.raw_body is None:
+            return {}
+
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def store_response(self, validators, body):
+        self.etag = validators.get("etag")
+        self.last_modified = validators.get("last_modified")
+        self.content_length = validators.get("content_length")
+        self.raw_body = zlib.compress(body.encode("utf-8"))
+
+    def cached_body(self):
+        if self.raw_body is None:
+            return None
+        return zlib.decompress(self.raw_body).decode("utf-8")
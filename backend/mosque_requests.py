@@ -0,0 +1,120 @@
+import hashlib
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import requests
+
+from models.mosqueRequest import MosqueRequest
+from models.prayerTimes import db
+from ratelimit import TokenBucket
+
+
+def dedupe_key(mosque_name, additional_info, submitter_ip):
+    """Same mosque, same note, same sender: the same submission, whatever the
+    case and spacing."""
+    normalized = [" ".join(value.split()).casefold() for value in (mosque_name, additional_info)]
+    return hashlib.sha256("\n".join(normalized + [submitter_ip or ""]).encode("utf-8")).hexdigest()
+
+
+class ClientLimiter:
+    """A TokenBucket per client IP, `per_minute` requests a minute in bursts of
+    up to that many. Kept in memory, so each web process limits on its own.
+
+    Once more than `max_clients` are tracked, buckets that have refilled (clients
+    that have gone quiet) are dropped.
+    """
+
+    def __init__(self, per_minute, max_clients=10000, clock=time.monotonic):
+        self.per_minute = per_minute
+        self.max_clients = max_clients
+        self._clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, client):
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                if len(self._buckets) >= self.max_clients:
+                    self._buckets = {
+                        key: b for key, b in self._buckets.items() if b.wait_time(b.capacity) > 0
+                    }
+                bucket = self._buckets[client] = TokenBucket.per_minute(self.per_minute, clock=self._clock)
+            return bucket
+
+    def allow(self, client):
+        """(allowed, seconds until the client may try again)."""
+        bucket = self.bucket(client)
+        if bucket.try_take():
+            return True, 0.0
+        return False, bucket.wait_time()
+
+
+def backoff_seconds(attempts, base, cap, rng=random):
+    """Exponential backoff with full jitter after `attempts` failed deliveries."""
+    return rng.uniform(0, min(cap, base * 2 ** (attempts - 1)))
+
+
+class MosqueRequestSender:
+    """Delivers queued mosque requests to the sheet webhook, over one pooled
+    connection, oldest first. Run from the worker with flush() on a timer."""
+
+    def __init__(self, app, http=None):
+        self.app = app
+        self.http = http or requests.Session()
+
+    def flush(self):
+        """Send up to MOSQUE_REQUEST_BATCH_SIZE due requests. Returns how many were
+        delivered. Stops at the first failure, since the rest would likely fail too."""
+        config = self.app.config
+        url = config["GSHEET_WEBHOOK_URL"]
+        if not url:
+            return 0
+
+        sent = 0
+        with self.app.app_context():
+            now = datetime.now(timezone.utc)
+            due = (
+                MosqueRequest.query
+                .filter(MosqueRequest.status == "pending", MosqueRequest.next_attempt_at <= now)
+                .order_by(MosqueRequest.id)
+                .limit(config["MOSQUE_REQUEST_BATCH_SIZE"])
+                .all()
+            )
+
+            for submission in due:
+                try:
+                    response = self.http.post(url, json=submission.payload(), timeout=config["MOSQUE_REQUEST_TIMEOUT"])
+                    response.raise_for_status()
+                except Exception as e:
+                    self.failed(submission, e, now)
+                    db.session.commit()
+                    break
+
+                submission.status = "sent"
+                submission.sent_at = now
+                submission.attempts += 1
+                # Committed one at a time, so a crash can't send a delivered one again
+                db.session.commit()
+                sent += 1
+
+        if sent or due:
+            print(f"[mosque-request] sent {sent} of {len(due)} due")
+        return sent
+
+    def failed(self, submission, error, now):
+        config = self.app.config
+        submission.attempts += 1
+        submission.last_error = str(error)[:500]
+        if submission.attempts >= config["MOSQUE_REQUEST_MAX_ATTEMPTS"]:
+            submission.status = "failed"
+            print(f"[mosque-request] giving up on #{submission.id} after {submission.attempts} attempts: {error}")
+            return
+
+        delay = backoff_seconds(
+            submission.attempts, config["MOSQUE_REQUEST_BACKOFF_BASE"], config["MOSQUE_REQUEST_BACKOFF_CAP"]
+        )
+        submission.next_attempt_at = now + timedelta(seconds=delay)
+        print(f"[mosque-request] #{submission.id} failed ({error}), retrying in {delay:.0f}s")
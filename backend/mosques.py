@@ -1,8 +1,16 @@
+# Besides name, address, website and coordinates, an entry may set:
+#   "schedule": "monthly"  - the page holds a whole timetable; every dated row is stored
+#   "selector": CSS selector for the prayer-times widget, so only its text is read
+#   "allow_resources": resource types or domains to load although normally blocked
+#   "calculation_method", "asr": how the mosque's own adhan times are calculated
+#       (see astronomy.METHODS and ASR_FACTORS), when they differ from ADHAN_METHOD/ADHAN_ASR
 MOSQUES = [
     {
         "name": "Baitul Aman",
         "address": "3114 Danforth Ave, Scarborough, ON M1L 1B1",
         "website": "https://timing.athanplus.com/masjid/widgets/embed?theme=1&masjid_id=rdRyqDAG&header=no&monthly=v2",
+        # The widget shows the whole month, so every dated row is stored in one pass
+        "schedule": "monthly",
         "latitude": 43.691767549675056,
         "longitude": -79.28748266331257
     },
@@ -27,4 +35,7 @@ MOSQUES = [
         "latitude": 43.70370861787685,
         "longitude": -79.26959493102808
     },
-]
\ No newline at end of file
+]
+
+# Mosques indexed by name, for joining prayer-time rows to their metadata
+MOSQUES_BY_NAME = {m["name"]: m for m in MOSQUES}
@@ -0,0 +1,149 @@
+import re
+from datetime import datetime
+
+from bs4 import BeautifulSoup
+
+# Any time string of the form "H:MM am/pm". Used to detect carousel pages
+# where Playwright only captured hidden slides (no visible times present).
+TIME_PATTERN = re.compile(r"\d{1,2}:\d{2}\s*[apAP]\.?[mM]")
+
+PRAYERS = ["fajr", "zuhr", "asr", "maghrib", "isha"]
+JUMMAH_SLOTS = ["jummah1", "jummah2", "jummah3"]
+
+# The 16 start/iqamah fields every extraction produces
+FIELDS = [f"{p}_{kind}" for p in PRAYERS + JUMMAH_SLOTS for kind in ("start", "iqamah")]
+DAILY_FIELDS = [f"{p}_{kind}" for p in PRAYERS for kind in ("start", "iqamah")]
+
+# Words that mark text as being about prayer times, in the spellings sites use
+PRAYER_KEYWORDS = re.compile(
+    r"\b(fajr|fajar|fajir|dhuhr|zuhr|duhr|zohr|zuhur|thuhr|asr|asar|maghrib|magrib|maghreb|isha|esha|"
+    r"jumm?u?'?ah|juma|jumma|khutbah?|iqamah?|iqamat|adhan|athan|azan|sunrise|shurooq|prayer times?|salah|salat)\b",
+    re.IGNORECASE,
+)
+
+# Separates the windows kept by prune_text
+PRUNE_SEPARATOR = " ... "
+
+
+def html_to_text(html, selector=None):
+    """Page text, one node per line. With a CSS `selector`, only the text of the
+    matching elements, or the whole page if nothing matches."""
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(["script", "style", "noscript"]):
+        tag.decompose()
+
+    if selector:
+        matches = soup.select(selector)
+        if matches:
+            return "\n".join(match.get_text(separator="\n") for match in matches)
+
+    return soup.get_text(separator="\n")
+
+
+# Helper function to parse and format time strings
+def format_time(value):
+    if not value or value.strip().lower() in ["null", "none"] :
+        return None
+
+    try:
+        dt = datetime.strptime(value.strip(), "%I:%M %p")
+        return dt.time()
+    except ValueError:
+        return None
+
+# Normalize prayer times to ensure correct start/iqamah assignment
+def normalize_prayer_times(prayer_json):
+    def normalize_pair(start, iqamah):
+        start_t, iqamah_t = format_time(start), format_time(iqamah)
+
+        # Case 1: both times present but out of order → fix
+        if start_t and iqamah_t and start_t >= iqamah_t:
+            # swap if clearly reversed
+            return iqamah, start
+
+        # Case 2: only one time given → assume iqamah
+        if start_t and not iqamah_t:
+            return None, start
+        if iqamah_t and not start_t:
+            return None, iqamah
+
+        # Case 3: both null → leave as is
+        return start, iqamah
+
+    # Apply normalization to all 5 daily prayers
+    for p in PRAYERS:
+        start_key, iqamah_key = f"{p}_start", f"{p}_iqamah"
+        prayer_json[start_key], prayer_json[iqamah_key] = normalize_pair(
+            prayer_json.get(start_key), prayer_json.get(iqamah_key)
+        )
+
+    return prayer_json
+
+# Normalize an extraction (LLM or rule-based) and parse all 16 fields into time objects
+def to_times(fields):
+    normalized = normalize_prayer_times(dict(fields))
+    return {field: format_time(normalized.get(field)) for field in FIELDS}
+
+def clean_text(raw):
+    # Normalize all line breaks and tabs to spaces
+    text = re.sub(r"[\n\t]+", " ", raw)
+
+    # Collapse multiple spaces into one
+    text = re.sub(r"\s{2,}", " ", text)
+
+    # Ensure there is a space after punctuation like commas, colons, periods
+    text = re.sub(r"([,.:])([^\s])", r"\1 \2", text)
+
+    # Fix broken time splits like "2 :30" or "2\n:30" to "2:30"
+    text = re.sub(r"(\d{1,2})\s*:\s*(\d{2})", r"\1:\2", text)
+
+    # Ensure a space before AM/PM if missing
+    text = re.sub(r"(\d{1,2}:\d{2})([apAP][mM])", r"\1 \2", text)
+
+    # Fix split AM/PM markers like "10:30 p m" -> "10:30 pm"
+    text = re.sub(r"(\d{1,2}:\d{2})\s+([apAP])\s+([mM])\b", r"\1 \2\3", text)
+
+    return text
+
+def prune_text(text, budget, window=300):
+    """Cut `text` down to about `budget` characters around its prayer times.
+
+    Every time string and prayer keyword is an anchor; anchors within `window`
+    characters of each other merge into one span, padded by `window` on both
+    sides. Spans are kept densest first (times count double) while they fit
+    the budget, then joined back in page order, so a prayer table survives while
+    menus, donation appeals and event listings fall away. Text already within
+    budget, or with no anchors at all, is returned as is.
+    """
+    if budget <= 0 or len(text) <= budget:
+        return text
+
+    anchors = sorted(
+        [(m.start(), m.end(), 2) for m in TIME_PATTERN.finditer(text)]
+        + [(m.start(), m.end(), 1) for m in PRAYER_KEYWORDS.finditer(text)]
+    )
+    if not anchors:
+        return text
+
+    spans = []
+    for start, end, weight in anchors:
+        start, end = max(0, start - window), min(len(text), end + window)
+        if spans and start <= spans[-1][1]:
+            spans[-1][1] = max(spans[-1][1], end)
+            spans[-1][2] += weight
+        else:
+            spans.append([start, end, weight])
+
+    kept = []
+    remaining = budget
+    for start, end, score in sorted(spans, key=lambda span: span[2] / (span[1] - span[0]), reverse=True):
+        if remaining <= 0:
+            break
+        # The densest span is kept whole even when over budget: cutting into a
+        # timetable could drop the very row the LLM is looking for
+        if kept and end - start > remaining:
+            continue
+        kept.append((start, end))
+        remaining -= end - start
+
+    return PRUNE_SEPARATOR.join(text[start:end].strip() for start, end in sorted(kept))
@@ -0,0 +1,45 @@
+import statistics
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Timed stages of a mosque's trip through the pipeline, in order. navigation and
+# extraction are the Playwright part of fetch; llm is the wait for an extraction,
+# batching and cache included.
+STAGES = ("fetch", "navigation", "extraction", "clean", "hash", "extract", "llm", "merge")
+
+
+class RunProfile:
+    """Per-mosque stage timings and facts for one scrape run.
+
+    span() may wrap awaits, so mosques processed concurrently each get their
+    own wall-clock time for a stage.
+    """
+
+    def __init__(self):
+        self.mosques = defaultdict(dict)
+
+    @contextmanager
+    def span(self, name, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            values = self.mosques[name]
+            values[stage] = values.get(stage, 0.0) + time.perf_counter() - started
+
+    def note(self, name, **values):
+        self.mosques[name].update(values)
+
+    def summary(self):
+        """{stage: {"total", "p50", "max"}} in seconds, over the mosques that reached it."""
+        result = {}
+        for stage in STAGES:
+            seconds = sorted(values[stage] for values in self.mosques.values() if stage in values)
+            if seconds:
+                result[stage] = {
+                    "total": round(sum(seconds), 2),
+                    "p50": round(statistics.median(seconds), 2),
+                    "max": round(seconds[-1], 2),
+                }
+        return result
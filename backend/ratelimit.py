@@ -0,0 +1,48 @@
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """Allows `rate` units per second on average, in bursts of up to `capacity`.
+
+    try_take() is safe to call from several threads; take() waits on the event
+    loop until the units are available.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, amount, **kwargs):
+        return cls(amount / 60, amount, **kwargs)
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self, amount=1):
+        with self._lock:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return True
+            return False
+
+    def wait_time(self, amount=1):
+        """Seconds until `amount` units could be taken."""
+        with self._lock:
+            self._refill()
+            return max(0.0, (amount - self._tokens) / self.rate)
+
+    async def take(self, amount=1):
+        # More than a full bucket could never be granted; cap it at one full bucket
+        amount = min(amount, self.capacity)
+        while not self.try_take(amount):
+            await asyncio.sleep(self.wait_time(amount))
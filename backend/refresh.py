@@ -0,0 +1,113 @@
+import random
+from datetime import datetime, time, timedelta, timezone
+
+# How much longer to wait after each check that found nothing new
+BACKOFF = 1.5
+
+# Weight of the newest gap in the running estimate of how often a site changes
+CHANGE_WEIGHT = 0.5
+
+# Local hour at which a site is first checked on a known change day
+CHANGE_DAY_HOUR = 3
+
+
+def as_utc(value):
+    """SQLite hands back naive datetimes; everything here is stored in UTC."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def change_days(start, end, tz, extra=()):
+    """Dates from `start` to `end` on which timetables tend to change: the first
+    of each month, DST switches in `tz`, and any `extra` dates (e.g. Ramadan)."""
+    days = {day for day in extra if start <= day <= end}
+    day = start
+    while day <= end:
+        noon = datetime.combine(day, time(12), tz)
+        if day.day == 1 or noon.utcoffset() != (noon - timedelta(days=1)).utcoffset():
+            days.add(day)
+        day += timedelta(days=1)
+    return sorted(days)
+
+
+class RefreshPolicy:
+    """Decides when each mosque's page is next worth fetching.
+
+    Every check that finds the page unchanged stretches that mosque's interval
+    (up to `max_hours`); a change shrinks it to half of how often the site has
+    been seen to change (down to `min_hours`). Around known change days the
+    interval drops back to the minimum, and every delay gets a little random
+    jitter so mosques drift apart instead of all coming due together.
+    """
+
+    def __init__(self, tz, min_hours=6, max_hours=96, default_hours=24, jitter=0.1,
+                 change_dates=(), rng=None):
+        self.tz = tz
+        self.min_hours = min_hours
+        self.max_hours = max_hours
+        self.default_hours = default_hours
+        self.jitter = jitter
+        self.change_dates = tuple(change_dates)
+        self.rng = rng or random.Random()
+
+    def _clamp(self, hours):
+        return min(max(hours, self.min_hours), self.max_hours)
+
+    def _next_change_day(self, now, within):
+        today = now.astimezone(self.tz).date()
+        # A change day that has just passed still counts: sites update a day or two late
+        days = change_days(today - timedelta(days=2), (now + within).astimezone(self.tz).date(),
+                           self.tz, self.change_dates)
+        return days[0] if days else None
+
+    def update(self, entry, outcome, now):
+        """Record a check's `outcome` ("changed", "unchanged" or "failed") on
+        `entry` and set its next_check_at."""
+        interval = entry.interval_hours or self.default_hours
+
+        if outcome == "changed":
+            last_changed = as_utc(entry.last_changed_at)
+            if last_changed is not None:
+                gap = (now - last_changed).total_seconds() / 3600
+                if entry.change_interval_hours is None:
+                    entry.change_interval_hours = gap
+                else:
+                    entry.change_interval_hours += CHANGE_WEIGHT * (gap - entry.change_interval_hours)
+                interval = entry.change_interval_hours / 2
+            else:
+                interval /= 2
+            entry.last_changed_at = now
+            entry.changes = (entry.changes or 0) + 1
+        elif outcome == "unchanged":
+            interval *= BACKOFF
+
+        interval = self._clamp(interval)
+        entry.interval_hours = interval
+        entry.last_checked_at = now
+        entry.checks = (entry.checks or 0) + 1
+
+        # A failed fetch or extraction says nothing about the site; just try again soon
+        delay = timedelta(hours=self.min_hours if outcome == "failed" else interval)
+
+        change_day = self._next_change_day(now, delay)
+        if change_day is not None:
+            first_check = datetime.combine(change_day, time(CHANGE_DAY_HOUR), self.tz)
+            if first_check > now:
+                delay = min(delay, first_check - now)
+            else:
+                delay = min(delay, timedelta(hours=self.min_hours))
+
+        # Expect the next change about as long after the last one as usual
+        last_changed = as_utc(entry.last_changed_at)
+        if outcome != "failed" and last_changed is not None and entry.change_interval_hours:
+            expected = last_changed + timedelta(hours=entry.change_interval_hours) - now
+            if timedelta(hours=self.min_hours) <= expected < delay:
+                delay = expected
+
+        delay *= self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+        entry.next_check_at = now + delay
+        return entry.next_check_at
+
+    def is_due(self, entry, now):
+        return entry is None or entry.next_check_at is None or as_utc(entry.next_check_at) <= now
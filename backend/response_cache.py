@@ -0,0 +1,52 @@
+import hashlib
+import threading
+from collections import namedtuple
+
+CachedResponse = namedtuple("CachedResponse", ["data", "body", "etag"])
+
+
+class ResponseCache:
+    """A response's data, its serialized body and a strong ETag, rebuilt on first
+    use after each invalidation. `build` returns the data and `serialize` turns it
+    into the bytes to serve.
+
+    invalidate() may run while a rebuild is in progress; each one bumps a
+    generation, and a build that started before it is served to its caller
+    but not kept.
+    """
+
+    def __init__(self, build, serialize):
+        self._build = build
+        self._serialize = serialize
+        self._lock = threading.Lock()
+        # Held only to compare-and-store, so invalidate() never waits on a build
+        self._store_lock = threading.Lock()
+        self._entry = None
+        self._generation = 0
+
+    def get(self):
+        """Return the CachedResponse, rebuilding it if it was invalidated."""
+        entry = self._entry
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            entry = self._entry
+            if entry is None:
+                generation = self._generation
+                data = self._build()
+                body = self._serialize(data)
+                entry = CachedResponse(data, body, body_etag(body))
+                with self._store_lock:
+                    if generation == self._generation:
+                        self._entry = entry
+            return entry
+
+    def invalidate(self):
+        with self._store_lock:
+            self._generation += 1
+            self._entry = None
+
+
+def body_etag(body):
+    return hashlib.sha256(body).hexdigest()[:32]
@@ -0,0 +1,197 @@
+import json
+import struct
+from datetime import date, time, timezone
+
+import numpy as np
+
+from parsing import FIELDS
+
+# A day's 16 start/iqamah times, as minutes past midnight, missing ones as -1
+MISSING = -1
+ROW_DTYPE = np.dtype("<i2")
+ROW_BYTES = ROW_DTYPE.itemsize * len(FIELDS)
+FIELD_INDEX = {field: i for i, field in enumerate(FIELDS)}
+
+# Every field at every minute of the day as it appears in the JSON responses
+# ('"fajr_start": "05:30:00"'), with null last so that MISSING indexes it
+JSON_PAIRS = np.array(
+    [[f'"{field}": "{m // 60:02d}:{m % 60:02d}:00"' for m in range(24 * 60)] + [f'"{field}": null'] for field in FIELDS],
+    dtype=object,
+)
+
+# Every minute of the day as PrayerTimes.to_dict writes it, with None last
+TIME_STRINGS = np.array([f"{m // 60:02d}:{m % 60:02d}:00" for m in range(24 * 60)] + [None], dtype=object)
+
+# A change to one field: its index in FIELDS and the new minutes
+DELTA_DTYPE = np.dtype([("field", "u1"), ("minutes", ROW_DTYPE)])
+EMPTY_ROW = np.full(len(FIELDS), MISSING, dtype=ROW_DTYPE)
+
+# Binary export: a header, then one fixed-size record per mosque and day
+BINARY_MAGIC = b"PTS1"
+BINARY_RECORD = np.dtype([("mosque", "<u2"), ("day", "<i4"), ("minutes", ROW_DTYPE, (len(FIELDS),))])
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def to_minutes(value):
+    return MISSING if value is None else value.hour * 60 + value.minute
+
+
+def encode(times):
+    """Pack {field: time or None} into ROW_BYTES bytes."""
+    return to_row(times).tobytes()
+
+
+def to_row(times):
+    """{field: time or None}, or an object with the 16 field attributes, as an int16 row."""
+    get = times.get if isinstance(times, dict) else lambda field: getattr(times, field)
+    return np.array([to_minutes(get(field)) for field in FIELDS], dtype=ROW_DTYPE)
+
+
+def encode_delta(before, after):
+    """The fields of row `after` that differ from row `before`, packed as
+    DELTA_DTYPE pairs (3 bytes per changed field)."""
+    changed = np.flatnonzero(before != after)
+    delta = np.empty(len(changed), dtype=DELTA_DTYPE)
+    delta["field"] = changed
+    delta["minutes"] = after[changed]
+    return delta.tobytes()
+
+
+def apply_delta(row, blob):
+    """A copy of `row` with encode_delta()'s changes applied, and the changed field indexes."""
+    delta = np.frombuffer(blob, dtype=DELTA_DTYPE)
+    row = row.copy()
+    row[delta["field"]] = delta["minutes"]
+    return row, delta["field"]
+
+
+def json_pairs(minutes):
+    """'"field": "HH:MM:00"' strings for each row of a (rows, 16) minutes array."""
+    minutes = np.where(minutes == MISSING, JSON_PAIRS.shape[1] - 1, minutes)
+    return JSON_PAIRS[np.arange(len(FIELDS)), minutes].tolist()
+
+
+def time_strings(minutes):
+    """"HH:MM:00" strings, or None where missing, for each row of a (rows, 16) minutes array."""
+    return TIME_STRINGS[np.where(minutes == MISSING, len(TIME_STRINGS) - 1, minutes)].tolist()
+
+
+def utc_isoformat(stamp):
+    """A scrape timestamp as PrayerTimes.to_dict gives it; SQLite hands back naive UTC."""
+    if stamp is not None and stamp.tzinfo is None:
+        stamp = stamp.replace(tzinfo=timezone.utc)
+    return stamp.isoformat() if stamp else None
+
+
+def decode(blob):
+    """{field: time or None} from encode()'s bytes."""
+    return {
+        field: None if m == MISSING else time(m // 60, m % 60)
+        for field, m in zip(FIELDS, np.frombuffer(blob, dtype=ROW_DTYPE).tolist())
+    }
+
+
+class DayTimes:
+    """One mosque's stored day, read like a PrayerTimes row: `fajr_iqamah` and the
+    other fields are datetime.time or None, decoded only when asked for."""
+
+    __slots__ = ("mosque_name", "date", "minutes")
+
+    def __init__(self, mosque_name, day, minutes):
+        self.mosque_name = mosque_name
+        self.date = day
+        self.minutes = minutes
+
+    def __getattr__(self, field):
+        if field not in FIELD_INDEX:
+            raise AttributeError(field)
+        m = int(self.minutes[FIELD_INDEX[field]])
+        return None if m == MISSING else time(m // 60, m % 60)
+
+
+class ScheduleBlock:
+    """Stored days for a range of mosques and dates, held as columns: mosque names,
+    date ordinals, and a (rows, 16) int16 array of minutes."""
+
+    def __init__(self, names, ordinals, minutes, updated):
+        self.names = names
+        self.ordinals = ordinals
+        self.minutes = minutes
+        self.updated = updated
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from (mosque_name, date, times blob, updated_at) tuples."""
+        rows = list(rows)
+        return cls(
+            [row[0] for row in rows],
+            np.array([row[1].toordinal() for row in rows], dtype=np.int32),
+            np.frombuffer(b"".join(row[2] for row in rows), dtype=ROW_DTYPE).reshape(len(rows), len(FIELDS)),
+            [row[3] for row in rows],
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def days(self):
+        """DayTimes for every row, in order."""
+        return [
+            DayTimes(name, date.fromordinal(int(ordinal)), row)
+            for name, ordinal, row in zip(self.names, self.ordinals, self.minutes)
+        ]
+
+    def json_rows(self):
+        """Each row as a JSON object in the shape of PrayerTimes.to_dict, as text.
+        Built from precomputed pieces, without a dict or time object per row."""
+        pairs = json_pairs(self.minutes)
+
+        # Names, dates and scrape timestamps repeat across rows, so each is encoded once
+        names = {name: json.dumps(name) for name in set(self.names)}
+        dates = {ordinal: date.fromordinal(ordinal).isoformat() for ordinal in set(self.ordinals.tolist())}
+        stamps = {updated: json.dumps(utc_isoformat(updated)) for updated in set(self.updated)}
+
+        return [
+            f'{{"mosque_name": {names[name]}, "date": "{dates[ordinal]}", {", ".join(row)}, "updated_at": {stamps[updated]}}}'
+            for name, ordinal, row, updated in zip(self.names, self.ordinals.tolist(), pairs, self.updated)
+        ]
+
+    def to_json(self):
+        return "[" + ", ".join(self.json_rows()) + "]"
+
+    def to_dicts(self):
+        """Each row as PrayerTimes.to_dict would give it, built from the minutes
+        array directly rather than through time objects."""
+        dates = {ordinal: date.fromordinal(ordinal).isoformat() for ordinal in set(self.ordinals.tolist())}
+        stamps = {updated: utc_isoformat(updated) for updated in set(self.updated)}
+        return [
+            {"mosque_name": name, "date": dates[ordinal], **dict(zip(FIELDS, row)), "updated_at": stamps[updated]}
+            for name, ordinal, row, updated in zip(self.names, self.ordinals.tolist(), time_strings(self.minutes), self.updated)
+        ]
+
+    def to_binary(self):
+        """BINARY_MAGIC, a little-endian uint32 header length, a JSON header naming
+        the mosques and fields, then BINARY_RECORD rows: mosque index, days since
+        1970-01-01, and the 16 minutes (-1 when missing). updated_at is left out."""
+        mosques = sorted(set(self.names))
+        index = {name: i for i, name in enumerate(mosques)}
+        header = json.dumps({"mosques": mosques, "fields": FIELDS, "count": len(self)}).encode("utf-8")
+
+        records = np.empty(len(self), dtype=BINARY_RECORD)
+        records["mosque"] = [index[name] for name in self.names]
+        records["day"] = self.ordinals - EPOCH_ORDINAL
+        records["minutes"] = self.minutes
+        return BINARY_MAGIC + struct.pack("<I", len(header)) + header + records.tobytes()
+
+    @classmethod
+    def from_binary(cls, data):
+        if data[:4] != BINARY_MAGIC:
+            raise ValueError("not a prayer schedule export")
+        (length,) = struct.unpack("<I", data[4:8])
+        header = json.loads(data[8:8 + length])
+        records = np.frombuffer(data, dtype=BINARY_RECORD, offset=8 + length, count=header["count"])
+        return cls(
+            [header["mosques"][i] for i in records["mosque"].tolist()],
+            records["day"].astype(np.int32) + EPOCH_ORDINAL,
+            records["minutes"],
+            [None] * len(records),
+        )
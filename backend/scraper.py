@@ -0,0 +1,952 @@
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import httpx
+from dotenv import load_dotenv
+from flask import current_app
+from openai import AsyncOpenAI
+
+from astronomy import AdhanTable
+from browser_pool import BrowserPool
+from extractors import run_calendar_extractors, run_extractors
+from llm_batch import ExtractionBatcher
+from llm_cache import ExtractionCache, cache_key
+from llm_client import LLMClient
+from models.dailySchedule import DailySchedule
+from models.prayerTimeEvent import PrayerTimeEvent
+from models.prayerTimeHistory import PrayerTimeHistory
+from models.prayerTimes import PrayerTimes, db
+from models.refreshSchedule import RefreshSchedule
+from models.llmCacheRun import LLMCacheRun
+from models.scrapeRun import ScrapeRun
+from models.scrapeState import ScrapeState
+from mosques import MOSQUES
+from parsing import DAILY_FIELDS, FIELDS, PRAYERS, TIME_PATTERN, clean_text, html_to_text, prune_text, to_times
+from profiling import RunProfile
+from ratelimit import TokenBucket
+from refresh import RefreshPolicy
+
+EASTERN = ZoneInfo("America/Toronto")
+
+BLOCK_MARKERS = (
+    # Generic 403 phrases
+    "403 - forbidden",
+    "403 forbidden",
+    "error 403",
+    "access to this page is forbidden",
+    "access denied",
+    "you have been blocked",
+    # Cloudflare challenge pages
+    "just a moment",
+    "checking your browser",
+    "enable javascript and cookies to continue",
+    "attention required! | cloudflare",
+    # Bot / captcha walls
+    "are you human",
+    "complete the captcha",
+    "automated access",
+)
+
+MIN_TIMES_EXPECTED = 3
+
+
+class ExtractionError(Exception):
+    """A fetched page yielded no usable times: the LLM call failed, or what came
+    back was rejected. The mosque keeps its stored times and is retried soon."""
+
+LLM_MODEL = "gpt-5.1"
+# Bump whenever PROMPT_TEMPLATE changes so cached extractions from the old prompt are not reused.
+PROMPT_VERSION = "1"
+SCHEDULE_PROMPT_VERSION = "1"
+# A month of rows needs far more room than a single day
+SCHEDULE_MAX_COMPLETION_TOKENS = 8000
+
+# Collects the text of every visible node on the page, one node per line.
+VISIBLE_TEXT_SCRIPT = """
+    () => {
+        const walker = document.createTreeWalker(
+            document.body,
+            NodeFilter.SHOW_TEXT,
+            {
+                acceptNode: (node) => {
+                    if (!node.parentElement) return NodeFilter.FILTER_REJECT;
+                    const style = window.getComputedStyle(node.parentElement);
+                    if (style.display === "none" || style.visibility === "hidden") {
+                        return NodeFilter.FILTER_REJECT;
+                    }
+                    return NodeFilter.FILTER_ACCEPT;
+                }
+            }
+        );
+
+        let content = [];
+        while (walker.nextNode()) {
+            const value = walker.currentNode.nodeValue.trim();
+            if (value.length > 0) content.push(value);
+        }
+        return content.join("\\n");
+    }
+"""
+
+# Load environment variables from a .env file
+load_dotenv()
+
+_llm_cache = None
+
+
+def get_llm_cache():
+    """The process-wide extraction cache, configured from the current app."""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = ExtractionCache(
+            ttl=timedelta(days=current_app.config["LLM_CACHE_TTL_DAYS"]),
+            max_entries=current_app.config["LLM_CACHE_MAX_ENTRIES"],
+        )
+    return _llm_cache
+
+
+def make_llm_client():
+    """An LLM client for one scrape run; its budget and stats cover just that run."""
+    config = current_app.config
+    return LLMClient(
+        AsyncOpenAI(api_key=os.environ["OPENAI_API_KEY"], max_retries=0),
+        LLM_MODEL,
+        requests_bucket=TokenBucket.per_minute(config["LLM_REQUESTS_PER_MINUTE"]),
+        tokens_bucket=TokenBucket.per_minute(config["LLM_TOKENS_PER_MINUTE"]),
+        max_concurrency=config["LLM_MAX_CONCURRENCY"],
+        max_retries=config["LLM_MAX_RETRIES"],
+        timeout=config["LLM_TIMEOUT"],
+        token_budget=config["LLM_RUN_TOKEN_BUDGET"],
+    )
+
+# Return why a fetched page can't be used, or None if it looks like a prayer-times page
+def page_problem(text):
+    if not text or any(m in text.lower() for m in BLOCK_MARKERS):
+        return "block page detected"
+
+    if len(TIME_PATTERN.findall(text)) < MIN_TIMES_EXPECTED:
+        return "too few times in visible text (carousel/hidden slides?)"
+
+    return None
+
+async def fetch_via_requests(mosque, http, state=None):
+    # NOTE: Some mosque WAFs (e.g. irccan.com) block requests that claim to be
+    # a browser via a spoofed User-Agent but lack a matching browser TLS
+    # fingerprint. A plain client with a consistent fingerprint is served
+    # normally, so we intentionally do NOT send browser-spoofing headers here.
+    try:
+        # Revalidate against the last body we stored, if the site gave us validators
+        headers = state.conditional_headers() if state is not None else {}
+        response = await http.get(mosque["website"], headers=headers)
+
+        if response.status_code == 304:
+            print(f"[httpx] {mosque['name']} not modified (304)")
+            return {**mosque, "not_modified": True, "raw_html": state.cached_body()}
+
+        response.raise_for_status()
+
+        content_length = response.headers.get("content-length")
+        return {
+            **mosque,
+            "raw_text": html_to_text(response.text, mosque.get("selector")),
+            "raw_html": response.text,
+            "validators": {
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "content_length": int(content_length) if content_length else len(response.content),
+            },
+        }
+    except Exception as e:
+        print(f"[httpx] Failed for {mosque['name']}: {e}")
+        return None
+
+# True once at least `minTimes` time strings are on the page and their count
+# held steady since the previous poll, so a widget filling in row by row is
+# read after it finishes. Mirrors TIME_PATTERN.
+PAGE_READY_SCRIPT = """
+    (minTimes) => {
+        const count = (document.body.innerText.match(/\\d{1,2}:\\d{2}\\s*[apAP]\\.?[mM]/g) || []).length;
+        const previous = window.__prayerTimesCount;
+        window.__prayerTimesCount = count;
+        return count >= minTimes && count === previous;
+    }
+"""
+
+# Visible text with table structure kept: each table row becomes one
+# "cell | cell | cell" line, everything else one line per text node. Styles are
+# read once per element and a hidden element's subtree is skipped whole, instead
+# of a getComputedStyle call for every text node. With a selector, only the
+# matching elements are read (falling back to the whole body if none match).
+STRUCTURED_TEXT_SCRIPT = """
+    (selector) => {
+        const SKIP = new Set(["SCRIPT", "STYLE", "NOSCRIPT", "TEMPLATE", "SVG", "IFRAME"]);
+        const styles = new WeakMap();
+
+        const styleOf = (el) => {
+            let style = styles.get(el);
+            if (style === undefined) {
+                const computed = window.getComputedStyle(el);
+                style = { display: computed.display, visibility: computed.visibility };
+                styles.set(el, style);
+            }
+            return style;
+        };
+        const displayed = (el) => !SKIP.has(el.tagName.toUpperCase()) && styleOf(el).display !== "none";
+        const shown = (el) => {
+            for (let node = el; node && node !== document.documentElement; node = node.parentElement) {
+                if (!displayed(node)) return false;
+            }
+            return true;
+        };
+
+        // Visible text under `el`, as a list of trimmed strings
+        const texts = (el, out = []) => {
+            for (const child of el.childNodes) {
+                if (child.nodeType === Node.TEXT_NODE) {
+                    const value = child.nodeValue.trim();
+                    if (value && styleOf(el).visibility !== "hidden") out.push(value);
+                } else if (child.nodeType === Node.ELEMENT_NODE && displayed(child)) {
+                    if (child.tagName === "TABLE") table(child, out);
+                    else texts(child, out);
+                }
+            }
+            return out;
+        };
+
+        const table = (el, out) => {
+            out.push("");
+            for (const row of el.rows) {
+                if (!displayed(row)) continue;
+                const cells = [];
+                for (const cell of row.cells) {
+                    if (!displayed(cell)) continue;
+                    const value = texts(cell).join(" ");
+                    for (let i = 0; i < Math.max(1, cell.colSpan); i++) cells.push(value);
+                }
+                if (cells.some((value) => value)) out.push(cells.join(" | "));
+            }
+            out.push("");
+        };
+
+        let roots = selector ? [...document.querySelectorAll(selector)].filter(shown) : [];
+        const matched = roots.length;
+        if (!matched) roots = [document.body];
+
+        const lines = [];
+        for (const root of roots) {
+            if (root.tagName === "TABLE") table(root, lines);
+            else texts(root, lines);
+        }
+        return { text: lines.join("\\n").replace(/\\n{3,}/g, "\\n\\n"), matched };
+    }
+"""
+
+async def scrape_mosque_playwright(mosque, pool):
+    name = mosque["name"]
+    try:
+        async with pool.page(name, mosque.get("allow_resources", ())) as page:
+            async with pool.timed(name, "navigation"):
+                await page.goto(mosque["website"], wait_until="domcontentloaded", timeout=120_000)
+
+                # Ready once the times have rendered, instead of a fixed sleep
+                try:
+                    await page.wait_for_function(
+                        PAGE_READY_SCRIPT,
+                        arg=MIN_TIMES_EXPECTED,
+                        polling=250,
+                        timeout=current_app.config["PAGE_READY_TIMEOUT"] * 1000,
+                    )
+                except Exception:
+                    print(f"[Playwright] {name} showed no prayer times in time, reading it anyway")
+
+            # Get visible text only
+            async with pool.timed(name, "extraction"):
+                if current_app.config["STRUCTURED_TEXT"]:
+                    extracted = await page.evaluate(STRUCTURED_TEXT_SCRIPT, mosque.get("selector"))
+                    text = extracted["text"]
+                    if mosque.get("selector") and not extracted["matched"]:
+                        print(f"[Playwright] Selector {mosque['selector']!r} matched nothing for {name}, using the whole page")
+                else:
+                    text = await page.evaluate(VISIBLE_TEXT_SCRIPT)
+                html = await page.content()
+
+    except Exception as e:
+        print(f"[Playwright] Failed for {name}: {e}")
+        return None
+
+    return {
+        **mosque,
+        "raw_text": text,
+        "raw_html": html,
+        "timings": pool.timings.get(name, {}),
+    }
+
+# Try the cheap static fetch first and only pay for a browser when the page
+# needs one. A mosque whose last good fetch came from Playwright goes there first.
+async def scrape_mosque(mosque, state, http, pool):
+    strategy = state.fetch_strategy if state is not None else None
+    if strategy == "playwright":
+        order = ["playwright", "httpx"]
+    else:
+        order = ["httpx", "playwright"]
+
+    for attempt in order:
+        if attempt == "httpx":
+            # Only revalidate when the static body itself was the source of the
+            # times; a JS-rendered site can change behind an unchanged HTML shell.
+            result = await fetch_via_requests(mosque, http, state if strategy == "httpx" else None)
+        else:
+            result = await scrape_mosque_playwright(mosque, pool)
+
+        if result is None:
+            continue
+
+        if result.get("not_modified"):
+            return {**result, "fetch_strategy": attempt}
+
+        problem = page_problem(result["raw_text"])
+        if problem:
+            print(f"[{attempt}] {problem} for {mosque['name']}")
+            continue
+
+        return {**result, "fetch_strategy": attempt}
+
+    return None
+
+# The extraction rules and schema, shared by single and batched prompts
+EXTRACTION_RULES = """
+                Extract the prayer times from the following text.
+
+                TODAY'S DATE: {today}
+
+                - Some pages list prayer times for SEVERAL DAYS at once (a weekly/monthly calendar, or
+                the same set of prayers repeated once per day). In that case, extract ONLY the block or
+                row belonging to TODAY'S DATE above, and ignore every other date.
+                - If the text repeats several similar day-blocks but none of them is labelled with a date
+                you can match to today, use the FIRST block and treat the rest as duplicates to ignore.
+                - If the text only covers a single day (no dates, or one date), ignore the two rules above
+                and extract the times normally.
+
+                - Prayer times must be copied exactly as written in the text (e.g., "10:00 PM" stays "10:00 PM").
+                - Do not round, adjust, or guess times.
+                - If multiple times are present for the same prayer, still apply the earliest= start, latest= iqamah rule,
+                but the values themselves must be identical to the original text. 
+                - Prayer names may have different spellings (e.g., "Fajr" → "Fajar", "Maghrib" → "Magrib").
+                - {{prayer}}_start is also referred as *adhan* / *begins* / *khutbah* / *azan* etc. 
+                - {{prayer}}_iqamah refers to the later congregational prayer time (*salah* / *salat*).
+                - If multiple times are listed for the same prayer, use the **earliest** as {{prayer}}_start
+                and the **latest** as {{prayer}}_iqamah.
+                - ⚠️ If **only one time** is mentioned for a prayer, assign the value to {{prayer}}_iqamah and set
+                {{prayer}}_start = null. 
+                - ⚠️ Sometimes times are joined directly with words without spaces (e.g., "Khutbah1:30pm" or "Iqamah2:00pm").
+                In such cases, you must still detect and extract the time exactly as written ("1:30pm", "2:00pm").
+                 Do not ignore times just because they are attached to words.
+                - ⚠️ Sometimes times are broken by newlines or irregular spacing (e.g.,
+                "6\n:30\npm" should be understood as "6:30 pm").
+                You must normalize and extract the correct time string exactly as written, without losing AM/PM.
+                - If you can't find a valid time for a prayer, (ex: sometimes Maghrib times are represented as 'sunset' 
+                in websites) set the value = null.
+
+                - Only move on to jummah timings once you have completed evaluating values for fajr, zuhr, asr, maghrib and isha.
+                - Jummmah (Friday) prayer can have up to 3 slots: jummah1, jummah2, jummah3.
+                - Jummah (Friday) prayer times:
+                    - After assigning Fajr, Zuhr, Asr, Maghrib, and Isha, re-check the text for any times between 12:00 PM and 5:00 PM.
+                    - ALL times in that range, near other jummah timings, must be treated as Jummah times, even if not labeled with the word "Jummah" or
+                    it's alternate spellings.
+                    - PRIORITY RULE — Numbered slot labels (apply BEFORE the count-based pairing rule below):
+                        * If each Jummah time is accompanied by an explicit numbered slot label such as
+                          "Jumuah 1" / "Jumuah 2" / "Jumuah 3",
+                          "Jamat 1" / "Jamat 2" / "Jamat 3",
+                          "1st Jamat" / "2nd Jamat" / "3rd Jamat",
+                          "Jumu'ah 1" / "1st Jumu'ah" / etc.,
+                          then each labeled time is its OWN iqamah. Map directly:
+                            - slot-1 label → jummah1_iqamah
+                            - slot-2 label → jummah2_iqamah
+                            - slot-3 label → jummah3_iqamah
+                          Set jummahN_start = null UNLESS that time is also explicitly preceded by
+                          "Khutbah" / "Adhan" / "Azan" / "Begins" (in which case the start/iqamah pairing applies for that single slot).
+                        * SKIP the "2–5 times → pairs" distribution rule entirely when numbered slot labels are present.
+                    - Count-based pairing (only applies when numbered slot labels are NOT present):
+                        * 1 time → jummah1_iqamah only (start = null).
+                        * 2 to 5 times → assign left to right as start/iqamah pairs; if odd (3) or (5), last one is iqamah only.
+                        * 6 times → assign as 3 full start/iqamah pairs.
+                    - Within a pair, the earlier = start, later = iqamah.
+                    - If no times exist in the range, set all Jummah fields to null.
+                    - If a Jummah slot is written as Khutbah X:XX followed by Iqamah Y:YY and there can be commas not seperated by spaces, then 
+                    Khutbah time must always be the start and Iqamah time the iqamah, even if the text is irregularly formatted.
+                    - Special case for jummah (do NOT output this example, it is only to guide you):
+                    - If the input text contains:
+                        Fajr 5:08 AM 6:00 AM  
+                        Dhuhr 1:19 PM 2:00 PM  
+                        Asr 6:05 PM 6:45 PM  
+                        Maghrib 8:04 PM 8:08 PM  
+                        Isha 9:30 PM 10:00 PM  
+                        1:45 PM 
+                        Jumu'ah 
+                        2:45 PM 
+                        Jumu'ah 
+                        3:45 PM 
+                        Jumu'ah 
+                        6:33 AM 
+                        8:04 PM
+                    - Then the correct output must include:
+                        "jummah1_iqamah": "1:45 PM",  
+                        "jummah2_iqamah": "2:45 PM",  
+                        "jummah3_iqamah": "3:45 PM"
+                    - Just notice how I considered 1:45 PM as a valid jummah time, ONLY because it's in jummah time range, near other jummah timings,
+                    even though it's not tied to a specific jummah word following the pattern.
+                    * If a line contains both "Khutbah" and "Iqamah" times, always map:
+                    - The Khutbah time → jummahN_start
+                    - The Iqamah time → jummahN_iqamah
+                    * This rule applies even if the Khutbah time is joined to the word (e.g., "Khutbah1:30pm")
+                        or split across lines (e.g., "1\n:30 pm").
+                    * Do not skip Khutbah times. They must always be extracted as the start time.
+
+                Return ONLY valid JSON in this exact schema, no explanation:
+
+                {{
+                    "fajr_start": "HH:MM AM/PM or null",
+                    "fajr_iqamah": "...",
+                    "zuhr_start": "...",
+                    "zuhr_iqamah": "...",
+                    "asr_start": "...",
+                    "asr_iqamah": "...",
+                    "maghrib_start": "...",
+                    "maghrib_iqamah": "...",
+                    "isha_start": "...",
+                    "isha_iqamah": "...",
+                    "jummah1_start": "...",
+                    "jummah1_iqamah": "...",
+                    "jummah2_start": "...",
+                    "jummah2_iqamah": "...",
+                    "jummah3_start": "...",
+                    "jummah3_iqamah": "..."
+                }}
+"""
+
+PROMPT_TEMPLATE = EXTRACTION_RULES + """
+                Text:
+                ---
+                {cleaned_text}
+                ---
+                """
+
+# Several mosques' pages in one request; the rules are sent once for all of them
+BATCH_PROMPT_TEMPLATE = EXTRACTION_RULES + """
+                The {count} texts below come from different mosque websites. Each one sits between
+                "=== <id> ===" and "=== end <id> ===". Apply the rules above to each text on its own,
+                never carrying times over from one text to another.
+
+                Return ONLY a JSON object with one key per id, each holding an object in the schema
+                above, e.g. {{"m1": {{...}}, "m2": {{...}}}}, no explanation.
+
+                {texts}
+                """
+
+# Used for mosques marked "schedule": "monthly", whose page holds a whole timetable
+SCHEDULE_PROMPT_TEMPLATE = """
+                Extract EVERY dated row of the prayer timetable in the following text.
+
+                TODAY'S DATE: {today}
+
+                - The text holds prayer times for many dates (a weekly or monthly calendar). Return one
+                entry per date that has times; do not skip any.
+                - Write each date as YYYY-MM-DD. If a row only gives a day number or a month and day,
+                take the month and year from the timetable heading, or from TODAY'S DATE if there is none.
+                - Prayer times must be copied exactly as written in the text (e.g., "10:00 PM" stays "10:00 PM").
+                - Do not round, adjust, or guess times.
+                - Prayer names may have different spellings (e.g., "Fajr" → "Fajar", "Maghrib" → "Magrib").
+                - {{prayer}}_start is also referred as *adhan* / *begins* / *athan* / *azan* etc.
+                - {{prayer}}_iqamah refers to the later congregational prayer time (*iqamah* / *jamat* / *salah*).
+                - ⚠️ If **only one time** is given for a prayer on a date, assign it to {{prayer}}_iqamah and set
+                {{prayer}}_start = null.
+                - Sunrise / Shuruq is not a prayer; ignore it.
+                - Jummah (Friday) times: if the text lists Jummah slots (Jumu'ah / Khutbah / 1st Jamat ...),
+                fill jummah1..3 the same way on every date; otherwise set them to null.
+                - If you can't find a valid time for a prayer on a date, set the value = null.
+
+                Return ONLY valid JSON in this exact schema, no explanation:
+
+                {{
+                    "days": [
+                        {{
+                            "date": "YYYY-MM-DD",
+                            "fajr_start": "HH:MM AM/PM or null",
+                            "fajr_iqamah": "...",
+                            "zuhr_start": "...",
+                            "zuhr_iqamah": "...",
+                            "asr_start": "...",
+                            "asr_iqamah": "...",
+                            "maghrib_start": "...",
+                            "maghrib_iqamah": "...",
+                            "isha_start": "...",
+                            "isha_iqamah": "...",
+                            "jummah1_start": "...",
+                            "jummah1_iqamah": "...",
+                            "jummah2_start": "...",
+                            "jummah2_iqamah": "...",
+                            "jummah3_start": "...",
+                            "jummah3_iqamah": "..."
+                        }}
+                    ]
+                }}
+
+                Text:
+                ---
+                {cleaned_text}
+                ---
+                """
+
+async def process_mosque(result, batcher, profile, adhan=None):
+    """Hash-check, call LLM, and return a PrayerTimes record, or None if there's
+    nothing new. Raises ExtractionError when the page yields no usable times."""
+    name = result["name"]
+    existing = db.session.get(PrayerTimes, name)
+    today = datetime.now(EASTERN)
+    monthly = result.get("schedule") == "monthly"
+
+    not_modified = result.get("not_modified", False)
+    if not_modified:
+        # The cached body is whatever the last fetch stored, even if its extraction
+        # failed, so it goes through the hash check like a fresh page: only a body
+        # the stored times came from is skipped
+        result = {**result, "raw_text": html_to_text(result["raw_html"], result.get("selector"))}
+
+    with profile.span(name, "clean"):
+        cleaned_text = clean_text(result["raw_text"])
+    profile.note(name, text_chars=len(cleaned_text))
+
+    with profile.span(name, "hash"):
+        content_hash = hashlib.sha256(cleaned_text.encode("utf-8")).hexdigest()
+    if existing and existing.raw_text_hash == content_hash:
+        profile.note(name, path="not_modified" if not_modified else "hash_match")
+        if monthly:
+            return record_from_schedule(name, today.date(), existing)
+        print(f"[skip] {name} {'not modified since last fetch' if not_modified else 'unchanged, skipping LLM'}")
+        return None
+
+    # Day is built without strftime's zero-padding so it matches how sites write dates.
+    today_label = f"{today:%A, %B} {today.day}, {today:%Y}"
+    key = None
+
+    if monthly:
+        profile.note(name, path="schedule")
+        # Whole timetables need their own prompt, so they go to the batcher's client directly
+        await ingest_schedule(result, cleaned_text, today, today_label, batcher.llm, profile, adhan)
+        return record_from_schedule(name, today.date(), existing, content_hash)
+
+    # Structural parsers first; the LLM only sees pages none of them can read confidently
+    extracted = None
+    if current_app.config["RULE_EXTRACTORS"]:
+        with profile.span(name, "extract"):
+            extracted = run_extractors(result["website"], result.get("raw_html"), result["raw_text"], today.date())
+
+    if extracted:
+        llm_response_json, extractor = extracted
+        profile.note(name, path="extractor", extractor=extractor)
+        print(f"[extract] {name} parsed by {extractor}, skipping LLM")
+    else:
+        # Only the text around the prayer times goes to the LLM
+        prompt_text = prune_text(cleaned_text, current_app.config["LLM_TEXT_BUDGET"], current_app.config["PRUNE_WINDOW"])
+        profile.note(name, path="llm", prompt_chars=len(prompt_text))
+        if len(prompt_text) < len(cleaned_text):
+            print(f"[prune] {name} {len(cleaned_text)} -> {len(prompt_text)} chars")
+
+        prompt = PROMPT_TEMPLATE.format(cleaned_text=prompt_text, today=today_label)
+
+        if name == "Masjid Al-Abedeen":
+            with open("prompt_abedeen.txt", "w", encoding="utf-8") as f:
+                f.write(prompt)
+
+        key = cache_key(LLM_MODEL, PROMPT_VERSION, today_label, prompt_text)
+        with profile.span(name, "llm"):
+            llm_response_json = await get_llm_cache().get_or_fetch(
+                key, lambda: batcher.extract(prompt_text, today_label, name)
+            )
+        if not llm_response_json:
+            raise ExtractionError("LLM extraction failed")
+
+    times = to_times(llm_response_json)
+
+    if all(times[f] is None for f in DAILY_FIELDS):
+        profile.note(name, path="rejected")
+        discard_extraction(key)
+        time_count = len(TIME_PATTERN.findall(cleaned_text))
+        raise ExtractionError(
+            f"LLM returned only nulls (input: {len(cleaned_text)} chars, {time_count} time strings detected)"
+        )
+
+    times = check_adhan(adhan, name, today.date(), times)
+    if times is None:
+        profile.note(name, path="rejected")
+        discard_extraction(key)
+        raise ExtractionError("start times far from the calculated ones")
+
+    return PrayerTimes(
+        mosque_name=name,
+        date=today.date(),
+        **times,
+        raw_text_hash=content_hash,
+        updated_at=datetime.now(timezone.utc)
+    )
+
+async def ingest_schedule(result, cleaned_text, today, today_label, llm, profile, adhan=None):
+    """Extract every dated row of a multi-day timetable into DailySchedule."""
+    extracted, key = None, None
+    if current_app.config["RULE_EXTRACTORS"] and result.get("raw_html"):
+        with profile.span(result["name"], "extract"):
+            extracted = run_calendar_extractors(result["website"], result["raw_html"], today.date())
+
+    if extracted:
+        days, extractor = extracted
+        profile.note(result["name"], extractor=extractor)
+        print(f"[extract] {result['name']} timetable parsed by {extractor}, skipping LLM")
+    else:
+        prompt = SCHEDULE_PROMPT_TEMPLATE.format(cleaned_text=cleaned_text, today=today_label)
+        key = cache_key(LLM_MODEL, f"schedule-{SCHEDULE_PROMPT_VERSION}", today_label, cleaned_text)
+        profile.note(result["name"], prompt_chars=len(cleaned_text))
+        with profile.span(result["name"], "llm"):
+            response = await get_llm_cache().get_or_fetch(
+                key, lambda: llm.complete(prompt, SCHEDULE_MAX_COMPLETION_TOKENS, [result["name"]])
+            )
+
+        days = {}
+        for entry in (response or {}).get("days", []):
+            try:
+                days[date.fromisoformat(entry["date"])] = entry
+            except (KeyError, TypeError, ValueError):
+                continue
+
+    stored = 0
+    for day, fields in days.items():
+        times = to_times(fields)
+        if all(times[f] is None for f in DAILY_FIELDS):
+            continue
+        times = check_adhan(adhan, result["name"], day, times)
+        if times is None:
+            continue
+        DailySchedule.save(result["name"], day, times)
+        stored += 1
+
+    print(f"[schedule] {result['name']} stored {stored} days")
+    if not stored:
+        discard_extraction(key)
+        raise ExtractionError("no usable rows in the timetable")
+
+def check_adhan(adhan, name, day, times):
+    """Fill in the start times a page left out from the calculated ones. Published
+    ones far off are only flagged, since the mosque may use another convention.
+    None when most of them are off: the row for another day, or a different
+    table, was most likely read."""
+    if adhan is None:
+        return times
+
+    checked, off = adhan.check(name, day, times, current_app.config["ADHAN_TOLERANCE_MINUTES"])
+    if len(off) > len(PRAYERS) // 2:
+        print(f"[adhan] {name} {day}: {len(off)} start times far from the calculated ones, rejecting")
+        return None
+    if off:
+        print(f"[adhan] {name} {day}: {', '.join(off)} far from the calculated times, keeping the published ones")
+    return checked
+
+def discard_extraction(key):
+    # A rejected extraction is dropped from the cache, so the page's next check
+    # asks the LLM again instead of reusing it
+    if key is not None:
+        get_llm_cache().discard(key)
+
+def record_from_schedule(name, day, existing, content_hash=None):
+    """Today's PrayerTimes record from the stored timetable, or None if there's nothing new."""
+    row = db.session.get(DailySchedule, (name, day))
+    if row is None:
+        print(f"[schedule] {name} has no stored times for {day}, keeping existing data")
+        return None
+
+    if content_hash is None:
+        if existing is not None and existing.date == day:
+            print(f"[skip] {name} already up to date for {day}")
+            return None
+        content_hash = existing.raw_text_hash if existing is not None else None
+
+    return PrayerTimes(
+        mosque_name=name,
+        date=day,
+        **row.times(),
+        raw_text_hash=content_hash,
+        updated_at=datetime.now(timezone.utc)
+    )
+
+async def run_all(mosques, profile, writer, offline=False):
+    """Fetch, extract and store `mosques` as a stream, timing each stage into
+    `profile`. With `offline` the daily extractions go through the Batch API.
+
+    Bounded queues connect a pool of fetch workers, a pool of extract workers
+    and `writer`, so each mosque moves on as soon as its own page is in and is
+    stored as soon as its extraction is done. A slow site only holds up itself,
+    and no more than a couple of queues' worth of pages is in memory at once.
+    An error in one mosque's fetch or extraction is logged and stored as a
+    failed check; the rest of the run carries on.
+
+    Offline, a Batch API job can take hours, so the run makes one: every page
+    gets its own extract worker and the batcher holds what they queue until the
+    fetch stage is done.
+    """
+    config = current_app.config
+    fetched = asyncio.Queue(config["SCRAPE_QUEUE_SIZE"])
+    processed = asyncio.Queue(config["SCRAPE_QUEUE_SIZE"])
+    todo = iter(mosques)
+    fetch_workers = max(1, min(config["SCRAPE_FETCH_WORKERS"], len(mosques)))
+    extract_workers = max(1, len(mosques) if offline else min(config["SCRAPE_EXTRACT_WORKERS"], len(mosques)))
+
+    # A year of adhan times for every mosque in the run, from the start of this month
+    adhan = None
+    if config["ADHAN_CHECK"]:
+        adhan = AdhanTable(
+            mosques,
+            datetime.now(EASTERN).date().replace(day=1),
+            366,
+            EASTERN,
+            method=config["ADHAN_METHOD"],
+            asr=config["ADHAN_ASR"],
+        )
+
+    llm = make_llm_client()
+    batcher = ExtractionBatcher(
+        llm,
+        PROMPT_TEMPLATE,
+        BATCH_PROMPT_TEMPLATE,
+        batch_size=config["LLM_BATCH_SIZE"],
+        linger=1.0 if offline else config["LLM_BATCH_LINGER"],
+        offline=offline,
+        hold=offline,
+    )
+
+    async with httpx.AsyncClient(
+        timeout=20,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=config["HTTP_MAX_CONNECTIONS"]),
+    ) as http, BrowserPool(
+        size=config["BROWSER_POOL_SIZE"],
+        concurrency=config["BROWSER_CONCURRENCY"],
+        recycle_after=config["BROWSER_RECYCLE_AFTER"],
+        block_resources=config["BLOCK_RESOURCES"],
+    ) as pool:
+        async def fetch():
+            # Workers share one iterator, so each mosque is fetched exactly once
+            for mosque in todo:
+                name = mosque["name"]
+                with profile.span(name, "fetch"):
+                    try:
+                        result = await scrape_mosque(mosque, writer.states.get(name), http, pool)
+                    except Exception as e:
+                        print(f"[fetch] {name} failed: {e!r}")
+                        result = None
+
+                stages = pool.timings.get(name, {})
+                profile.note(name, **{stage: stages[stage] for stage in ("navigation", "extraction") if stage in stages})
+                if "blocked" in stages:
+                    profile.note(name, blocked_requests=stages["blocked"])
+                await fetched.put((mosque, result))
+
+        async def extract():
+            while (item := await fetched.get()) is not None:
+                mosque, result = item
+                record, failed = None, False
+                if result is not None:
+                    try:
+                        record = await process_mosque(result, batcher, profile, adhan)
+                    except ExtractionError as e:
+                        print(f"[reject] {mosque['name']} {e}, keeping existing data")
+                        failed = True
+                    except Exception as e:
+                        print(f"[extract] {mosque['name']} failed: {e!r}, keeping existing data")
+                        failed = True
+                profile.note(mosque["name"], **llm.usage_by_tag().get(mosque["name"], {}))
+                await processed.put((mosque, result, record, failed))
+
+        async def store():
+            while (item := await processed.get()) is not None:
+                writer.add(*item)
+
+        async def stage(workers, queue, consumers):
+            # Once every worker of a stage is done, tell each consumer of its queue
+            await asyncio.gather(*workers)
+            for _ in range(consumers):
+                await queue.put(None)
+
+        async def fetch_stage():
+            await stage([fetch() for _ in range(fetch_workers)], fetched, extract_workers)
+            # Every page is in; an offline run's one Batch API job can go out
+            batcher.release()
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(fetch_stage())
+                group.create_task(stage([extract() for _ in range(extract_workers)], processed, 1))
+                group.create_task(store())
+        finally:
+            await llm.client.close()
+        pool.log_timings()
+
+    get_llm_cache().evict()
+    print(f"[OpenAI] {llm.stats()}")
+
+def refresh_policy():
+    config = current_app.config
+    return RefreshPolicy(
+        EASTERN,
+        min_hours=config["REFRESH_MIN_HOURS"],
+        max_hours=config["REFRESH_MAX_HOURS"],
+        default_hours=config["REFRESH_DEFAULT_HOURS"],
+        jitter=config["REFRESH_JITTER"],
+        change_dates=config["REFRESH_CHANGE_DATES"],
+    )
+
+class RunWriter:
+    """Stores each mosque of a scrape run as the pipeline finishes it: how it was
+    fetched, when to check it next, its prayer times and its scrape_runs row.
+
+    Commits every `commit_every` mosques, with one stream event carrying the
+    fields that changed since the last commit, so finished mosques reach the
+    API while slower ones are still being scraped.
+    """
+
+    def __init__(self, policy, profile, now, commit_every):
+        self.policy = policy
+        self.profile = profile
+        self.now = now
+        self.commit_every = max(1, commit_every)
+        self.run_id = uuid.uuid4().hex
+        self.states = {s.mosque_name: s for s in ScrapeState.query.all()}
+        self.schedules = {s.mosque_name: s for s in RefreshSchedule.query.all()}
+        self.logged = set(db.session.scalars(db.select(PrayerTimeHistory.mosque_name).distinct()))
+        self.changes = {}
+        self.pending = 0
+
+    def add(self, mosque, result, record, failed=False):
+        """Store one finished mosque. `failed` marks a page that was fetched but
+        yielded no usable times, which is retried soon rather than backed off."""
+        name = mosque["name"]
+        existing = db.session.get(PrayerTimes, name)
+        if result is None:
+            outcome = "failed"
+            self.profile.note(name, path="fetch_failed")
+        else:
+            self.store_fetch(result)
+            if failed:
+                outcome = "failed"
+            elif record is not None and (existing is None or record.raw_text_hash != existing.raw_text_hash):
+                outcome = "changed"
+            else:
+                outcome = "unchanged"
+
+        schedule = self.schedules.get(name)
+        if schedule is None:
+            # Seed the change history from when the stored times last changed
+            schedule = RefreshSchedule(
+                mosque_name=name,
+                last_changed_at=existing.updated_at if existing else None,
+            )
+            db.session.add(schedule)
+            self.schedules[name] = schedule
+        next_check = self.policy.update(schedule, outcome, self.now)
+        print(f"[refresh] {name} {outcome}, next check {next_check.astimezone(EASTERN):%a %b %d %H:%M}")
+
+        if record is not None:
+            self.store_record(record)
+
+        db.session.add(ScrapeRun.from_profile(self.run_id, self.now, name, outcome, self.profile.mosques.get(name, {})))
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.commit()
+
+    def store_fetch(self, result):
+        # Remember which strategy worked so the next run goes straight to it,
+        # along with the validators for the next conditional request
+        state = self.states.get(result["name"])
+        if state is None:
+            state = ScrapeState(mosque_name=result["name"])
+            db.session.add(state)
+            self.states[result["name"]] = state
+
+        state.fetch_strategy = result["fetch_strategy"]
+        self.profile.note(result["name"], fetch_strategy=result["fetch_strategy"])
+        if "validators" in result:
+            state.store_response(result["validators"], result["raw_html"])
+        elif result["fetch_strategy"] == "playwright":
+            state.raw_body = None
+
+    def store_record(self, record):
+        # Only the fields that actually changed go out to stream subscribers
+        existing = db.session.get(PrayerTimes, record.mosque_name)
+        before = existing.to_dict() if existing else {}
+        after = record.to_dict()
+        diff = {k: after[k] for k in ["date"] + FIELDS if before.get(k) != after[k]}
+        if diff:
+            self.changes[record.mosque_name] = {**diff, "updated_at": after["updated_at"]}
+
+        with self.profile.span(record.mosque_name, "merge"):
+            # The replaced version goes into the history log, as only the fields that changed
+            PrayerTimeHistory.append(record, existing if record.mosque_name in self.logged else None)
+            self.logged.add(record.mosque_name)
+            db.session.merge(record)
+            # Kept by date as well, so past days stay queryable after today's record replaces them
+            DailySchedule.save(record.mosque_name, record.date, {field: getattr(record, field) for field in FIELDS})
+
+    def commit(self):
+        if self.changes:
+            db.session.add(PrayerTimeEvent(payload=json.dumps(self.changes)))
+            self.changes = {}
+        db.session.commit()
+        self.pending = 0
+
+# Main function called by the worker's scheduler. Only mosques whose refresh
+# schedule is due are fetched, unless `force` is set; `offline` sends the
+# LLM extractions through the Batch API. `mosques` defaults to the registry.
+def scrape_and_update(app, force=False, offline=False, mosques=None):
+    mosques = MOSQUES if mosques is None else mosques
+    with app.app_context():
+        now = datetime.now(timezone.utc)
+        today = datetime.now(EASTERN).date()
+        profile = RunProfile()
+        writer = RunWriter(refresh_policy(), profile, now, current_app.config["SCRAPE_COMMIT_EVERY"])
+        due = [m for m in mosques if force or writer.policy.is_due(writer.schedules.get(m["name"]), now)]
+
+        # Monthly timetables already hold today's times, so a new day needs no fetch
+        rolled = []
+        for mosque in mosques:
+            if mosque.get("schedule") == "monthly" and mosque not in due:
+                existing = db.session.get(PrayerTimes, mosque["name"])
+                if existing is not None and existing.date != today:
+                    rolled.append(record_from_schedule(mosque["name"], today, existing))
+
+        if not due and not any(rolled):
+            return
+
+        print(f"Scrape job running for {len(due)} of {len(mosques)} mosques...")
+
+        for record in rolled:
+            if record is not None:
+                writer.store_record(record)
+
+        if due:
+            # The cache outlives the run; only this run's lookups go into its row
+            before = get_llm_cache().stats()
+            asyncio.run(run_all(due, profile, writer, offline))
+            get_llm_cache().save_run(writer.run_id, now, before)
+
+        keep_days = current_app.config["SCRAPE_RUNS_KEEP_DAYS"]
+        if keep_days:
+            cutoff = now - timedelta(days=keep_days)
+            ScrapeRun.query.filter(ScrapeRun.started_at < cutoff).delete()
+            LLMCacheRun.query.filter(LLMCacheRun.started_at < cutoff).delete()
+        writer.commit()
+
+        print(f"Scrape job finished: data updated. LLM cache: {get_llm_cache().stats()}")
+        for stage, seconds in profile.summary().items():
+            print(f"[profile] {stage}: total {seconds['total']}s, p50 {seconds['p50']}s, max {seconds['max']}s")
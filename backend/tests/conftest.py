@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+# Tests import backend modules the same way app.py does (flat, from backend/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+
+from config import Config  # noqa: E402
+from database import init_db  # noqa: E402
+from events import EventBroker  # noqa: E402
+from models.prayerTimes import db  # noqa: E402
+
+
+@pytest.fixture
+def make_app():
+    """Builds a bare app on `uri` (an in-memory database by default) with the
+    tables created, the way worker.py sets one up."""
+    def make(uri="sqlite://", **config):
+        app = Flask(__name__)
+        app.config.from_object(Config)
+        app.config.update(SQLALCHEMY_DATABASE_URI=uri, DATABASE_READ_URL=None, **config)
+        init_db(app)
+        with app.app_context():
+            db.create_all()
+        return app
+
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def make_web_app(monkeypatch, tmp_path):
+    """Builds the full app from create_app() on a fresh SQLite file, with `config`
+    overriding Config. The event broker doesn't poll in the background; call
+    `app.broker.poll()` instead."""
+    def make(**config):
+        import app as app_module
+
+        config = {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'app.db'}", "DATABASE_READ_URL": None, **config}
+        for name, value in config.items():
+            monkeypatch.setattr(Config, name, value)
+
+        brokers = []
+        start = EventBroker.start
+        monkeypatch.setattr(EventBroker, "_run", lambda self: None)
+        monkeypatch.setattr(EventBroker, "start", lambda self: (brokers.append(self), start(self)))
+        app = app_module.create_app()
+        app.broker = brokers[0]
+        return app
+
+    return make
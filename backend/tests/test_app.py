@@ -0,0 +1,71 @@
+from datetime import date, time
+
+from models.llmCache import LLMCacheEntry
+from models.llmCacheRun import LLMCacheRun
+from models.prayerTimeEvent import PrayerTimeEvent
+from models.prayerTimes import PrayerTimes, db
+
+
+def store(app, fajr, mosques=("Baitul Mukarram",)):
+    with app.app_context():
+        for name in mosques:
+            db.session.merge(PrayerTimes(mosque_name=name, date=date(2025, 6, 1), fajr_iqamah=fajr))
+        db.session.add(PrayerTimeEvent(payload="{}"))
+        db.session.commit()
+
+
+def test_prayer_times_answers_a_matching_etag_with_304(make_web_app):
+    app = make_web_app()
+    client = app.test_client()
+    store(app, time(5, 30))
+
+    first = client.get("/prayer-times")
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "no-cache"
+    etag = first.headers["ETag"]
+    assert first.json[0]["prayer_times"]["fajr_iqamah"] == "05:30:00"
+
+    again = client.get("/prayer-times", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.data == b""
+
+    # Filtered responses carry their own ETag
+    filtered = client.get("/prayer-times?prayer=fajr")
+    assert filtered.headers["ETag"] != etag
+    assert client.get("/prayer-times?prayer=fajr", headers={"If-None-Match": filtered.headers["ETag"]}).status_code == 304
+
+    # A scrape's event drops the cached body, so the old ETag stops matching
+    store(app, time(5, 45))
+    app.broker.poll()
+    changed = client.get("/prayer-times", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert changed.json[0]["prayer_times"]["fajr_iqamah"] == "05:45:00"
+
+
+def test_next_cursor_is_readable_cross_origin(make_web_app):
+    app = make_web_app()
+    store(app, time(5, 30), ("Baitul Mukarram", "Baitul Aman"))
+    response = app.test_client().get(
+        "/prayer-times?limit=1&lat=43.7&lon=-79.3", headers={"Origin": "http://localhost:5173"}
+    )
+
+    assert response.headers["X-Next-Cursor"]
+    exposed = {h.strip() for h in response.headers["Access-Control-Expose-Headers"].split(",")}
+    assert {"X-Next-Cursor", "ETag"} <= exposed
+
+
+def test_stats_reads_cache_counters(make_web_app):
+    app = make_web_app()
+    with app.app_context():
+        db.session.add(LLMCacheEntry(key="k", response="{}", hits=3))
+        db.session.add(LLMCacheRun(run_id="a", hits=3, misses=1, evictions=0))
+        db.session.add(LLMCacheRun(run_id="b", hits=0, misses=2, evictions=4))
+        db.session.commit()
+    client = app.test_client()
+
+    assert client.get("/stats").json == {"llm_cache": {
+        "entries": 1, "stored_hits": 3, "hits": 3, "misses": 3, "evictions": 4, "hit_rate": 0.5,
+    }}
+
+    metrics = client.get("/metrics").data.decode()
+    assert 'jamaat_llm_cache_lookups_total{result="miss"} 3.0' in metrics
+    assert "jamaat_llm_cache_evictions_total 4.0" in metrics
@@ -0,0 +1,65 @@
+from datetime import date, time
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from astronomy import AdhanTable, minutes_apart, start_times
+
+TORONTO = ZoneInfo("America/Toronto")
+MOSQUE = {"name": "Scarborough", "latitude": 43.70, "longitude": -79.29}
+
+
+def as_time(minutes):
+    minutes = int(round(minutes))
+    return time(minutes // 60, minutes % 60)
+
+
+def test_sunset_and_noon_match_published_times_across_dst():
+    times = start_times([MOSQUE["latitude"]], [MOSQUE["longitude"]], [date(2025, 6, 21), date(2025, 12, 21)], TORONTO)
+
+    # Published Toronto sunset is 9:03 pm EDT at the June solstice and 4:43 pm EST in December
+    assert minutes_apart(as_time(times["maghrib"][0, 0]), time(21, 3)) <= 2
+    assert minutes_apart(as_time(times["maghrib"][0, 1]), time(16, 43)) <= 2
+    assert minutes_apart(as_time(times["zuhr"][0, 0]), time(13, 19)) <= 2
+    assert minutes_apart(as_time(times["zuhr"][0, 1]), time(12, 15)) <= 2
+
+
+def test_methods_and_asr_rules():
+    day = [date(2025, 3, 20)]
+    isna = start_times([43.7], [-79.29], day, TORONTO)
+    mwl = start_times([43.7], [-79.29], day, TORONTO, method="MWL")
+    makkah = start_times([43.7], [-79.29], day, TORONTO, method="Makkah")
+    hanafi = start_times([43.7], [-79.29], day, TORONTO, asr="hanafi")
+
+    # A deeper Fajr angle is earlier, and Isha later
+    assert mwl["fajr"][0, 0] < isna["fajr"][0, 0]
+    assert mwl["isha"][0, 0] > isna["isha"][0, 0]
+    assert makkah["isha"][0, 0] - makkah["maghrib"][0, 0] == 90
+    assert hanafi["asr"][0, 0] - isna["asr"][0, 0] > 30
+    assert hanafi["zuhr"][0, 0] == isna["zuhr"][0, 0]
+
+
+def test_fajr_and_isha_undefined_far_north_in_summer():
+    times = start_times([60.0], [10.75], [date(2025, 6, 21)], ZoneInfo("Europe/Oslo"))
+    assert np.isnan(times["fajr"][0, 0]) and np.isnan(times["isha"][0, 0])
+    assert not np.isnan(times["maghrib"][0, 0])
+
+
+def test_table_fills_missing_starts_and_flags_far_off_ones():
+    table = AdhanTable([MOSQUE, {"name": "No coordinates"}], date(2025, 6, 1), 30, TORONTO)
+    expected = table.starts("Scarborough", date(2025, 6, 21))
+
+    times = {f"{p}_{kind}": None for p in ["fajr", "zuhr", "asr", "maghrib", "isha"] for kind in ("start", "iqamah")}
+    times["zuhr_start"] = expected["zuhr_start"].replace(minute=(expected["zuhr_start"].minute + 2) % 60)
+    times["asr_start"] = time(15, 0)
+
+    checked, off = table.check("Scarborough", date(2025, 6, 21), times, tolerance=5)
+
+    assert off == ["asr_start"]
+    assert checked["asr_start"] == time(15, 0)
+    assert checked["zuhr_start"] == times["zuhr_start"]
+    assert checked["fajr_start"] == expected["fajr_start"]
+
+    assert table.starts("No coordinates", date(2025, 6, 21)) is None
+    assert table.starts("Scarborough", date(2025, 8, 1)) is None
+    assert table.check("Scarborough", date(2025, 8, 1), times, tolerance=5) == (times, [])
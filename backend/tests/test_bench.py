@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+from bench.__main__ import benchmark
+from bench.pages import synthetic_page
+from bench.standin import fake_completion
+
+
+def test_fake_completion_answers_single_and_batch_prompts():
+    page = synthetic_page(0)
+    single = fake_completion(f"Extract.\nText:\n{page}")
+    assert '"fajr_start"' in single["choices"][0]["message"]["content"]
+
+    batch = fake_completion("=== m0 ===\n5:10 AM 5:30 AM\n=== end m0 ===\n=== m1 ===\n6:00 AM\n=== end m1 ===")
+    content = batch["choices"][0]["message"]["content"]
+    assert '"m0"' in content and '"m1"' in content
+    assert batch["usage"]["completion_tokens"] == 300
+
+
+def test_benchmark_runs_cold_then_warm(monkeypatch):
+    # benchmark() points the OpenAI client at its stand-in; keep that out of other tests
+    monkeypatch.setenv("OPENAI_BASE_URL", "")
+    monkeypatch.setenv("OPENAI_API_KEY", "")
+
+    args = SimpleNamespace(
+        mosques=6, runs=2, change_share=0.0, js_share=0.0, llm_latency=0.0, llm_jitter=0.0,
+        batch_size=4, no_extractors=True, seed=0, quiet=True, json=None,
+    )
+    cold, warm = benchmark(args)["runs"]
+
+    assert cold["served"]["page"] == 6
+    assert cold["paths"] == {"llm": 6}
+    assert cold["served"]["llm"] == 2
+    assert warm["served"] == {"page": 0, "not_modified": 6, "llm": 0}
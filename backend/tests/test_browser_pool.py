@@ -0,0 +1,20 @@
+from browser_pool import should_block
+
+
+def test_blocks_heavy_resources_and_trackers():
+    assert should_block("image", "https://mosque.example/banner.jpg")
+    assert should_block("font", "https://fonts.gstatic.com/s/roboto.woff2")
+    assert should_block("script", "https://www.googletagmanager.com/gtag/js?id=G-1")
+    assert should_block("xhr", "https://stats.g.doubleclick.net/collect")
+
+    assert not should_block("document", "https://mosque.example/")
+    assert not should_block("stylesheet", "https://mosque.example/site.css")
+    assert not should_block("script", "https://timing.athanplus.com/widget.js")
+    # A lookalike host is not a subdomain
+    assert not should_block("script", "https://notdoubleclick.net/app.js")
+
+
+def test_site_allowlist_lets_requests_through():
+    assert not should_block("image", "https://mosque.example/times.png", allow=("image",))
+    assert not should_block("script", "https://www.youtube.com/iframe_api", allow=("youtube.com",))
+    assert should_block("font", "https://mosque.example/a.woff", allow=("image",))
@@ -0,0 +1,42 @@
+from datetime import date
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from database import engine_options, read_session
+from models.prayerTimes import PrayerTimes, db
+
+
+def test_sqlite_file_gets_wal_and_a_read_only_session(make_app, tmp_path):
+    app = make_app(f"sqlite:///{tmp_path / 'test.db'}", SQLITE_BUSY_TIMEOUT_MS=1234)
+
+    with app.app_context():
+        assert db.session.execute(db.text("PRAGMA journal_mode")).scalar() == "wal"
+        assert db.session.execute(db.text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert db.session.execute(db.text("PRAGMA busy_timeout")).scalar() == 1234
+
+        db.session.add(PrayerTimes(mosque_name="A", date=date(2025, 6, 1)))
+        db.session.commit()
+
+        reader = read_session()
+        assert reader.scalars(db.select(PrayerTimes.mosque_name)).all() == ["A"]
+        with pytest.raises(OperationalError):
+            reader.execute(db.delete(PrayerTimes))
+
+
+def test_memory_database_reads_through_its_one_engine(app):
+    with app.app_context():
+        assert read_session().get_bind() is db.engine
+
+
+def test_postgres_pool_and_read_only_options():
+    config = {"DB_POOL_SIZE": 7, "DB_MAX_OVERFLOW": 3, "DB_POOL_TIMEOUT": 5, "DB_POOL_RECYCLE": 600}
+    url = "postgresql+psycopg://app@db/jamaat"
+
+    options = engine_options(config, url)
+    assert options["pool_size"] == 7 and options["max_overflow"] == 3 and options["pool_pre_ping"]
+    assert "connect_args" not in options
+    assert engine_options(config, url, read_only=True)["connect_args"] == {
+        "options": "-c default_transaction_read_only=on"
+    }
+    assert engine_options(config, "sqlite://") == {}
@@ -0,0 +1,60 @@
+import json
+from types import SimpleNamespace
+
+from events import RESYNC, EventBroker
+from models.prayerTimeEvent import PrayerTimeEvent
+from models.prayerTimes import db
+
+
+def commit_events(app, *payloads):
+    with app.app_context():
+        for payload in payloads:
+            db.session.add(PrayerTimeEvent(payload=json.dumps(payload)))
+        db.session.commit()
+
+
+def test_each_event_reaches_every_subscriber_and_listener(app, monkeypatch):
+    monkeypatch.setattr(EventBroker, "_run", lambda self: None)
+    commit_events(app, {"old": {}})
+    broker = EventBroker(app, queue_size=2)
+    heard = []
+    broker.on_event(lambda event: heard.append(event.id))
+    broker.start()
+
+    fast, slow = broker.subscribe(), broker.subscribe()
+    commit_events(app, {"A": {"fajr_iqamah": "05:30:00"}}, {"B": {}})
+    broker.poll()
+
+    # Events committed before start() are not replayed
+    assert heard == [2, 3]
+    assert [fast.get_nowait().id for _ in range(2)] == [2, 3]
+
+    # A subscriber whose queue overflows is told to resync instead
+    commit_events(app, {"C": {}})
+    broker.poll()
+    assert fast.get_nowait().id == 4
+    assert slow.get_nowait() is RESYNC and slow.empty()
+
+    broker.unsubscribe(fast)
+    broker.publish(SimpleNamespace(id=5, payload="{}"))
+    assert fast.empty()
+
+
+def test_stream_replays_from_last_event_id_then_resyncs(make_web_app):
+    app = make_web_app()
+    commit_events(app, {"A": {"fajr_iqamah": "05:30:00"}}, {"B": {"isha_iqamah": "22:00:00"}})
+
+    response = app.test_client().get("/prayer-times/stream", headers={"Last-Event-ID": "1"}, buffered=False)
+    chunks = iter(response.response)
+    assert next(chunks) == b"retry: 10000\n\n"
+    assert next(chunks) == b'id: 2\nevent: update\ndata: {"B": {"isha_iqamah": "22:00:00"}}\n\n'
+
+    commit_events(app, {"C": {}})
+    app.broker.poll()
+    assert next(chunks).startswith(b"id: 3\n")
+
+    # Too far behind to catch up with diffs
+    for event_id in range(4, 4 + app.broker.queue_size + 1):
+        app.broker.publish(SimpleNamespace(id=event_id, payload="{}"))
+    assert next(chunks) == b"event: resync\ndata: {}\n\n"
+    response.close()
@@ -0,0 +1,50 @@
+import json
+import os
+from datetime import date
+
+import pytest
+
+from extractors import run_calendar_extractors, run_extractors
+from parsing import FIELDS
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "extractors")
+CASES = sorted(name[:-5] for name in os.listdir(FIXTURES) if name.endswith(".json"))
+
+
+def load_case(name):
+    with open(os.path.join(FIXTURES, f"{name}.json"), encoding="utf-8") as f:
+        case = json.load(f)
+
+    for kind in ("html", "txt"):
+        path = os.path.join(FIXTURES, f"{name}.{kind}")
+        case[kind] = None
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                case[kind] = f.read()
+    return case
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_fixture(name):
+    case = load_case(name)
+    result = run_extractors(case["url"], case["html"], case["txt"], date.fromisoformat(case["today"]))
+
+    if case["expected"] is None:
+        assert result is None
+        return
+
+    assert result is not None, "no extractor was confident, page would go to the LLM"
+    fields, extractor = result
+    assert extractor == case["extractor"]
+    assert sorted(fields) == sorted(FIELDS)
+    assert fields == case["expected"]
+
+
+def test_calendar_reads_every_dated_row():
+    case = load_case("athanplus_monthly")
+    today = date.fromisoformat(case["today"])
+    days, extractor = run_calendar_extractors(case["url"], case["html"], today)
+
+    assert extractor == "extract_calendar"
+    assert sorted(days) == [date(2026, 10, d) for d in range(1, 32)]
+    assert days[today] == case["expected"]
@@ -0,0 +1,22 @@
+import random
+
+from geo import GridIndex, haversine_km
+
+
+def test_nearest_matches_brute_force():
+    rng = random.Random(7)
+    points = [(43.5 + rng.random(), -79.8 + rng.random(), i) for i in range(500)]
+    index = GridIndex(points, cell_deg=0.05)
+
+    for _ in range(50):
+        lat, lon = 43.4 + rng.random() * 1.2, -79.9 + rng.random() * 1.2
+        expected = sorted((haversine_km(lat, lon, plat, plon), i) for plat, plon, i in points)
+
+        assert [i for _, i in index.nearest(lat, lon, k=7)] == [i for _, i in expected[:7]]
+
+        within = [i for d, i in expected if d <= 5]
+        assert [i for _, i in index.nearest(lat, lon, radius_km=5)] == within
+
+
+def test_empty_index():
+    assert GridIndex([]).nearest(43.7, -79.3, k=3) == []
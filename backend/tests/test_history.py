@@ -0,0 +1,95 @@
+import json
+from datetime import date, time
+
+from models.prayerTimeHistory import PrayerTimeHistory
+from models.prayerTimes import PrayerTimes, db
+from parsing import FIELDS
+from schedule_store import decode
+
+BASE = {field: None for field in FIELDS}
+BASE.update(fajr_iqamah=time(5, 30), zuhr_iqamah=time(13, 30), asr_iqamah=time(18, 0), isha_iqamah=time(22, 0))
+
+
+def record(day, name="A", **changes):
+    return PrayerTimes(mosque_name=name, date=day, **{**BASE, **changes})
+
+
+def log(versions):
+    previous = None
+    rows = []
+    for version in versions:
+        rows.append(PrayerTimeHistory.append(version, previous))
+        previous = version
+    db.session.commit()
+    return rows
+
+
+def test_versions_store_only_changes_and_rebuild_each_day(app):
+    with app.app_context():
+        rows = log([
+            record(date(2025, 5, 31)),
+            record(date(2025, 6, 1)),
+            record(date(2025, 6, 2), asr_iqamah=time(18, 15)),
+            record(date(2025, 6, 2), asr_iqamah=time(18, 15)),
+            record(date(2025, 6, 3), asr_iqamah=time(18, 15), isha_iqamah=time(22, 10)),
+        ])
+
+        # Each month starts whole; after that a version costs 3 bytes per changed field
+        assert [r.keyframe if r else None for r in rows] == [True, True, False, None, False]
+        assert [len(r.delta) for r in rows if r] == [12, 12, 3, 3]
+
+        versions = list(PrayerTimeHistory.versions(["A"], date(2025, 6, 2), date(2025, 6, 30)))
+        assert [v[1] for v in versions] == [date(2025, 6, 2), date(2025, 6, 3)]
+        assert [FIELDS[i] for i in versions[0][4]] == ["asr_iqamah"]
+        assert decode(versions[1][3].tobytes()) == {**BASE, "asr_iqamah": time(18, 15), "isha_iqamah": time(22, 10)}
+
+
+def test_state_on_carries_the_last_version_forward(app):
+    with app.app_context():
+        log([record(date(2025, 6, 1)), record(date(2025, 6, 2), fajr_iqamah=time(5, 15))])
+
+        day, row = PrayerTimeHistory.state_on("A", date(2025, 6, 5))
+        assert day == date(2025, 6, 2)
+        assert decode(row.tobytes())["fajr_iqamah"] == time(5, 15)
+        assert PrayerTimeHistory.state_on("A", date(2025, 5, 1)) is None
+        assert PrayerTimeHistory.state_on("B", date(2025, 6, 5)) is None
+
+
+def test_history_endpoint_streams_versions_as_json_lines(make_web_app):
+    app = make_web_app()
+    with app.app_context():
+        log([record(date(2025, 6, 1), "Baitul Aman"), record(date(2025, 6, 2), "Baitul Aman", isha_iqamah=time(22, 10))])
+        log([record(date(2025, 6, 2), "Baitul Mukarram")])
+    client = app.test_client()
+
+    response = client.get("/prayer-times/history?start=2025-06-02&end=2025-06-30")
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [(v["mosque_name"], v["date"]) for v in lines] == [("Baitul Aman", "2025-06-02"), ("Baitul Mukarram", "2025-06-02")]
+    assert lines[0]["changed"] == ["isha_iqamah"]
+    assert lines[0]["isha_iqamah"] == "22:10:00" and lines[0]["fajr_start"] is None
+    assert lines[0]["recorded_at"].endswith("+00:00")
+
+    only = client.get("/prayer-times/history?start=2025-06-01&end=2025-06-30&mosque=Baitul Mukarram")
+    assert [json.loads(line)["mosque_name"] for line in only.data.decode().splitlines()] == ["Baitul Mukarram"]
+
+    assert client.get("/prayer-times/history?start=June").status_code == 400
+    assert client.get("/prayer-times/history?start=2025-06-30&end=2025-06-01").status_code == 400
+
+
+def test_missing_days_are_estimated_from_the_last_version(make_web_app):
+    app = make_web_app()
+    with app.app_context():
+        latest = record(date(2025, 6, 2), "Baitul Mukarram", fajr_iqamah=time(5, 15))
+        log([record(date(2025, 6, 1), "Baitul Mukarram"), latest])
+        db.session.merge(latest)
+        db.session.commit()
+    client = app.test_client()
+
+    estimate = client.get("/prayer-times?date=2025-06-05").json
+    assert estimate[0]["prayer_times"]["estimated"] is True
+    assert estimate[0]["prayer_times"]["fajr_iqamah"] == "05:15:00"
+    assert estimate[0]["prayer_times"]["date"] == "2025-06-05"
+
+    # Too long after the last record to go by
+    assert client.get("/prayer-times?date=2025-07-01").json == []
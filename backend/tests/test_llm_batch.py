@@ -0,0 +1,108 @@
+import asyncio
+
+from llm_batch import ExtractionBatcher, valid_extraction
+from parsing import FIELDS
+
+SINGLE = "single {today}: {cleaned_text}"
+BATCH = "batch {today} of {count}: {texts}"
+
+
+def fields(fajr):
+    return {**dict.fromkeys(FIELDS), "fajr_iqamah": fajr}
+
+
+class FakeLLM:
+    """Answers packed prompts for every id except those in `drop`."""
+
+    def __init__(self, drop=()):
+        self.drop = set(drop)
+        self.prompts = []
+        self.offline_jobs = []
+
+    def answer(self, prompt):
+        if prompt.startswith("single"):
+            return fields(prompt.rsplit(": ", 1)[1])
+        answers = {}
+        for block in prompt.split("=== m")[1:]:
+            if block.startswith(" end") or block.split(" ===")[0] in self.drop:
+                continue
+            key, text = block.split(" ===\n", 1)
+            answers[f"m{key}"] = fields(text.split("\n", 1)[0])
+        return answers
+
+    async def complete(self, prompt, max_completion_tokens=500, tags=()):
+        self.prompts.append(prompt)
+        return self.answer(prompt)
+
+    async def complete_offline(self, prompts, poll_interval=60):
+        self.offline_jobs.append(prompts)
+        return {key: self.answer(prompt) for key, (prompt, _, _) in prompts.items()}
+
+
+def run(batcher, texts):
+    async def go():
+        return await asyncio.gather(*[batcher.extract(text, "Friday") for text in texts])
+    return asyncio.run(go())
+
+
+def test_packs_pages_into_batches():
+    llm = FakeLLM()
+    texts = [f"{h}:00 AM" for h in range(1, 6)]
+
+    results = run(ExtractionBatcher(llm, SINGLE, BATCH, batch_size=2), texts)
+
+    assert [r["fajr_iqamah"] for r in results] == texts
+    # Two full batches, and the last page alone on the single-page prompt
+    assert [p.split(":")[0].split(" of ")[0] for p in llm.prompts] == ["batch Friday", "batch Friday", "single Friday"]
+
+
+def test_retries_only_invalid_entries_alone():
+    llm = FakeLLM(drop={"2"})
+    texts = ["5:00 AM", "5:30 AM", "6:00 AM"]
+
+    results = run(ExtractionBatcher(llm, SINGLE, BATCH, batch_size=3), texts)
+
+    assert [r["fajr_iqamah"] for r in results] == texts
+    assert len(llm.prompts) == 2
+    assert llm.prompts[1] == "single Friday: 5:30 AM"
+
+
+def test_offline_sends_one_batch_job():
+    llm = FakeLLM()
+    texts = [f"{h}:00 AM" for h in range(1, 6)]
+
+    results = run(ExtractionBatcher(llm, SINGLE, BATCH, batch_size=2, linger=0.01, offline=True), texts)
+
+    assert [r["fajr_iqamah"] for r in results] == texts
+    assert len(llm.offline_jobs) == 1
+    assert len(llm.offline_jobs[0]) == 3
+    assert llm.prompts == []
+
+
+def test_held_offline_pages_wait_for_release():
+    llm = FakeLLM()
+    batcher = ExtractionBatcher(llm, SINGLE, BATCH, batch_size=2, linger=0.01, offline=True, hold=True)
+
+    async def queue_slowly():
+        # Pages trickle in far apart, as from a slow fetch stage
+        tasks = []
+        for h in range(1, 5):
+            tasks.append(asyncio.ensure_future(batcher.extract(f"{h}:00 AM", "Friday")))
+            await asyncio.sleep(0.05)
+        assert llm.offline_jobs == []
+        batcher.release()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(queue_slowly())
+
+    assert [r["fajr_iqamah"] for r in results] == [f"{h}:00 AM" for h in range(1, 5)]
+    assert len(llm.offline_jobs) == 1
+    assert len(llm.offline_jobs[0]) == 2
+
+
+def test_valid_extraction():
+    assert valid_extraction(fields("5:00 AM"))
+    assert valid_extraction({**fields(None), "isha_start": "null"})
+    assert not valid_extraction(fields("soon"))
+    assert not valid_extraction({"fajr_iqamah": "5:00 AM"})
+    assert not valid_extraction(None)
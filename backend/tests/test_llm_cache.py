@@ -0,0 +1,95 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from llm_cache import ExtractionCache, cache_key, table_stats
+from models.llmCache import LLMCacheEntry
+from models.llmCacheRun import LLMCacheRun
+from models.prayerTimes import db
+
+
+def test_cache_key_is_stable_and_covers_every_input():
+    key = cache_key("gpt", "1", "Sunday, June 1, 2025", "Fajr 5:30 AM")
+    assert key == cache_key("gpt", "1", "Sunday, June 1, 2025", "Fajr 5:30 AM")
+    assert len(key) == 64
+
+    others = {
+        cache_key("gpt-mini", "1", "Sunday, June 1, 2025", "Fajr 5:30 AM"),
+        cache_key("gpt", "2", "Sunday, June 1, 2025", "Fajr 5:30 AM"),
+        cache_key("gpt", "1", "Monday, June 2, 2025", "Fajr 5:30 AM"),
+        cache_key("gpt", "1", "Sunday, June 1, 2025", "Fajr 5:31 AM"),
+        # Parts are separated, so shifting text between them changes the key
+        cache_key("gpt", "1", "Sunday, June 1, 2025F", "ajr 5:30 AM"),
+    }
+    assert key not in others and len(others) == 5
+
+
+def test_get_or_fetch_misses_once_then_hits(app):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"fajr_iqamah": "5:30 AM"}
+
+    async def run(cache):
+        # Two mosques with the same text in one run share the one fetch
+        return await asyncio.gather(cache.get_or_fetch("k", fetch), cache.get_or_fetch("k", fetch))
+
+    with app.app_context():
+        cache = ExtractionCache()
+        first, second = asyncio.run(run(cache))
+        assert first == second == {"fajr_iqamah": "5:30 AM"}
+        assert len(calls) == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        assert asyncio.run(cache.get_or_fetch("k", fetch)) == {"fajr_iqamah": "5:30 AM"}
+        assert len(calls) == 1
+        assert cache.stats()["hit_rate"] == 0.667
+        assert db.session.get(LLMCacheEntry, "k").hits == 1
+
+
+def test_failed_fetches_are_not_cached(app):
+    async def fail():
+        return None
+
+    with app.app_context():
+        cache = ExtractionCache()
+        assert asyncio.run(cache.get_or_fetch("k", fail)) is None
+        assert db.session.get(LLMCacheEntry, "k") is None
+
+
+def test_expired_entries_miss_and_evict_keeps_the_most_recently_used(app):
+    with app.app_context():
+        cache = ExtractionCache(ttl=timedelta(days=1), max_entries=2)
+        for key in ("a", "b", "c", "old"):
+            cache.put(key, {"key": key})
+        db.session.flush()
+
+        now = datetime.now(timezone.utc)
+        db.session.get(LLMCacheEntry, "old").created_at = now - timedelta(days=2)
+        for minutes, key in enumerate(("a", "b", "c")):
+            db.session.get(LLMCacheEntry, key).last_used_at = now - timedelta(minutes=10 - minutes)
+        db.session.flush()
+
+        assert cache.get("old") is None
+        assert cache.evict() == 2
+        assert sorted(key for (key,) in db.session.query(LLMCacheEntry.key)) == ["b", "c"]
+
+
+def test_save_run_stores_only_that_runs_counts(app):
+    with app.app_context():
+        cache = ExtractionCache()
+        cache.put("k", {"ok": 1})
+        cache.get("k")
+        cache.get("missing")
+
+        before = cache.stats()
+        cache.get("k")
+        cache.get("k")
+        cache.get("other")
+        cache.save_run("run-1", datetime.now(timezone.utc), before)
+        db.session.commit()
+
+        row = LLMCacheRun.query.one()
+        assert (row.run_id, row.hits, row.misses, row.evictions) == ("run-1", 2, 1, 0)
+        assert table_stats()["hit_rate"] == 0.667
@@ -0,0 +1,164 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import openai
+
+from llm_client import LLMClient
+from ratelimit import TokenBucket
+
+
+def rate_limited(retry_after="0"):
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, headers={"retry-after": retry_after}, request=request)
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def completion(content, prompt_tokens=100, completion_tokens=20):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens),
+    )
+
+
+class FakeCompletions:
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def llm_client(completions, **options):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return LLMClient(
+        client,
+        "test-model",
+        requests_bucket=TokenBucket.per_minute(10000),
+        tokens_bucket=TokenBucket.per_minute(10_000_000),
+        backoff_base=0.001,
+        **options,
+    )
+
+
+def test_retries_rate_limits_then_records_usage():
+    completions = FakeCompletions([rate_limited(), rate_limited(), completion('{"fajr_start": "05:00"}')])
+    llm = llm_client(completions)
+
+    assert asyncio.run(llm.complete("prompt")) == {"fajr_start": "05:00"}
+    assert completions.calls == 3
+
+    stats = llm.stats()
+    assert stats["ok"] == 1
+    assert stats["retries"] == 2
+    assert stats["prompt_tokens"] == 100
+    assert stats["completion_tokens"] == 20
+
+
+def test_gives_up_after_max_retries():
+    completions = FakeCompletions([rate_limited()])
+    llm = llm_client(completions, max_retries=2)
+
+    assert asyncio.run(llm.complete("prompt")) is None
+    assert completions.calls == 3
+    assert llm.stats()["failed"] == 1
+
+
+def test_limits_calls_in_flight_and_run_budget():
+    completions = FakeCompletions([completion("{}", prompt_tokens=400, completion_tokens=100)])
+    llm = llm_client(completions, max_concurrency=2, token_budget=2000)
+
+    async def run():
+        first = await asyncio.gather(*[llm.complete("x" * 40, max_completion_tokens=10) for _ in range(4)])
+        # 2000 tokens are now spent, so nothing more goes out
+        later = await llm.complete("x" * 40, max_completion_tokens=10)
+        return first, later
+
+    first, later = asyncio.run(run())
+
+    assert first == [{}] * 4
+    assert later is None
+    assert completions.max_in_flight == 2
+    assert llm.stats()["skipped"] == 1
+
+
+def test_concurrent_calls_cannot_overshoot_the_budget():
+    # Each call is estimated at 100 + 400 tokens and uses exactly that
+    completions = FakeCompletions([completion("{}", prompt_tokens=100, completion_tokens=400)])
+    llm = llm_client(completions, max_concurrency=4, token_budget=1000)
+
+    async def run():
+        return await asyncio.gather(*[llm.complete("x" * 400, max_completion_tokens=400) for _ in range(4)])
+
+    results = asyncio.run(run())
+
+    # All four are let through the semaphore at once, but only two fit the budget
+    assert results.count({}) == 2 and results.count(None) == 2
+    assert completions.calls == 2
+    assert llm.tokens_used == 1000
+
+
+def test_token_bucket_refills_over_time():
+    now = [0.0]
+    bucket = TokenBucket.per_minute(60, clock=lambda: now[0])
+
+    assert bucket.try_take(60)
+    assert not bucket.try_take(1)
+    assert bucket.wait_time(2) == 2
+
+    now[0] = 2.0
+    assert bucket.try_take(2)
+
+
+def test_complete_offline_reads_batch_output():
+    output = "\n".join(json.dumps({
+        "custom_id": custom_id,
+        "response": {"body": {
+            "choices": [{"message": {"content": content}}],
+            "usage": {"prompt_tokens": 50, "completion_tokens": 10},
+        }},
+    }) for custom_id, content in [("a", '{"ok": 1}'), ("b", "not json")])
+
+    class Files:
+        async def create(self, file, purpose):
+            self.uploaded = file[1].decode().splitlines()
+            return SimpleNamespace(id="file-in")
+
+        async def content(self, file_id):
+            return SimpleNamespace(text=output)
+
+    class Batches:
+        async def create(self, **kwargs):
+            return SimpleNamespace(id="batch-1", status="in_progress", output_file_id=None)
+
+        async def retrieve(self, batch_id):
+            return SimpleNamespace(id=batch_id, status="completed", output_file_id="file-out")
+
+    files = Files()
+    llm = llm_client(FakeCompletions([completion("{}")]))
+    llm.client.files = files
+    llm.client.batches = Batches()
+
+    prompts = {"a": ("p1", 100, ["A", "B"]), "b": ("p2", 100, ["C"]), "c": ("p3", 100, ["D"])}
+    results = asyncio.run(llm.complete_offline(prompts, poll_interval=0))
+
+    assert results == {"a": {"ok": 1}, "b": None, "c": None}
+    assert [json.loads(line)["custom_id"] for line in files.uploaded] == ["a", "b", "c"]
+    assert llm.stats()["prompt_tokens"] == 100
+    assert llm.usage_by_tag() == {
+        "A": {"prompt_tokens": 25, "completion_tokens": 5},
+        "B": {"prompt_tokens": 25, "completion_tokens": 5},
+        "C": {"prompt_tokens": 50, "completion_tokens": 10},
+    }
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models.mosqueRequest import MosqueRequest
+from models.prayerTimes import db
+from mosque_requests import ClientLimiter, MosqueRequestSender, dedupe_key
+
+
+def test_dedupe_key_ignores_case_and_spacing_but_not_sender():
+    key = dedupe_key("Masjid  Noor", "Near the mall", "1.2.3.4")
+    assert dedupe_key("masjid noor ", "near the MALL", "1.2.3.4") == key
+    assert dedupe_key("Masjid Noor", "Near the mall", "5.6.7.8") != key
+
+
+def test_client_limiter_allows_bursts_per_ip_then_refills():
+    now = [0.0]
+    limiter = ClientLimiter(per_minute=2, max_clients=2, clock=lambda: now[0])
+
+    assert limiter.allow("a")[0] and limiter.allow("a")[0]
+    allowed, retry_after = limiter.allow("a")
+    assert not allowed and retry_after == pytest.approx(30)
+    assert limiter.allow("b")[0]
+
+    now[0] = 60.0
+    assert limiter.allow("a")[0]
+    # At the cap, clients whose buckets have refilled are forgotten
+    limiter.allow("c")
+    assert set(limiter._buckets) == {"a", "c"}
+
+
+class FakeHTTP:
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.posted = []
+
+    def post(self, url, json, timeout):
+        if self.fail_after is not None and len(self.posted) >= self.fail_after:
+            raise ConnectionError("webhook down")
+        self.posted.append(json)
+        return self
+
+    def raise_for_status(self):
+        pass
+
+
+def queued_app(make_app, **config):
+    app = make_app(GSHEET_WEBHOOK_URL="https://sheet.example/hook", **config)
+    with app.app_context():
+        for i in range(3):
+            db.session.add(MosqueRequest(dedupe_key=str(i), mosque_name=f"Mosque {i}", additional_info=""))
+        db.session.commit()
+    return app
+
+
+def test_sender_delivers_in_order_and_backs_off_on_failure(make_app):
+    app = queued_app(make_app, MOSQUE_REQUEST_MAX_ATTEMPTS=2)
+    http = FakeHTTP(fail_after=1)
+    sender = MosqueRequestSender(app, http)
+
+    assert sender.flush() == 1
+    assert [p["mosque_name"] for p in http.posted] == ["Mosque 0"]
+
+    with app.app_context():
+        first, second, third = MosqueRequest.query.order_by(MosqueRequest.id).all()
+        assert first.status == "sent" and first.sent_at is not None
+        assert second.status == "pending" and second.attempts == 1 and "webhook down" in second.last_error
+        assert third.attempts == 0
+
+        # Not due until its backoff is over; the next one is tried meanwhile
+        assert second.next_attempt_at > datetime.now() - timedelta(seconds=1)
+        second.next_attempt_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+        db.session.commit()
+
+    assert sender.flush() == 0
+    with app.app_context():
+        assert MosqueRequest.query.filter_by(status="failed").count() == 1
+
+    http.fail_after = None
+    assert sender.flush() == 1
+    assert http.posted[-1]["submission_id"] == 3
+
+
+def test_endpoint_queues_deduplicates_and_rate_limits(make_web_app):
+    client = make_web_app(GSHEET_WEBHOOK_URL="https://sheet.example/hook", MOSQUE_REQUESTS_PER_MINUTE=3).test_client()
+
+    body = {"mosque_name": "Masjid Noor", "additional_info": "Near the mall"}
+    assert client.post("/mosque-request", json=body).status_code == 202
+    assert client.post("/mosque-request", json={**body, "mosque_name": "masjid noor"}).status_code == 202
+    assert client.post("/mosque-request", json={"mosque_name": ""}).status_code == 400
+
+    limited = client.post("/mosque-request", json=body)
+    assert limited.status_code == 429 and int(limited.headers["Retry-After"]) > 0
+
+    with client.application.app_context():
+        assert MosqueRequest.query.count() == 1
+
+
+def test_spoofed_forwarded_for_entries_do_not_change_the_client(make_web_app):
+    app = make_web_app(GSHEET_WEBHOOK_URL="https://sheet.example/hook", MOSQUE_REQUESTS_PER_MINUTE=2, TRUSTED_PROXIES=1)
+    client = app.test_client()
+
+    def submit(spoofed, name):
+        # The proxy appends the address it saw after whatever the client sent
+        headers = {"X-Forwarded-For": f"{spoofed}, 203.0.113.7"}
+        return client.post("/mosque-request", json={"mosque_name": name}, headers=headers).status_code
+
+    assert submit("1.1.1.1", "Masjid A") == 202
+    assert submit("2.2.2.2", "Masjid B") == 202
+    assert submit("3.3.3.3", "Masjid C") == 429
+
+    with app.app_context():
+        assert {r.submitter_ip for r in MosqueRequest.query} == {"203.0.113.7"}
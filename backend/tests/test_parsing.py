@@ -0,0 +1,47 @@
+from parsing import PRUNE_SEPARATOR, TIME_PATTERN, clean_text, html_to_text, prune_text
+
+TABLE = "Prayer Times Fajr 5:08 AM 6:00 AM Dhuhr 1:19 PM 2:00 PM Asr 6:05 PM 6:45 PM Maghrib 8:04 PM Isha 9:30 PM 10:00 PM"
+JUMMAH = "Jumu'ah Khutbah 1:30 PM Iqamah 2:00 PM"
+
+
+def filler(word, count):
+    return " ".join([word] * count)
+
+
+def test_prune_keeps_prayer_windows_and_drops_the_rest():
+    text = clean_text(" ".join([
+        filler("Donate to our building fund today.", 80), TABLE,
+        filler("Upcoming youth events and halaqas.", 120), JUMMAH,
+        filler("Copyright and footer links.", 60),
+    ]))
+
+    pruned = prune_text(text, 1500, window=100)
+
+    assert len(pruned) <= 1500
+    assert len(text) > 5 * len(pruned)
+    assert TIME_PATTERN.findall(pruned) == TIME_PATTERN.findall(text)
+    assert pruned.count(PRUNE_SEPARATOR) == 1
+    assert pruned.index("Fajr") < pruned.index("Khutbah")
+
+
+def test_prune_prefers_the_densest_window_and_never_splits_it():
+    table = " ".join(f"Oct {day} 5:{day:02d} AM 1:30 PM 4:45 PM 6:30 PM 8:00 PM" for day in range(1, 31))
+    text = " ".join([filler("Ramadan prayer schedule", 40), filler("news", 400), table, filler("news", 400)])
+
+    pruned = prune_text(text, 1000, window=50)
+
+    assert table in pruned
+    assert "Ramadan" not in pruned
+
+
+def test_prune_leaves_short_or_unanchored_text_alone():
+    assert prune_text(TABLE, 1000) == TABLE
+    assert prune_text(filler("nothing here", 500), 100) == filler("nothing here", 500)
+    assert prune_text(filler("nothing here", 500) + TABLE, 0) == filler("nothing here", 500) + TABLE
+
+
+def test_html_to_text_reads_only_the_selected_widget():
+    html = "<nav>Home</nav><div id='times'><p>Fajr</p><p>5:08 AM</p></div><footer>Donate</footer><script>x()</script>"
+
+    assert html_to_text(html, "#times").split() == ["Fajr", "5:08", "AM"]
+    assert html_to_text(html, "#missing").split() == ["Home", "Fajr", "5:08", "AM", "Donate"]
@@ -0,0 +1,25 @@
+import asyncio
+
+from profiling import RunProfile
+
+
+def test_spans_time_each_mosque_across_awaits():
+    profile = RunProfile()
+
+    async def work(name, delay):
+        with profile.span(name, "llm"):
+            await asyncio.sleep(delay)
+
+    async def run():
+        await asyncio.gather(work("A", 0.05), work("B", 0.01))
+
+    asyncio.run(run())
+    profile.note("A", path="llm", prompt_tokens=120)
+
+    assert profile.mosques["A"]["llm"] >= 0.05
+    assert 0.01 <= profile.mosques["B"]["llm"] < 0.05
+    assert profile.mosques["A"]["path"] == "llm"
+
+    summary = profile.summary()
+    assert list(summary) == ["llm"]
+    assert summary["llm"]["max"] >= 0.05
@@ -0,0 +1,90 @@
+import random
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+from refresh import RefreshPolicy, change_days
+
+EASTERN = ZoneInfo("America/Toronto")
+
+
+def entry(**values):
+    fields = dict(interval_hours=None, change_interval_hours=None, last_checked_at=None,
+                  last_changed_at=None, next_check_at=None, checks=0, changes=0)
+    fields.update(values)
+    return SimpleNamespace(**fields)
+
+
+def policy(**options):
+    return RefreshPolicy(EASTERN, jitter=0, rng=random.Random(0), **options)
+
+
+def test_change_days_include_month_starts_dst_and_extra_dates():
+    days = change_days(date(2026, 10, 25), date(2026, 11, 10), EASTERN, extra=[date(2026, 11, 5), date(2027, 1, 1)])
+
+    assert days == [date(2026, 11, 1), date(2026, 11, 5)]
+    # Spring forward lands on the second Sunday of March
+    assert date(2026, 3, 8) in change_days(date(2026, 3, 5), date(2026, 3, 10), EASTERN)
+
+
+def test_unchanged_site_backs_off_to_the_maximum():
+    p = policy(max_hours=96)
+    e = entry()
+    now = datetime(2026, 6, 10, 7, tzinfo=timezone.utc)
+
+    intervals = []
+    for _ in range(8):
+        p.update(e, "unchanged", now)
+        intervals.append(e.interval_hours)
+
+    assert intervals == sorted(intervals)
+    assert intervals[0] == 36
+    assert intervals[-1] == 96
+    assert e.checks == 8
+
+
+def test_frequent_changes_shorten_the_interval():
+    p = policy(min_hours=6)
+    now = datetime(2026, 6, 10, 7, tzinfo=timezone.utc)
+    e = entry(interval_hours=48, last_changed_at=now - timedelta(hours=24))
+
+    p.update(e, "changed", now)
+
+    assert e.change_interval_hours == 24
+    assert e.interval_hours == 12
+    assert e.next_check_at == now + timedelta(hours=12)
+    assert e.changes == 1
+
+
+def test_checks_again_on_an_upcoming_change_day():
+    p = policy(max_hours=96)
+    now = datetime(2026, 10, 29, 12, tzinfo=timezone.utc)
+    e = entry(interval_hours=96)
+
+    p.update(e, "unchanged", now)
+
+    # Nov 1 is both a month start and the DST switch
+    assert e.next_check_at == datetime(2026, 11, 1, 3, tzinfo=EASTERN)
+
+
+def test_failed_fetch_retries_soon_without_learning():
+    p = policy(min_hours=6)
+    now = datetime(2026, 6, 10, 7, tzinfo=timezone.utc)
+    e = entry(interval_hours=48)
+
+    p.update(e, "failed", now)
+
+    assert e.interval_hours == 48
+    assert e.next_check_at == now + timedelta(hours=6)
+
+
+def test_jitter_spreads_next_checks():
+    p = RefreshPolicy(EASTERN, jitter=0.1, rng=random.Random(1))
+    now = datetime(2026, 6, 10, 7, tzinfo=timezone.utc)
+
+    checks = {p.update(entry(interval_hours=24), "unchanged", now) for _ in range(5)}
+
+    assert len(checks) == 5
+    assert all(now + timedelta(hours=32.4) <= c <= now + timedelta(hours=39.6) for c in checks)
+    assert p.is_due(None, now)
+    assert not p.is_due(entry(next_check_at=min(checks).replace(tzinfo=None)), now)
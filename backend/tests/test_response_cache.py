@@ -0,0 +1,23 @@
+import json
+
+from response_cache import ResponseCache
+
+
+def test_invalidate_during_a_build_drops_its_result():
+    versions = iter([{"v": 1}, {"v": 2}])
+
+    def build():
+        data = next(versions)
+        if data["v"] == 1:
+            # A scrape event lands while the first build is still reading
+            cache.invalidate()
+        return data
+
+    cache = ResponseCache(build, lambda data: json.dumps(data).encode())
+
+    stale = cache.get()
+    assert stale.data == {"v": 1}
+
+    fresh = cache.get()
+    assert fresh.data == {"v": 2} and fresh.etag != stale.etag
+    assert cache.get() is fresh
@@ -0,0 +1,55 @@
+import json
+from datetime import date, datetime, time, timezone
+
+from models.dailySchedule import DailySchedule
+from models.prayerTimes import PrayerTimes, db
+from parsing import FIELDS
+from schedule_store import ROW_BYTES, ScheduleBlock, decode, encode
+
+TIMES = {field: None for field in FIELDS}
+TIMES.update(fajr_start=time(5, 2), fajr_iqamah=time(5, 30), zuhr_iqamah=time(13, 30), isha_iqamah=time(22, 15))
+
+
+def test_encode_round_trip():
+    blob = encode(TIMES)
+    assert len(blob) == ROW_BYTES == 32
+    assert decode(blob) == TIMES
+
+
+def test_load_serializes_like_prayer_times(app):
+    updated = datetime(2025, 6, 1, 12, tzinfo=timezone.utc)
+    with app.app_context():
+        for day in (date(2025, 6, 1), date(2025, 6, 2), date(2025, 7, 1)):
+            DailySchedule.save("A", day, TIMES)
+        DailySchedule.save("B", date(2025, 6, 2), {**TIMES, "asr_iqamah": time(18, 45)})
+        db.session.commit()
+        db.session.execute(db.update(DailySchedule).values(updated_at=updated))
+
+        block = DailySchedule.load(start=date(2025, 6, 1), end=date(2025, 6, 30))
+        assert block.names == ["A", "A", "B"]
+
+        expected = PrayerTimes(mosque_name="A", date=date(2025, 6, 1), updated_at=updated, **TIMES).to_dict()
+        rows = block.to_dicts()
+        assert rows[0] == expected
+        assert rows[2]["asr_iqamah"] == "18:45:00"
+        assert json.loads(block.to_json()) == rows
+
+        day = block.days()[2]
+        assert (day.mosque_name, day.date, day.asr_iqamah, day.zuhr_start) == ("B", date(2025, 6, 2), time(18, 45), None)
+
+        assert len(DailySchedule.load(names=["B"])) == 1
+        assert len(DailySchedule.load(start=date(2026, 1, 1))) == 0
+
+
+def test_binary_round_trip():
+    block = ScheduleBlock.from_rows([
+        ("A", date(2025, 6, 1), encode(TIMES), None),
+        ("B", date(2025, 6, 1), encode({}), None),
+    ])
+    data = block.to_binary()
+    copy = ScheduleBlock.from_binary(data)
+
+    assert copy.names == ["A", "B"]
+    assert copy.ordinals.tolist() == block.ordinals.tolist()
+    assert (copy.minutes == block.minutes).all()
+    assert copy.days()[1].fajr_start is None
@@ -0,0 +1,243 @@
+import asyncio
+import re
+from types import SimpleNamespace
+from datetime import datetime, time, timedelta, timezone
+
+import pytest
+
+from astronomy import AdhanTable
+from models.llmCache import LLMCacheEntry
+from models.prayerTimes import PrayerTimes, db
+from parsing import FIELDS, html_to_text
+from profiling import RunProfile
+from refresh import as_utc
+import scraper
+from models.scrapeRun import ScrapeRun
+from scraper import EASTERN, ExtractionError, RunWriter, process_mosque, refresh_policy
+
+MOSQUE = {"name": "Masjid A", "website": "https://a.example/times"}
+
+
+def page(fajr):
+    return (
+        f"<html><body><table><tr><td>Fajr</td><td>{fajr}</td></tr>"
+        "<tr><td>Zuhr</td><td>1:30 PM</td></tr><tr><td>Asr</td><td>6:00 PM</td></tr>"
+        "<tr><td>Isha</td><td>10:00 PM</td></tr></table></body></html>"
+    )
+
+
+def fetched(fajr, etag):
+    return {
+        **MOSQUE,
+        "raw_text": html_to_text(page(fajr)),
+        "raw_html": page(fajr),
+        "fetch_strategy": "httpx",
+        "validators": {"etag": etag, "last_modified": None, "content_length": None},
+    }
+
+
+class FakeBatcher:
+    """Answers each extraction with the next of `answers`; None stands for a failed LLM call."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = 0
+
+    async def extract(self, cleaned_text, today_label, name=None):
+        self.calls += 1
+        return self.answers.pop(0)
+
+
+def extraction(fajr):
+    return {**dict.fromkeys(FIELDS), "fajr_iqamah": fajr, "zuhr_iqamah": "1:30 PM", "isha_iqamah": "10:00 PM"}
+
+
+def test_not_modified_page_whose_extraction_failed_is_extracted_again(make_app):
+    app = make_app(RULE_EXTRACTORS=False, ADHAN_CHECK=False)
+    with app.app_context():
+        db.session.add(PrayerTimes(
+            mosque_name=MOSQUE["name"], date=datetime.now().date(), fajr_iqamah=time(5, 49),
+            raw_text_hash="hash of the old page", updated_at=datetime.now(timezone.utc),
+        ))
+        db.session.commit()
+
+        # The page changes, but the LLM call for it fails; its body and ETag are kept
+        profile = RunProfile()
+        writer = RunWriter(refresh_policy(), profile, datetime.now(timezone.utc), 1)
+        result = fetched("5:17 AM", '"v2"')
+        with pytest.raises(ExtractionError):
+            asyncio.run(process_mosque(result, FakeBatcher(None), profile))
+        writer.add(MOSQUE, result, None, failed=True)
+        assert writer.states[MOSQUE["name"]].etag == '"v2"'
+
+        # Next run the site answers 304: the cached body still differs from the
+        # stored times' source, so it is extracted instead of skipped
+        state = writer.states[MOSQUE["name"]]
+        not_modified = {**MOSQUE, "not_modified": True, "raw_html": state.cached_body(), "fetch_strategy": "httpx"}
+        batcher = FakeBatcher(extraction("5:17 AM"))
+        record = asyncio.run(process_mosque(not_modified, batcher, RunProfile()))
+        assert batcher.calls == 1
+        assert record.fajr_iqamah == time(5, 17)
+
+        # Once the times come from that body, a 304 is skipped without the LLM
+        writer.add(MOSQUE, not_modified, record)
+        writer.commit()
+        batcher = FakeBatcher()
+        assert asyncio.run(process_mosque(not_modified, batcher, RunProfile())) is None
+        assert batcher.calls == 0
+
+
+def test_failed_extraction_is_retried_soon_instead_of_backed_off(make_app):
+    app = make_app(REFRESH_MIN_HOURS=6, REFRESH_DEFAULT_HOURS=24, REFRESH_JITTER=0)
+    with app.app_context():
+        now = datetime.now(timezone.utc)
+        writer = RunWriter(refresh_policy(), RunProfile(), now, 1)
+
+        writer.add({"name": "Failed"}, fetched("5:17 AM", None) | {"name": "Failed"}, None, failed=True)
+        writer.add({"name": "Same"}, fetched("5:17 AM", None) | {"name": "Same"}, None)
+
+        failed, same = writer.schedules["Failed"], writer.schedules["Same"]
+        assert failed.interval_hours == 24
+        assert as_utc(failed.next_check_at) - now <= timedelta(hours=6)
+        assert same.interval_hours == 36
+
+        outcomes = dict(db.session.execute(db.select(ScrapeRun.mosque_name, ScrapeRun.outcome)).all())
+        assert outcomes == {"Failed": "failed", "Same": "unchanged"}
+
+
+class FakeRunLLM:
+    """Stands in for make_llm_client(): extracts the Fajr time a page's text
+    starts with, live or as Batch API jobs."""
+
+    def __init__(self):
+        self.offline_jobs = []
+        self.client = SimpleNamespace(close=lambda: asyncio.sleep(0))
+
+    def answer(self, text):
+        return extraction(re.search(r"\d{1,2}:\d{2} AM", text).group())
+
+    async def complete(self, prompt, max_completion_tokens=500, tags=()):
+        # The page text comes last, after the rules and their example times
+        return self.answer(prompt.rsplit("Text:", 1)[1])
+
+    async def complete_offline(self, prompts, poll_interval=60):
+        self.offline_jobs.append(prompts)
+        results = {}
+        for custom_id, (prompt, _, _) in prompts.items():
+            packed = re.findall(r"=== (m\d+) ===\n(.*?)\n=== end \1 ===", prompt, re.DOTALL)
+            results[custom_id] = {key: self.answer(text) for key, text in packed} if packed else await self.complete(prompt)
+        return results
+
+    def usage_by_tag(self):
+        return {}
+
+    def stats(self):
+        return {}
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.states = {}
+        self.added = []
+
+    def add(self, mosque, result, record, failed=False):
+        self.added.append((mosque["name"], record, failed, result is None))
+
+
+def scrape_run(app, monkeypatch, mosques, delays, offline=False, broken=()):
+    """run_all over fake pages: each mosque's fetch takes delays[name] seconds,
+    and fetching or extracting one in `broken` raises."""
+    llm = FakeRunLLM()
+    monkeypatch.setattr(scraper, "make_llm_client", lambda: llm)
+
+    async def fake_scrape(mosque, state, http, pool):
+        await asyncio.sleep(delays.get(mosque["name"], 0))
+        if mosque["name"] == "Unreachable":
+            raise OSError("connection reset")
+        return {**fetched(mosque["fajr"], None), **mosque, "fetch_strategy": "httpx"}
+
+    monkeypatch.setattr(scraper, "scrape_mosque", fake_scrape)
+    process = scraper.process_mosque
+
+    async def fake_process(result, *args):
+        if result["name"] in broken:
+            raise KeyError("fajr_iqamah")
+        return await process(result, *args)
+
+    monkeypatch.setattr(scraper, "process_mosque", fake_process)
+
+    writer = RecordingWriter()
+    with app.app_context():
+        asyncio.run(scraper.run_all(mosques, RunProfile(), writer, offline))
+    return writer, llm
+
+
+def mosque(name, fajr):
+    return {"name": name, "website": f"https://{name.lower()}.example", "fajr": fajr}
+
+
+def test_run_all_stores_each_mosque_as_it_finishes_and_isolates_errors(make_app, monkeypatch):
+    app = make_app(RULE_EXTRACTORS=False, ADHAN_CHECK=False, LLM_BATCH_SIZE=1, SCRAPE_FETCH_WORKERS=4)
+    mosques = [
+        mosque("Slow", "5:01 AM"), mosque("Fast", "5:02 AM"), mosque("Broken", "5:03 AM"),
+        mosque("Unreachable", "5:04 AM"), mosque("Quick", "5:05 AM"),
+    ]
+    writer, _ = scrape_run(app, monkeypatch, mosques, {"Slow": 0.3}, broken={"Broken"})
+
+    names = [name for name, *_ in writer.added]
+    assert sorted(names) == sorted(m["name"] for m in mosques)
+    # The slow site holds up only itself
+    assert names[-1] == "Slow"
+
+    by_name = {name: rest for name, *rest in writer.added}
+    assert by_name["Fast"][0].fajr_iqamah == time(5, 2)
+    assert by_name["Slow"][0].fajr_iqamah == time(5, 1)
+    assert by_name["Broken"] == [None, True, False]
+    assert by_name["Unreachable"] == [None, False, True]
+
+
+def test_offline_run_sends_one_batch_job_however_slow_the_fetches(make_app, monkeypatch):
+    app = make_app(RULE_EXTRACTORS=False, ADHAN_CHECK=False, LLM_BATCH_SIZE=2, SCRAPE_EXTRACT_WORKERS=1)
+    mosques = [mosque(f"M{i}", f"5:{i:02d} AM") for i in range(5)]
+    # Fetches finish further apart than the batcher's linger
+    delays = {"M4": 1.5}
+    writer, llm = scrape_run(app, monkeypatch, mosques, delays, offline=True)
+
+    assert len(llm.offline_jobs) == 1
+    assert len(llm.offline_jobs[0]) == 3
+    records = {name: record for name, record, _, _ in writer.added}
+    assert records["M4"].fajr_iqamah == time(5, 4)
+
+
+def test_adhan_check_fills_gaps_keeps_published_starts_and_evicts_rejections(make_app):
+    app = make_app(RULE_EXTRACTORS=False, ADHAN_TOLERANCE_MINUTES=5)
+    located = {**MOSQUE, "latitude": 43.69, "longitude": -79.28}
+    today = datetime.now(EASTERN).date()
+    adhan = AdhanTable([located], today, 1, EASTERN)
+    expected = adhan.starts(MOSQUE["name"], today)
+
+    with app.app_context():
+        # A Hanafi Asr is far from the standard one, but it's what the mosque publishes
+        later_asr = (datetime.combine(today, expected["asr_start"]) + timedelta(minutes=70)).time()
+        hanafi = extraction("5:30 AM") | {
+            "asr_start": later_asr.strftime("%I:%M %p"),
+            "asr_iqamah": "11:59 PM",
+            "zuhr_start": expected["zuhr_start"].strftime("%I:%M %p"),
+        }
+        record = asyncio.run(process_mosque(fetched("5:30 AM", None), FakeBatcher(hanafi), RunProfile(), adhan))
+        assert record.asr_start == later_asr
+        assert record.zuhr_start == expected["zuhr_start"]
+        assert record.fajr_start == expected["fajr_start"]
+
+        # Most starts off: likely another day's row, so rejected and not cached
+        def shifted(field, minutes):
+            return (datetime.combine(today, expected[field]) + timedelta(minutes=minutes)).strftime("%I:%M %p")
+
+        misread = {**dict.fromkeys(FIELDS)}
+        for prayer in ("fajr", "zuhr", "asr", "maghrib", "isha"):
+            misread[f"{prayer}_start"] = shifted(f"{prayer}_start", 40)
+            misread[f"{prayer}_iqamah"] = shifted(f"{prayer}_start", 50)
+        with pytest.raises(ExtractionError):
+            asyncio.run(process_mosque(fetched("5:31 AM", None), FakeBatcher(misread), RunProfile(), adhan))
+        db.session.flush()
+        assert db.session.query(LLMCacheEntry).count() == 1
@@ -0,0 +1,74 @@
+from datetime import date, time
+from types import SimpleNamespace
+
+from parsing import FIELDS
+from timeline import Timeline, TimelineCache
+
+
+def schedule(**iqamahs):
+    values = {field: None for field in FIELDS}
+    values.update({f"{prayer}_iqamah": value for prayer, value in iqamahs.items()})
+    return SimpleNamespace(**values)
+
+
+SCHEDULES = {
+    "A": schedule(fajr=time(6, 0), zuhr=time(13, 30), asr=time(16, 45), maghrib=time(18, 30), isha=time(20, 0), jummah1=time(13, 45)),
+    "B": schedule(fajr=time(6, 15), zuhr=time(13, 15), asr=time(17, 0), isha=time(20, 15), jummah1=time(13, 30), jummah2=time(14, 30)),
+    "C": schedule(fajr=time(6, 5), zuhr=time(13, 40), isha=time(20, 5)),
+}
+
+
+def test_after_returns_next_iqamahs_in_order():
+    timeline = Timeline(date(2026, 10, 18), SCHEDULES)
+
+    assert timeline.after(13 * 60, limit=3) == [
+        ("B", "zuhr", time(13, 15)),
+        ("A", "zuhr", time(13, 30)),
+        ("C", "zuhr", time(13, 40)),
+    ]
+    assert timeline.after(13 * 60, names={"B"}) == [("B", "zuhr", time(13, 15))]
+    assert timeline.after(21 * 60) == []
+
+
+def test_named_mosques_merge_in_time_order():
+    timeline = Timeline(date(2026, 10, 18), SCHEDULES)
+
+    assert timeline.after(6 * 60, names={"A", "C", "Unknown"}, limit=4) == [
+        ("A", "fajr", time(6, 0)),
+        ("C", "fajr", time(6, 5)),
+        ("A", "zuhr", time(13, 30)),
+        ("C", "zuhr", time(13, 40)),
+    ]
+    assert timeline.after(20 * 60 + 10, names={"A", "C"}) == []
+
+
+def test_friday_uses_jummah_instead_of_zuhr_where_listed():
+    timeline = Timeline(date(2026, 10, 16), SCHEDULES)
+
+    # C lists no jummah, so its zuhr stays
+    assert timeline.after(12 * 60, limit=4) == [
+        ("B", "jummah1", time(13, 30)),
+        ("C", "zuhr", time(13, 40)),
+        ("A", "jummah1", time(13, 45)),
+        ("B", "jummah2", time(14, 30)),
+    ]
+
+
+def test_cache_drops_a_timeline_loaded_across_an_invalidation():
+    loads = []
+
+    def load(day):
+        loads.append(day)
+        if len(loads) == 1:
+            # A scrape event lands while the first load is still reading
+            cache.invalidate()
+            return {}
+        return SCHEDULES
+
+    cache = TimelineCache(load)
+    day = date(2026, 10, 18)
+
+    assert len(cache.get(day)) == 0
+    fresh = cache.get(day)
+    assert len(fresh) > 0 and cache.get(day) is fresh
+    assert len(loads) == 2
@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+import pytest
+
+import worker
+from locks import AdvisoryLock, FileLock, lock_key
+
+
+def test_file_lock_admits_one_holder_at_a_time(tmp_path):
+    path = str(tmp_path / "scrape.lock")
+    first, second = FileLock(path), FileLock(path)
+
+    assert first.acquire()
+    assert not second.acquire()
+    assert open(path).read().isdigit()
+
+    first.release()
+    assert second.acquire()
+    second.release()
+
+
+def test_run_scrape_skips_while_another_scrape_holds_the_lock(make_app, tmp_path, monkeypatch):
+    app = make_app(SCRAPE_LOCK_PATH=str(tmp_path / "scrape.lock"))
+    runs = []
+    monkeypatch.setattr(worker, "scrape_and_update", lambda app, force, offline: runs.append((force, offline)))
+
+    held = FileLock(app.config["SCRAPE_LOCK_PATH"])
+    assert held.acquire()
+    worker.run_scrape(app)
+    assert runs == []
+
+    held.release()
+    worker.run_scrape(app, force=True, offline=True)
+    assert runs == [(True, True)]
+
+    # The lock is given back even when the scrape fails
+    monkeypatch.setattr(worker, "scrape_and_update", lambda app, force, offline: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        worker.run_scrape(app)
+    assert held.acquire()
+    held.release()
+
+
+class FakePostgres:
+    """An engine whose connections answer pg_try_advisory_lock/pg_advisory_unlock
+    like one shared Postgres server."""
+
+    def __init__(self):
+        self.held = {}
+
+    def connect(self):
+        server = self
+
+        class Connection:
+            closed = False
+
+            def execute(self, statement, params):
+                key, sql = params["key"], str(statement)
+                if "pg_try_advisory_lock" in sql:
+                    free = server.held.get(key, self) is self
+                    if free:
+                        server.held[key] = self
+                    return SimpleNamespace(scalar=lambda: free)
+                server.held.pop(key, None)
+                return SimpleNamespace(scalar=lambda: True)
+
+            def commit(self):
+                pass
+
+            def close(self):
+                self.closed = True
+
+        return Connection()
+
+
+def test_advisory_lock_is_shared_through_the_database():
+    server = FakePostgres()
+    # Two workers on different machines, each with its own engine
+    first, second = AdvisoryLock(server, "jamaat.scrape"), AdvisoryLock(server, "jamaat.scrape")
+    other = AdvisoryLock(server, "jamaat.scrape.requests")
+
+    assert first.acquire()
+    assert not second.acquire()
+    assert other.acquire()
+
+    first.release()
+    assert second.acquire()
+    assert lock_key("jamaat.scrape") == second.key != other.key
+
+
+def test_sqlite_workers_lock_a_file(make_app, tmp_path):
+    app = make_app(SCRAPE_LOCK_PATH=str(tmp_path / "scrape.lock"))
+    lock = worker.worker_lock(app, ".requests")
+    assert isinstance(lock, FileLock) and lock.path.endswith("scrape.lock.requests")
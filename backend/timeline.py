@@ -0,0 +1,99 @@
+import threading
+from bisect import bisect_left
+from heapq import merge
+from itertools import islice
+
+from parsing import JUMMAH_SLOTS, PRAYERS
+
+FRIDAY = 4
+
+
+class Timeline:
+    """Every iqamah of one day across all mosques, sorted by time of day.
+
+    On Fridays the jummah slots take the place of zuhr at mosques that list
+    at least one; the others keep their zuhr.
+    """
+
+    def __init__(self, day, schedules):
+        """`schedules` maps mosque name to an object with the 16 *_start/*_iqamah attributes."""
+        self.day = day
+        friday = day.weekday() == FRIDAY
+
+        entries = []
+        self._by_mosque = {}
+        for name, schedule in schedules.items():
+            prayers = PRAYERS
+            if friday and any(getattr(schedule, f"{slot}_iqamah") is not None for slot in JUMMAH_SLOTS):
+                prayers = [p for p in PRAYERS if p != "zuhr"] + JUMMAH_SLOTS
+
+            own = []
+            for prayer in prayers:
+                iqamah = getattr(schedule, f"{prayer}_iqamah")
+                if iqamah is not None:
+                    own.append((iqamah.hour * 60 + iqamah.minute, name, prayer, iqamah))
+            own.sort()
+            self._by_mosque[name] = ([entry[0] for entry in own], own)
+            entries += own
+
+        entries.sort(key=lambda entry: (entry[0], entry[1]))
+        self._entries = entries
+        self._minutes = [entry[0] for entry in entries]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def after(self, minute, names=None, limit=1):
+        """The first `limit` iqamahs at or after `minute` past midnight, optionally
+        only at the mosques in `names`, as (mosque name, prayer, time) tuples.
+
+        Across all mosques this is one bisect; for `names` it is a bisect per
+        named mosque and a merge of what follows, so O(k log n + limit log k)
+        for k mosques rather than a scan of the whole day."""
+        if names is None:
+            first = bisect_left(self._minutes, minute)
+            found = self._entries[first:first + limit]
+        else:
+            tails = []
+            for name in names:
+                if name in self._by_mosque:
+                    minutes, own = self._by_mosque[name]
+                    tails.append(islice(own, bisect_left(minutes, minute), None))
+            found = islice(merge(*tails, key=lambda entry: (entry[0], entry[1])), limit)
+        return [(name, prayer, iqamah) for _, name, prayer, iqamah in found]
+
+
+class TimelineCache:
+    """Timelines by date, built by `load(day)` on first use and dropped on invalidate().
+    A timeline loaded across an invalidate() answers its caller but isn't kept."""
+
+    def __init__(self, load):
+        self._load = load
+        self._lock = threading.Lock()
+        # Held only to compare-and-store, so invalidate() never waits on a load
+        self._store_lock = threading.Lock()
+        self._timelines = {}
+        self._generation = 0
+
+    def get(self, day):
+        timeline = self._timelines.get(day)
+        if timeline is not None:
+            return timeline
+
+        with self._lock:
+            timeline = self._timelines.get(day)
+            if timeline is None:
+                generation = self._generation
+                timeline = Timeline(day, self._load(day))
+                with self._store_lock:
+                    if generation == self._generation:
+                        # Only a couple of days are ever asked for; keep the cache from growing
+                        if len(self._timelines) > 7:
+                            self._timelines.clear()
+                        self._timelines[day] = timeline
+            return timeline
+
+    def invalidate(self):
+        with self._store_lock:
+            self._generation += 1
+            self._timelines = {}
@@ -0,0 +1,114 @@
+"""Standalone scrape worker, run apart from the web processes.
+
+    python worker.py          # check each mosque whenever its refresh schedule says
+    python worker.py --once   # scrape every mosque once now and exit
+    python worker.py --once --batch-api   # same, extracting through the cheaper Batch API
+
+A lock makes sure only one scrape runs at a time, however many workers are
+started: a file next to a SQLite database, or a Postgres advisory lock, which
+also holds across machines. The scheduled worker also delivers queued
+/mosque-request submissions to the sheet webhook.
+"""
+import argparse
+from datetime import datetime
+
+from apscheduler.schedulers.blocking import BlockingScheduler
+from flask import Flask
+
+from config import Config
+from database import init_db, is_sqlite
+from locks import AdvisoryLock, FileLock
+from models.prayerTimes import db
+from mosque_requests import MosqueRequestSender
+from scraper import EASTERN, scrape_and_update
+
+
+def create_worker_app():
+    # A bare app: the worker needs the database config, not the routes
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    init_db(app)
+
+    with app.app_context():
+        db.create_all()
+
+    return app
+
+
+def worker_lock(app, suffix=""):
+    """The lock every worker takes before a job: a file beside a SQLite database,
+    since only processes on its machine can share it; on Postgres an advisory
+    lock, shared by workers on every replica."""
+    if is_sqlite(app.config["SQLALCHEMY_DATABASE_URI"]):
+        return FileLock(f"{app.config['SCRAPE_LOCK_PATH']}{suffix}")
+    with app.app_context():
+        return AdvisoryLock(db.engine, f"jamaat.scrape{suffix}")
+
+
+def run_scrape(app, force=False, offline=False):
+    lock = worker_lock(app)
+    if not lock.acquire():
+        print("[worker] another scrape is already running, skipping")
+        return
+
+    try:
+        scrape_and_update(app, force=force, offline=offline)
+    finally:
+        lock.release()
+
+
+def send_mosque_requests(app, sender):
+    # A lock of its own, so a delivery never waits behind a long scrape
+    lock = worker_lock(app, ".requests")
+    if not lock.acquire():
+        return
+
+    try:
+        sender.flush()
+    finally:
+        lock.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the prayer-time scraper.")
+    parser.add_argument("--once", action="store_true", help="scrape once now and exit")
+    parser.add_argument("--batch-api", action="store_true",
+                        help="with --once, send LLM extractions as one Batch API job (can take hours)")
+    args = parser.parse_args()
+
+    app = create_worker_app()
+
+    if args.once:
+        run_scrape(app, force=True, offline=args.batch_api)
+        return
+
+    scheduler = BlockingScheduler(timezone=EASTERN)
+    # Each tick only fetches the mosques that are due, so most ticks do nothing
+    scheduler.add_job(
+        func=run_scrape,
+        args=[app],
+        trigger="interval",
+        minutes=app.config["REFRESH_TICK_MINUTES"],
+        next_run_time=datetime.now(EASTERN),
+        id="scrape_and_update",
+        max_instances=1,
+        coalesce=True,
+    )
+
+    scheduler.add_job(
+        func=send_mosque_requests,
+        args=[app, MosqueRequestSender(app)],
+        trigger="interval",
+        seconds=app.config["MOSQUE_REQUEST_FLUSH_SECONDS"],
+        next_run_time=datetime.now(EASTERN),
+        id="send_mosque_requests",
+        max_instances=1,
+        coalesce=True,
+    )
+
+    print("[worker] scheduler started")
+    scheduler.start()
+
+
+if __name__ == "__main__":
+    main()
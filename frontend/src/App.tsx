@@ -2,12 +2,14 @@ import { Description } from "./components/description";
 import { Header } from "./components/header"
 import styled from 'styled-components';
 import { usePrayerTimes } from "./hooks/usePrayerTimes";
+import { usePrayerTimesStream } from "./hooks/usePrayerTimesStream";
 import { PrayerTimes } from "./prayerTimes";
 import { useCurrentTime } from "./hooks/useCurrentTime";
 import { Analytics } from '@vercel/analytics/react';
 
 function App() {
   const prayerTimesResult = usePrayerTimes();
+  usePrayerTimesStream();
   const currentTime = useCurrentTime();
 
   return (
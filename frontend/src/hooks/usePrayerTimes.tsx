@@ -12,7 +12,8 @@ export const usePrayerTimes = () => {
   return useQuery({
     queryKey: ['prayerTimes'],
     queryFn: fetchPrayerTimes,
-    staleTime: 5 * 60 * 1000, // 5 minutes
-    gcTime: 10 * 60 * 1000, // 10 minutes (formerly cacheTime)
+    // Updates are pushed by usePrayerTimesStream, so this is only a safety net
+    staleTime: 60 * 60 * 1000, // 1 hour
+    gcTime: 2 * 60 * 60 * 1000, // 2 hours (formerly cacheTime)
   });
 };
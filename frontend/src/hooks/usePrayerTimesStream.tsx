@@ -0,0 +1,39 @@
+import { useEffect } from 'react';
+import { useQueryClient } from '@tanstack/react-query';
+import type { PrayerTimes } from '../types';
+import { API_URL } from '../config';
+
+type PrayerTimesDiff = Record<string, Partial<PrayerTimes["prayer_times"]>>;
+
+// Applies the backend's pushed prayer-time changes to the cached query instead of polling.
+export const usePrayerTimesStream = () => {
+  const queryClient = useQueryClient();
+
+  useEffect(() => {
+    const source = new EventSource(`${API_URL}/prayer-times/stream`);
+
+    source.addEventListener('update', (event) => {
+      const diff: PrayerTimesDiff = JSON.parse((event as MessageEvent).data);
+      const cached = queryClient.getQueryData<PrayerTimes[]>(['prayerTimes']);
+
+      // A mosque we don't have yet needs its metadata, so fetch the full list
+      if (!cached || Object.keys(diff).some((name) => !cached.some((m) => m.name === name))) {
+        queryClient.invalidateQueries({ queryKey: ['prayerTimes'] });
+        return;
+      }
+
+      queryClient.setQueryData<PrayerTimes[]>(['prayerTimes'], cached.map((mosque) =>
+        diff[mosque.name]
+          ? { ...mosque, prayer_times: { ...mosque.prayer_times, ...diff[mosque.name] } }
+          : mosque
+      ));
+    });
+
+    // Sent when we fell too far behind to be caught up with diffs
+    source.addEventListener('resync', () => {
+      queryClient.invalidateQueries({ queryKey: ['prayerTimes'] });
+    });
+
+    return () => source.close();
+  }, [queryClient]);
+};